@@ -1,16 +1,35 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
 from pathlib import Path
-import os
 import shutil
 import json
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+import uuid
+from sqlalchemy import or_, func, select
+from sqlalchemy.orm import load_only, Session
 
-from app.services.cv_reader import read_cv
-from app.services.cv_matcher import match_cv_with_jd
-from app.services.ai_extractor import extract_with_ai, clean_ai_result
-from app.models.database import SessionLocal
-from app.models.cv_model import CV
+from starlette.concurrency import run_in_threadpool
+
+from app.services.cv_pipeline import (
+    PipelineError, get_ai_config, read_cv_text, extract_cv_and_jd, score_cv, save_cv,
+    extract_cv_info, extract_jd_info, load_job_info, analyze_cv_batch, run_in_ai_executor
+)
+from app.services.extraction_cache import extraction_cache
+from app.services.analysis_queue import analysis_queue
+from app.services.gemini_registry import gemini_registry
+from app.services.vector_index import cv_vector_index
+from app.services.job_ranking import job_rankings
+from app.services.filter_index import cv_filter_index
+from app.services.single_flight import llm_single_flight
+from app.services.llm_clients import llm_clients
+from app.services.rate_limiter import llm_scheduler
+from app.models.database import get_read_db
+from app.models.write_queue import write_queue
+from app.models.cv_model import CV, CVSkill
+from app.models.cv_search import fts_enabled, fts_phrase_matches
+from app.api.pagination import PageLimit, paginate_cvs
+from app.services.keyword_scanner import KeywordScanner
+from app.services.skill_index import SKILL_ALIASES, SKILL_SCANNER, canonical_skills, skill_name
 
 router = APIRouter(prefix="/cv", tags=["CV"])
 
@@ -26,244 +45,252 @@ def safe_json_loads(value):
         return []
 
 
+def cv_to_dict(cv: CV) -> dict:
+    return {
+        "id": cv.id,
+        "name": cv.name or "(Không xác định)",
+        "email": cv.email or "",
+        "phone": cv.phone or "",
+        "date_of_birth": cv.date_of_birth or None,
+        "address": cv.address or None,
+        "social_links": safe_json_loads(cv.social_links),
+        "education": safe_json_loads(cv.education),
+        "position": cv.candidate_position or "(Không rõ)",
+        "candidate_position": cv.candidate_position or "(Không rõ)",
+        "skills": safe_json_loads(cv.candidate_skills),
+        "years_experience": cv.candidate_years or 0,
+        "years": cv.candidate_years or 0,
+        "summary": cv.summary or "",
+        "experiences": safe_json_loads(cv.experiences),
+        "projects": safe_json_loads(cv.projects),
+        "score": float(cv.score) if cv.score else 0.0
+    }
+
+
+# Cột cần cho bảng danh sách - các cột JSON lớn (experiences, projects...) chỉ tải ở GET /cv/{id}
+SUMMARY_COLUMNS = load_only(
+    CV.id, CV.name, CV.email, CV.phone, CV.candidate_position,
+    CV.candidate_skills, CV.candidate_years, CV.score
+)
+
+
+def cv_summary_to_dict(cv: CV) -> dict:
+    return {
+        "id": cv.id,
+        "name": cv.name or "(Không xác định)",
+        "email": cv.email or "",
+        "phone": cv.phone or "",
+        "position": cv.candidate_position or "(Không rõ)",
+        "candidate_position": cv.candidate_position or "(Không rõ)",
+        "skills": safe_json_loads(cv.candidate_skills),
+        "years_experience": cv.candidate_years or 0,
+        "years": cv.candidate_years or 0,
+        "score": float(cv.score) if cv.score else 0.0
+    }
+
+
+def filter_by_skills(query, skills: List[str], match_all: bool = True):
+    """
+    Lọc CV theo kỹ năng qua bảng cv_skills (khớp chính xác key chuẩn hóa, dùng index)
+    - match_all=True: CV phải có đủ mọi kỹ năng (AND)
+    - match_all=False: có ít nhất một kỹ năng (OR)
+    """
+    keys = canonical_skills(skills)
+    if not keys:
+        return query
+    matched_ids = select(CVSkill.cv_id).where(CVSkill.skill.in_(keys))
+    if match_all:
+        matched_ids = matched_ids.group_by(CVSkill.cv_id).having(func.count(CVSkill.skill) == len(keys))
+    return query.filter(CV.id.in_(matched_ids))
+
+
+# Tập id lớn hơn thì lọc bằng SQL (tránh câu IN quá dài / vượt giới hạn tham số của SQLite)
+FILTER_INDEX_MAX_IDS = 20000
+
+
+def indexed_candidate_ids(skills: List[str], match_all: bool, min_years: int):
+    """
+    Id CV thỏa điều kiện kỹ năng / số năm theo chỉ mục ngược trong bộ nhớ
+    None: lọc bằng SQL (chỉ mục tắt, chưa dựng được hoặc kết quả quá lớn)
+    """
+    ids = cv_filter_index.candidate_ids(skills, match_all=match_all, min_years=min_years)
+    if ids is None or len(ids) > FILTER_INDEX_MAX_IDS:
+        return None
+    return ids
+
+
 # ================= ANALYZE =================
+def save_upload(file: UploadFile, unique: bool = False) -> Path:
+    """
+    Lưu file upload vào UPLOAD_DIR
+    unique: thêm tiền tố uuid - file được đọc sau (hàng đợi) không bị upload khác trùng tên ghi đè
+    """
+    if unique:
+        file_path = UPLOAD_DIR / f"{uuid.uuid4().hex}_{Path(file.filename).name}"
+    else:
+        file_path = UPLOAD_DIR / file.filename
+    with open(file_path, "wb") as buffer:
+        shutil.copyfileobj(file.file, buffer)
+    return file_path
+
+
+def check_jd_input(jd_text: Optional[str], job_id: Optional[int]):
+    """Cần jd_text hoặc job_id (job đã lưu, không phải extract lại JD)"""
+    if job_id is None and not (jd_text and jd_text.strip()):
+        raise HTTPException(status_code=400, detail="Thiếu mô tả công việc (jd_text) hoặc job_id")
+
+
 @router.post("/analyze")
-def analyze_cv(
+async def analyze_cv(
     file: UploadFile = File(...),
-    jd_text: str = Form(...)
+    jd_text: Optional[str] = Form(None),
+    job_id: Optional[int] = Form(None)
 ):
+    check_jd_input(jd_text, job_id)
+
     # 1. Save file
-    file_path = UPLOAD_DIR / file.filename
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    file_path = await run_in_threadpool(save_upload, file)
 
     # 2. Read CV
-    cv_text = read_cv(file_path)
+    try:
+        cv_text = await run_in_threadpool(read_cv_text, file_path)
+    except TimeoutError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     
     # Log CV text để debug 
     print(f"[CV] CV text preview (first 500 chars): {cv_text[:500]}")
     print(f"[CV] CV text total length: {len(cv_text)} characters")
     print(f"[CV] CV text has {len(cv_text.splitlines())} lines")
 
-    # 3. Extract from CV bằng AI 
-    ai_api_key = os.getenv("OPENAI_API_KEY") or os.getenv("ANTHROPIC_API_KEY") or os.getenv("GEMINI_API_KEY")
-    ai_provider = os.getenv("AI_PROVIDER", "gemini")
-    
-    if not ai_api_key:
-        raise HTTPException(
-            status_code=400,
-            detail="API key không được cấu hình. Vui lòng cấu hình OPENAI_API_KEY, ANTHROPIC_API_KEY hoặc GEMINI_API_KEY"
-        )
-    
-    print(f"[AI] Using {ai_provider.upper()} AI for CV extraction...")
-    print(f"[AI] CV text length: {len(cv_text)} characters")
-    
-    # Extract bằng AI
     try:
-        ai_result = extract_with_ai(cv_text, ai_api_key, ai_provider)
-    except Exception as e:
-        error_msg = str(e)
-        print(f"[AI] Error during extraction: {error_msg}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Lỗi khi trích xuất thông tin từ CV: {error_msg}"
-        )
-    
-    if not ai_result:
-        raise HTTPException(
-            status_code=500,
-            detail="Không thể trích xuất thông tin từ CV. Vui lòng kiểm tra API key và thử lại."
-        )
-    
-    # Clean và validate kết quả AI
-    cleaned_result = clean_ai_result(ai_result)
-    
-    print(f"[AI] AI extraction completed successfully!")
-    print(f"[AI] - Name: {cleaned_result.get('name', 'N/A')}")
-    print(f"[AI] - Email: {cleaned_result.get('email', 'N/A')}")
-    print(f"[AI] - Phone: {cleaned_result.get('phone', 'N/A')}")
-    print(f"[AI] - Address: {cleaned_result.get('address', 'N/A')}")
-    print(f"[AI] - Position: {cleaned_result.get('position', 'N/A')}")
-    print(f"[AI] - Years: {cleaned_result.get('years_experience', 0)}")
-    print(f"[AI] - Skills: {len(cleaned_result.get('skills', []))} items")
-    print(f"[AI] - Education: {len(cleaned_result.get('education', []))} items")
-    print(f"[AI] - Experiences: {len(cleaned_result.get('experiences', []))} items")
-    print(f"[AI] - Projects: {len(cleaned_result.get('projects', []))} items")
-    
-    # Lấy dữ liệu từ kết quả AI
-    name = cleaned_result.get("name") or "(Không xác định)"
-    email = cleaned_result.get("email")
-    phone = cleaned_result.get("phone")
-    date_of_birth = cleaned_result.get("date_of_birth")
-    address = cleaned_result.get("address")
-    social_links = cleaned_result.get("social_links") or []
-    education = cleaned_result.get("education") or []
-    candidate_skills = cleaned_result.get("skills") or []
-    candidate_years = cleaned_result.get("years_experience") or 0
-    summary = cleaned_result.get("summary") or ""
-    experiences = cleaned_result.get("experiences") or []
-    projects = cleaned_result.get("projects") or []
-
-    # 4. Extract JD bằng AI - để lấy vị trí chính xác
-    from app.services.ai_extractor import extract_jd_with_ai
-    from app.services.jd_extractor import extract_jd_requirements
-    
-    print(f"[JD] Bắt đầu extract JD - JD text length: {len(jd_text)}")
-    print(f"[JD] JD preview: {jd_text[:200]}...")
-    
-    # Ưu tiên dùng AI để extract JD
-    jd_requirements_ai = extract_jd_with_ai(jd_text, ai_api_key, ai_provider)
-    
-    # Nếu AI extract thành công, dùng kết quả AI; nếu không, fallback về regex
-    # Kiểm tra kỹ hơn: nếu có kết quả AI và position không rỗng
-    if jd_requirements_ai and isinstance(jd_requirements_ai, dict):
-        ai_position = jd_requirements_ai.get("position", "")
-        # Nếu AI extract được position (không rỗng, không null)
-        if ai_position and ai_position.strip() and ai_position.lower() != "null":
-            target_position = ai_position.strip()
-            required_years = jd_requirements_ai.get("years", 0)
-            required_skills = jd_requirements_ai.get("skills", [])
-            print(f"[JD-AI] ✓ Extract bằng AI - Position: '{target_position}', Years: {required_years}, Skills: {len(required_skills)}")
+        ai_api_key, ai_provider = get_ai_config()
+
+        if job_id is not None:
+            # 3. JD đã extract sẵn trong bảng jobs → chỉ còn 1 lời gọi AI cho CV
+            jd_info = await run_in_threadpool(load_job_info, job_id)
+            cv_info = await run_in_ai_executor(extract_cv_info, cv_text, ai_api_key, ai_provider)
         else:
-            # AI không extract được position, fallback về regex
-            print(f"[JD-AI] ❌ AI không extract được position (got: '{ai_position}'), fallback về regex...")
-            jd_requirements = extract_jd_requirements(jd_text)
-            target_position = jd_requirements.get("position", "")
-            required_years = jd_requirements.get("years", 0)
-            required_skills = jd_requirements.get("skills", [])
-            print(f"[JD-Regex] Fallback - Position: '{target_position}', Years: {required_years}, Skills: {len(required_skills)}")
-    else:
-        # AI không trả về kết quả, fallback về regex
-        print(f"[JD-AI] ❌ AI không trả về kết quả (got: {jd_requirements_ai}), fallback về regex...")
-        jd_requirements = extract_jd_requirements(jd_text)
-        target_position = jd_requirements.get("position", "")
-        required_years = jd_requirements.get("years", 0)
-        required_skills = jd_requirements.get("skills", [])
-        print(f"[JD-Regex] Fallback - Position: '{target_position}', Years: {required_years}, Skills: {len(required_skills)}")
-    
-    # Vị trí được lấy từ JD (mô tả công việc), không phải từ CV
-    candidate_position = target_position or "(Không rõ)"
-    print(f"[JD] Final candidate_position: '{candidate_position}'")
-
-    # 5. Match
-    match_result = match_cv_with_jd(
-        candidate_skills, 
-        required_skills,
-        candidate_position=candidate_position,
-        target_position=target_position,
-        candidate_years=candidate_years,
-        required_years=required_years
-    )
-    score = match_result.get("score", 0)
-
-    # 6. Save DB - Nếu trùng email thì xóa bản ghi cũ và tạo mới
-    db: Session = SessionLocal()
+            # 3 + 4. Extract CV và JD bằng AI - chạy song song
+            cv_info, jd_info = await extract_cv_and_jd(cv_text, jd_text, ai_api_key, ai_provider)
+
+        # 5. Match
+        candidate_position, score = score_cv(cv_info, jd_info)
+
+        # 6. Save DB
+        return await run_in_threadpool(save_cv, cv_info, jd_info, candidate_position, score)
+    except PipelineError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+
+# ================= ANALYZE BATCH =================
+@router.post("/analyze-batch")
+async def analyze_cv_batch_endpoint(
+    files: List[UploadFile] = File(...),
+    jd_text: Optional[str] = Form(None),
+    job_id: Optional[int] = Form(None)
+):
+    """
+    Phân tích nhiều CV với cùng một JD (jd_text hoặc job_id)
+    - JD chỉ extract một lần (hoặc lấy sẵn từ job)
+    - Trả về NDJSON: mỗi dòng là kết quả của một CV (theo thứ tự xử lý xong),
+      dòng cuối là tổng kết {"status": "done", ...}
+    """
+    check_jd_input(jd_text, job_id)
     try:
-        # Kiểm tra xem có CV nào với email này chưa
-        if email:
-            existing_cv = db.query(CV).filter(CV.email == email).first()
-            if existing_cv:
-                # Xóa bản ghi cũ
-                db.delete(existing_cv)
-                db.commit()
-                print(f"[DB] Đã xóa CV cũ với email: {email}")
-        
-        # Tạo CV mới
-        cv = CV(
-            name=name,
-            email=email,
-            phone=phone,
-            date_of_birth=date_of_birth,
-            address=address,
-            social_links=json.dumps(social_links, ensure_ascii=False) if social_links else None,
-            education=json.dumps(education, ensure_ascii=False) if education else None,
-
-            candidate_position=candidate_position,
-            candidate_years=candidate_years,
-            candidate_skills=json.dumps(candidate_skills, ensure_ascii=False) if candidate_skills else None,
-
-            target_position=target_position,
-            required_years=required_years,
-            required_skills=json.dumps(required_skills, ensure_ascii=False) if required_skills else None,
-
-            summary=summary,
-            experiences=json.dumps(experiences, ensure_ascii=False) if experiences else None,
-            projects=json.dumps(projects, ensure_ascii=False) if projects else None,
-
-            score=score
-        )
-        db.add(cv)
-        db.commit()
-        db.refresh(cv)
-        message = "CV analyzed successfully"
-        
-        return {
-            "id": cv.id,
-            "name": cv.name,
-            "candidate_position": cv.candidate_position,
-            "score": cv.score,
-            "message": message
-        }
-    except Exception as e:
-        db.rollback()
-        error_msg = str(e)
-        print(f"[ERROR] Lỗi khi lưu CV vào database: {error_msg}")
-        import traceback
-        traceback.print_exc()
-        # Kiểm tra nếu là lỗi database
-        if "disk I/O error" in error_msg or "OperationalError" in error_msg:
-            raise HTTPException(
-                status_code=500,
-                detail="Lỗi truy cập database. Vui lòng thử lại sau."
-            )
-        raise HTTPException(
-            status_code=500,
-            detail=f"Lỗi khi lưu CV: {error_msg}"
-        )
-    finally:
-        db.close()
+        ai_api_key, ai_provider = get_ai_config()
+        if job_id is not None:
+            jd_info = await run_in_threadpool(load_job_info, job_id)
+    except PipelineError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+    # Lưu hết file trước khi stream (UploadFile bị đóng khi request kết thúc)
+    # Tên riêng cho từng file: nhiều CV trong cùng batch thường trùng tên (VD: "CV.pdf")
+    file_paths = [await run_in_threadpool(save_upload, file, True) for file in files]
+    filenames = [file.filename for file in files]
+    print(f"[Batch] Nhận {len(file_paths)} CV")
+
+    if job_id is None:
+        jd_info = await run_in_ai_executor(extract_jd_info, jd_text, ai_api_key, ai_provider)
+
+    async def stream():
+        succeeded = 0
+        async for result in analyze_cv_batch(file_paths, jd_info, ai_api_key, ai_provider, filenames=filenames):
+            if result["status"] == "ok":
+                succeeded += 1
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+        yield json.dumps({
+            "status": "done",
+            "total": len(file_paths),
+            "succeeded": succeeded,
+            "failed": len(file_paths) - succeeded,
+            "target_position": jd_info.get("position") or "",
+        }, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+# ================= ANALYZE QUEUE =================
+@router.post("/jobs", status_code=202)
+async def submit_analysis_job(
+    file: UploadFile = File(...),
+    jd_text: Optional[str] = Form(None),
+    job_id: Optional[int] = Form(None)
+):
+    """
+    Đưa CV vào hàng đợi phân tích nền, trả về id ngay
+    Poll kết quả qua GET /cv/jobs/{id}
+    """
+    check_jd_input(jd_text, job_id)
+    file_path = await run_in_threadpool(save_upload, file, True)
+    return await run_in_threadpool(analysis_queue.submit, file_path, jd_text, job_id, file.filename)
+
+
+@router.get("/jobs/{analysis_id}")
+def get_analysis_job(analysis_id: int):
+    """Trạng thái job: status (queued/running/done/failed), stage (reading/extracting/matching/saving) và kết quả"""
+    job = analysis_queue.get(analysis_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Không tìm thấy job phân tích với id {analysis_id}")
+    return job
+
+
+# ================= AI STATS =================
+@router.get("/ai-stats")
+def ai_stats():
+    """Thống kê cache trích xuất AI (hit/miss, số entry) và Gemini model đang dùng"""
+    return {
+        "extraction_cache": extraction_cache.stats(),
+        "gemini_model": gemini_registry.status(),
+        "analysis_queue": analysis_queue.stats(),
+        "db_writes": write_queue.stats(),
+        "vector_index": cv_vector_index.stats(),
+        "job_rankings": job_rankings.stats(),
+        "filter_index": cv_filter_index.stats(),
+        "llm_single_flight": llm_single_flight.stats(),
+        "llm_clients": llm_clients.stats(),
+        "llm_scheduler": llm_scheduler.stats()
+    }
 
 
 # ================= LIST =================
 @router.get("/list")
-def list_cvs():
-    """Lấy danh sách tất cả CV, sắp xếp theo điểm số"""
-    db = SessionLocal()
+def list_cvs(limit: int = PageLimit, cursor: Optional[str] = None, db: Session = Depends(get_read_db)):
+    """
+    Lấy danh sách CV, sắp xếp theo điểm số, mỗi lần một trang
+    Trả về {"items": [...], "next_cursor": ...} - truyền next_cursor vào cursor để lấy trang sau
+    """
     try:
-        cvs = db.query(CV).order_by(CV.score.desc(), CV.id.desc()).all()
-        
-        result = []
-        for cv in cvs:
-            result.append({
-                "id": cv.id,
-                "name": cv.name or "(Không xác định)",
-                "email": cv.email or "",
-                "phone": cv.phone or "",
-                "date_of_birth": cv.date_of_birth or None,
-                "address": cv.address or None,
-                "social_links": safe_json_loads(cv.social_links),
-                "education": safe_json_loads(cv.education),
-                "position": cv.candidate_position or "(Không rõ)",
-                "candidate_position": cv.candidate_position or "(Không rõ)",
-                "skills": safe_json_loads(cv.candidate_skills),
-                "years_experience": cv.candidate_years or 0,
-                "years": cv.candidate_years or 0,
-                "summary": cv.summary or "",
-                "experiences": safe_json_loads(cv.experiences),
-                "projects": safe_json_loads(cv.projects),
-                "score": float(cv.score) if cv.score else 0.0
-            })
-        
-        return result
+        cvs, next_cursor = paginate_cvs(db.query(CV).options(SUMMARY_COLUMNS), limit, cursor)
+        return {"items": [cv_summary_to_dict(cv) for cv in cvs], "next_cursor": next_cursor}
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"[ERROR] Lỗi khi lấy danh sách CV: {e}")
         import traceback
         traceback.print_exc()
         db.rollback()
         # Trả về danh sách rỗng thay vì throw exception
-        return []
-    finally:
-        db.close()
+        return {"items": [], "next_cursor": None}
 
 
 # ================= FILTER ADVANCED =================
@@ -271,64 +298,81 @@ def list_cvs():
 def filter_advanced(
     position: str = "",
     min_years: int = 0,
-    skill: str = ""
+    skill: str = "",
+    skill_mode: str = "all",
+    limit: int = PageLimit,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db)
 ):
-    db = SessionLocal()
-    query = db.query(CV)
-
-    if position:
-        p = position.lower().strip()
-        if p:
-            # Tìm trong candidate_position hoặc target_position (vị trí từ JD)
-            query = query.filter(
-                or_(
-                    CV.candidate_position.ilike(f"%{p}%"),
-                    CV.target_position.ilike(f"%{p}%")
-                )
-            )
+    """
+    skill: một hoặc nhiều kỹ năng, cách nhau bằng dấu phẩy (VD: "aws, docker")
+    skill_mode: "all" - có đủ mọi kỹ năng, "any" - có ít nhất một kỹ năng
+    """
+    if skill_mode not in ("all", "any"):
+        raise HTTPException(status_code=400, detail="skill_mode phải là 'all' hoặc 'any'")
 
-    if min_years and min_years > 0:
-        query = query.filter(CV.candidate_years >= min_years)
+    query = db.query(CV).options(SUMMARY_COLUMNS)
+    p = position.lower().strip() if position else ""
+    skills = skill.split(",") if skill else []
 
-    if skill:
-        s = skill.lower().strip()
-        if s:
-            # Tìm trong candidate_skills (JSON string)
-            query = query.filter(CV.candidate_skills.ilike(f"%{s}%"))
+    # Kỹ năng / số năm lọc bằng chỉ mục ngược; vị trí luôn tìm chuỗi con bằng ilike
+    ids = indexed_candidate_ids(skills, skill_mode == "all", min_years)
+    if ids is not None:
+        if not len(ids):
+            return {"items": [], "next_cursor": None}
+        query = query.filter(CV.id.in_(ids.tolist()))
 
-    try:
-        cvs = query.order_by(CV.score.desc(), CV.id.desc()).all()
-        
-        result = []
-        for cv in cvs:
-            result.append({
-                "id": cv.id,
-                "name": cv.name or "(Không xác định)",
-                "email": cv.email or "",
-                "phone": cv.phone or "",
-                "date_of_birth": cv.date_of_birth or None,
-                "address": cv.address or None,
-                "social_links": safe_json_loads(cv.social_links),
-                "education": safe_json_loads(cv.education),
-                "position": cv.candidate_position or "(Không rõ)",
-                "candidate_position": cv.candidate_position or "(Không rõ)",
-                "skills": safe_json_loads(cv.candidate_skills),
-                "years_experience": cv.candidate_years or 0,
-                "years": cv.candidate_years or 0,
-                "summary": cv.summary or "",
-                "experiences": safe_json_loads(cv.experiences),
-                "projects": safe_json_loads(cv.projects),
-                "score": float(cv.score) if cv.score else 0.0
-            })
-        
-        return result
-    finally:
-        db.close()
+    if p:
+        # Tìm trong candidate_position hoặc target_position (vị trí từ JD)
+        query = query.filter(
+            or_(
+                CV.candidate_position.ilike(f"%{p}%"),
+                CV.target_position.ilike(f"%{p}%")
+            )
+        )
+
+    if ids is None:
+        if min_years and min_years > 0:
+            query = query.filter(CV.candidate_years >= min_years)
+        if skills:
+            query = filter_by_skills(query, skills, match_all=(skill_mode == "all"))
+
+    cvs, next_cursor = paginate_cvs(query, limit, cursor)
+    return {"items": [cv_summary_to_dict(cv) for cv in cvs], "next_cursor": next_cursor}
 
 
 # ================= SEARCH NATURAL LANGUAGE =================
+# Từ khóa vị trí nhận diện trong câu tìm kiếm
+SEARCH_POSITION_KEYWORDS = [
+    # Business & Analysis
+    "business analyst", "ba", "business analysis", "functional analyst",
+    "data analyst", "data analysis", "business intelligence", "bi analyst",
+    # Engineering
+    "data engineer", "data engineering", "etl engineer", "big data engineer",
+    "backend engineer", "backend developer", "server developer", "api developer",
+    "frontend engineer", "frontend developer", "ui developer", "web developer",
+    "fullstack", "full stack", "full-stack engineer", "full-stack developer",
+    "ai engineer", "ml engineer", "machine learning engineer", "deep learning engineer",
+    "devops engineer", "devops", "sre", "site reliability engineer",
+    "software engineer", "software developer", "developer", "programmer",
+    "mobile developer", "ios developer", "android developer",
+    # Management
+    "product manager", "pm", "product owner",
+    "project manager", "project management", "scrum master",
+    # Other
+    "qa engineer", "qa", "quality assurance", "test engineer", "tester",
+    "system analyst", "systems analyst", "it analyst",
+]
+
+# Từ khóa vị trí + alias kỹ năng, biên dịch một lần: ("position", keyword) / ("skill", skill id)
+QUERY_SCANNER = KeywordScanner({
+    **{alias: ("skill", skill_id) for alias, skill_id in SKILL_ALIASES.items()},
+    **{keyword: ("position", keyword) for keyword in SEARCH_POSITION_KEYWORDS},
+})
+
+
 @router.get("/search")
-def search_cvs(query: str = ""):
+def search_cvs(query: str = "", limit: int = PageLimit, cursor: Optional[str] = None, db: Session = Depends(get_read_db)):
     """
     Tìm kiếm CV bằng ngôn ngữ tự nhiên
     Ví dụ: "có 3 năm kn data engineer, biết aws"
@@ -340,10 +384,9 @@ def search_cvs(query: str = ""):
     import re
     
     if not query:
-        return []
+        return {"items": [], "next_cursor": None}
     
-    db = SessionLocal()
-    query_obj = db.query(CV)
+    query_obj = db.query(CV).options(SUMMARY_COLUMNS)
     
     query_lower = query.lower()
     
@@ -365,57 +408,13 @@ def search_cvs(query: str = ""):
             except:
                 continue
     
-    # Trích xuất vị trí - mở rộng keywords với nhiều vị trí
-    position_keywords = [
-        # Business & Analysis
-        "business analyst", "ba", "business analysis", "functional analyst",
-        "data analyst", "data analysis", "business intelligence", "bi analyst",
-        # Engineering
-        "data engineer", "data engineering", "etl engineer", "big data engineer",
-        "backend engineer", "backend developer", "server developer", "api developer",
-        "frontend engineer", "frontend developer", "ui developer", "web developer",
-        "fullstack", "full stack", "full-stack engineer", "full-stack developer",
-        "ai engineer", "ml engineer", "machine learning engineer", "deep learning engineer",
-        "devops engineer", "devops", "sre", "site reliability engineer",
-        "software engineer", "software developer", "developer", "programmer",
-        "mobile developer", "ios developer", "android developer",
-        # Management
-        "product manager", "pm", "product owner",
-        "project manager", "project management", "scrum master",
-        # Other
-        "qa engineer", "qa", "quality assurance", "test engineer", "tester",
-        "system analyst", "systems analyst", "it analyst",
-    ]
-    
-    found_position = None
-    # Ưu tiên match các keyword dài hơn trước (tránh match "analyst" khi tìm "business analyst")
-    for pos in sorted(position_keywords, key=len, reverse=True):
-        # Sử dụng word boundary để match chính xác hơn
-        pattern = r'\b' + re.escape(pos) + r'\b'
-        if re.search(pattern, query_lower):
-            found_position = pos
-            break
+    # Một lần quét query cho mọi từ khóa vị trí và alias kỹ năng
+    keywords = QUERY_SCANNER.scan(query_lower)
     
-    # Trích xuất kỹ năng - mở rộng danh sách và tìm từ "biết", "knows", "có"
-    skill_keywords = [
-        # Cloud & Infrastructure
-        "aws", "azure", "gcp", "docker", "kubernetes", "terraform", "jenkins",
-        # Programming Languages
-        "python", "java", "javascript", "typescript", "c++", "c#", "go", "rust",
-        "php", "ruby", "swift", "kotlin", "scala", "r",
-        # Web Frameworks
-        "react", "vue", "angular", "nodejs", "next.js", "fastapi", "django", 
-        "flask", "spring", "express", "nest.js",
-        # Databases
-        "sql", "mongodb", "postgresql", "mysql", "redis", "elasticsearch",
-        "cassandra", "dynamodb",
-        # Data & ML
-        "spark", "hadoop", "kafka", "airflow", "machine learning", 
-        "deep learning", "tensorflow", "pytorch", "pandas", "numpy",
-        # Tools
-        "git", "linux", "bash"
-    ]
+    # Trích xuất vị trí - ưu tiên keyword dài hơn (tránh match "analyst" khi tìm "business analyst")
+    found_position = max((value for kind, value in keywords if kind == "position"), key=len, default=None)
     
+    # Trích xuất kỹ năng theo danh mục kỹ năng (mọi alias) - tìm sau từ "biết", "knows", "có"
     found_skills = []
     
     # Pattern 1: Tìm skills sau các từ: "biết", "knows", "có", "có kinh nghiệm với"
@@ -427,28 +426,32 @@ def search_cvs(query: str = ""):
     for pattern in skill_patterns:
         matches = re.finditer(pattern, query_lower)
         for match in matches:
-            skill_text = match.group(1).strip()
-            # Tìm skill trong skill_text (ưu tiên match dài hơn trước)
-            for skill in sorted(skill_keywords, key=len, reverse=True):
-                if skill in skill_text and skill not in found_skills:
-                    found_skills.append(skill)
-                    break  # Chỉ lấy skill đầu tiên match trong đoạn text này
+            # Chỉ lấy skill đầu tiên match trong đoạn text này
+            skill_id = SKILL_SCANNER.first(match.group(1))
+            if skill_id is not None and skill_name(skill_id) not in found_skills:
+                found_skills.append(skill_name(skill_id))
     
     # Pattern 2: Tìm trực tiếp trong query (nếu không tìm thấy bằng pattern)
     if not found_skills:
-        # Ưu tiên match các skill dài hơn trước (tránh match "sql" trong "mysql")
-        for skill in sorted(skill_keywords, key=len, reverse=True):
-            # Sử dụng word boundary để tránh false positive
-            pattern = r'\b' + re.escape(skill) + r'\b'
-            if re.search(pattern, query_lower) and skill not in found_skills:
-                found_skills.append(skill)
+        found_skills = [skill_name(value) for kind, value in keywords if kind == "skill"]
     
-    # Áp dụng filter
-    if min_years > 0:
+    # Áp dụng filter - kỹ năng (OR) và số năm qua chỉ mục ngược nếu được
+    ids = indexed_candidate_ids(found_skills, False, min_years)
+    if ids is not None:
+        if not len(ids):
+            return {"items": [], "next_cursor": None}
+        query_obj = query_obj.filter(CV.id.in_(ids.tolist()))
+    elif min_years > 0:
         query_obj = query_obj.filter(CV.candidate_years >= min_years)
     
-    if found_position:
-        # Tìm kiếm linh hoạt: tìm trong position, skills, và cả experiences
+    rank = None
+    if found_position and fts_enabled():
+        # Tìm trong position, skills, experiences, summary qua chỉ mục FTS5, xếp theo độ liên quan (BM25)
+        fts = fts_phrase_matches(found_position)
+        query_obj = query_obj.join(fts, fts.c.cv_id == CV.id)
+        rank = fts.c.rank
+    elif found_position:
+        # Không có FTS5: tìm linh hoạt bằng ilike trên từng cột
         position_lower = found_position.lower()
         query_obj = query_obj.filter(
             or_(
@@ -460,40 +463,20 @@ def search_cvs(query: str = ""):
             )
         )
     
-    if found_skills:
+    if found_skills and ids is None:
         # Tìm CV có ít nhất một trong các skills
-        from sqlalchemy import func
-        conditions = []
-        for skill in found_skills:
-            conditions.append(CV.candidate_skills.ilike(f"%{skill}%"))
-        if conditions:
-            query_obj = query_obj.filter(or_(*conditions))
+        query_obj = filter_by_skills(query_obj, found_skills, match_all=False)
     
-    try:
-        cvs = query_obj.order_by(CV.score.desc(), CV.id.desc()).all()
-        
-        result = []
-        for cv in cvs:
-            result.append({
-                "id": cv.id,
-                "name": cv.name or "(Không xác định)",
-                "email": cv.email or "",
-                "phone": cv.phone or "",
-                "date_of_birth": cv.date_of_birth or None,
-                "address": cv.address or None,
-                "social_links": safe_json_loads(cv.social_links),
-                "education": safe_json_loads(cv.education),
-                "position": cv.candidate_position or "(Không rõ)",
-                "candidate_position": cv.candidate_position or "(Không rõ)",
-                "skills": safe_json_loads(cv.candidate_skills),
-                "years_experience": cv.candidate_years or 0,
-                "years": cv.candidate_years or 0,
-                "summary": cv.summary or "",
-                "experiences": safe_json_loads(cv.experiences),
-                "projects": safe_json_loads(cv.projects),
-                "score": float(cv.score) if cv.score else 0.0
-            })
-        
-        return result
-    finally:
-        db.close()
+    cvs, next_cursor = paginate_cvs(query_obj, limit, cursor, rank=rank)
+    return {"items": [cv_summary_to_dict(cv) for cv in cvs], "next_cursor": next_cursor}
+
+
+# ================= DETAIL =================
+# Đặt cuối file: /{cv_id} không được che các route cố định như /list, /search
+@router.get("/{cv_id}")
+def get_cv(cv_id: int, db: Session = Depends(get_read_db)):
+    """Thông tin đầy đủ của một CV (học vấn, kinh nghiệm, dự án, mạng xã hội...)"""
+    cv = db.query(CV).filter(CV.id == cv_id).first()
+    if not cv:
+        raise HTTPException(status_code=404, detail=f"Không tìm thấy CV với id {cv_id}")
+    return cv_to_dict(cv)
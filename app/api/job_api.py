@@ -0,0 +1,163 @@
+from fastapi import APIRouter, Form, HTTPException, Depends, Query
+import json
+import time
+from datetime import datetime
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from starlette.concurrency import run_in_threadpool
+
+from app.api.cv_upload import safe_json_loads, cv_summary_to_dict, SUMMARY_COLUMNS
+from app.services.cv_pipeline import PipelineError, get_ai_config, extract_jd_info, run_in_ai_executor
+from app.models.database import get_read_db
+from app.models.write_queue import write_queue
+from app.models.job_model import Job
+from app.models.cv_model import CV
+from app.services.batch_matcher import CandidateBatch
+from app.services.vector_index import cv_vector_index
+from app.services.job_ranking import job_rankings, JOB_TOP_K
+from app.api.pagination import MAX_PAGE_SIZE
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+# ================= HELPER =================
+def job_to_dict(job: Job, include_jd_text: bool = False) -> dict:
+    data = {
+        "id": job.id,
+        "position": job.position or "",
+        "required_years": job.required_years or 0,
+        "required_skills": safe_json_loads(job.required_skills),
+        "requirements": safe_json_loads(job.requirements),
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+    }
+    if include_jd_text:
+        data["jd_text"] = job.jd_text or ""
+    return data
+
+
+def save_job(jd_text: str, jd_info: dict) -> dict:
+    skills = jd_info.get("skills") or []
+    requirements = jd_info.get("requirements") or []
+
+    def write(db: Session) -> dict:
+        job = Job(
+            jd_text=jd_text,
+            position=jd_info.get("position") or "",
+            required_years=jd_info.get("years") or 0,
+            required_skills=json.dumps(skills, ensure_ascii=False) if skills else None,
+            requirements=json.dumps(requirements, ensure_ascii=False) if requirements else None,
+        )
+        db.add(job)
+        db.flush()
+        return job_to_dict(job)
+
+    try:
+        return write_queue.run(write)
+    except Exception as e:
+        print(f"[ERROR] Lỗi khi lưu job: {e}")
+        raise HTTPException(status_code=500, detail=f"Lỗi khi lưu job: {e}")
+
+
+# ================= CREATE =================
+@router.post("")
+async def create_job(jd_text: str = Form(...)):
+    """Tạo job từ JD - yêu cầu được extract một lần và lưu lại để phân tích CV theo job_id"""
+    if not jd_text.strip():
+        raise HTTPException(status_code=400, detail="Thiếu mô tả công việc")
+    try:
+        ai_api_key, ai_provider = get_ai_config()
+    except PipelineError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+    jd_info = await run_in_ai_executor(extract_jd_info, jd_text, ai_api_key, ai_provider)
+    return await run_in_threadpool(save_job, jd_text, jd_info)
+
+
+# ================= LIST =================
+@router.get("")
+def list_jobs(db: Session = Depends(get_read_db)):
+    jobs = db.query(Job).order_by(Job.id.desc()).all()
+    return [job_to_dict(job) for job in jobs]
+
+
+# ================= DETAIL =================
+@router.get("/{job_id}")
+def get_job(job_id: int, db: Session = Depends(get_read_db)):
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Không tìm thấy job với id {job_id}")
+    return job_to_dict(job, include_jd_text=True)
+
+
+# ================= RESCORE =================
+@router.post("/{job_id}/rescore")
+def rescore_job(job_id: int, db: Session = Depends(get_read_db)):
+    """
+    Chấm lại điểm mọi CV của job theo yêu cầu hiện tại của job (batch matcher, một lượt cho cả tập CV)
+    Chỉ ghi lại các CV có điểm thay đổi
+    """
+    started = time.perf_counter()
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Không tìm thấy job với id {job_id}")
+
+    rows = (
+        db.query(CV.id, CV.candidate_skills, CV.candidate_position, CV.candidate_years, CV.score)
+        .filter(CV.job_id == job_id)
+        .all()
+    )
+    batch = CandidateBatch(
+        [safe_json_loads(row.candidate_skills) for row in rows],
+        [row.candidate_position for row in rows],
+        [row.candidate_years for row in rows],
+    )
+    scores = batch.score(safe_json_loads(job.required_skills), job.position or "", job.required_years or 0)["score"]
+    updated_at = datetime.utcnow()
+    changed = [
+        {"id": row.id, "score": score, "updated_at": updated_at}
+        for row, score in zip(rows, scores.tolist())
+        if row.score != score
+    ]
+    if changed:
+        write_queue.run(lambda write_db: write_db.execute(update(CV), changed))
+        # Không dựng heap từ các dòng đọc ở trên: CV lưu chen vào trong lúc chấm sẽ bị mất → nạp lại từ DB
+        job_rankings.invalidate(job_id)
+
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+    print(f"[Rescore] Job #{job_id}: {len(rows)} CV, {len(changed)} thay đổi, {elapsed_ms} ms")
+    return {"job_id": job_id, "rescored": len(rows), "changed": len(changed), "elapsed_ms": elapsed_ms}
+
+
+# ================= SIMILAR CVs =================
+@router.get("/{job_id}/similar")
+def similar_cvs(job_id: int, k: int = Query(10, ge=1, le=MAX_PAGE_SIZE), db: Session = Depends(get_read_db)):
+    """
+    k CV có nội dung (vị trí, kỹ năng, giới thiệu, kinh nghiệm, dự án) gần với JD nhất
+    Theo chỉ mục vector trong bộ nhớ, không phụ thuộc điểm keyword đã chấm
+    """
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Không tìm thấy job với id {job_id}")
+
+    jd_text = "\n".join([job.position or "", " ".join(safe_json_loads(job.required_skills)), job.jd_text or ""])
+    matches = cv_vector_index.top_k(jd_text, k)
+    cvs = {cv.id: cv for cv in db.query(CV).options(SUMMARY_COLUMNS).filter(CV.id.in_([cv_id for cv_id, _ in matches]))}
+
+    items = []
+    for cv_id, similarity in matches:
+        if cv_id in cvs:
+            items.append({**cv_summary_to_dict(cvs[cv_id]), "similarity": similarity})
+    return {"job_id": job_id, "items": items}
+
+
+# ================= SHORTLIST =================
+@router.get("/{job_id}/top")
+def top_cvs(job_id: int, k: int = Query(10, ge=1, le=JOB_TOP_K), db: Session = Depends(get_read_db)):
+    """k CV điểm cao nhất của job - lấy từ top-K giữ sẵn trong bộ nhớ, chỉ đọc k CV theo id"""
+    if not db.query(Job.id).filter(Job.id == job_id).first():
+        raise HTTPException(status_code=404, detail=f"Không tìm thấy job với id {job_id}")
+
+    ranked = job_rankings.top(job_id, k)
+    cvs = {cv.id: cv for cv in db.query(CV).options(SUMMARY_COLUMNS).filter(CV.id.in_([cv_id for cv_id, _ in ranked]))}
+    return {"job_id": job_id, "items": [cv_summary_to_dict(cvs[cv_id]) for cv_id, _ in ranked if cv_id in cvs]}
@@ -0,0 +1,97 @@
+"""
+Phân trang keyset (cursor) cho danh sách CV
+- Thứ tự: score DESC (NULL cuối), id DESC - giống thứ tự cũ của /cv/list
+- Cursor = giá trị sort key của dòng cuối trang trước → trang sau chỉ đọc limit + 1 dòng,
+  không OFFSET, thời gian không phụ thuộc số CV đã lưu
+- Có thể thêm một cột xếp hạng đứng trước (VD: rank BM25 của /cv/search, tăng dần)
+"""
+import base64
+import json
+from typing import Any, List, Optional, Tuple
+
+from fastapi import HTTPException, Query
+from sqlalchemy import and_, or_
+
+from app.models.cv_model import CV
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Dùng làm tham số endpoint: limit: int = PageLimit, cursor: Optional[str] = None
+PageLimit = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+
+
+def encode_cursor(values: List[Any]) -> str:
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception:
+        values = None
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="cursor không hợp lệ")
+    return values
+
+
+def _after_score_id(score: Optional[float], cv_id: int):
+    """Điều kiện 'đứng sau (score, id)' theo thứ tự score DESC NULLS LAST, id DESC"""
+    if score is None:
+        return and_(CV.score.is_(None), CV.id < cv_id)
+    return or_(
+        CV.score < score,
+        and_(CV.score == score, CV.id < cv_id),
+        CV.score.is_(None)
+    )
+
+
+def _page_by_score(query, limit: int, cursor: Optional[str]) -> Tuple[List[CV], Optional[str]]:
+    """
+    Chia 2 đoạn để mỗi truy vấn đi thẳng trên index (score DESC, id DESC) - không có OR ... IS NULL:
+    các CV có điểm trước, nếu trang chưa đủ thì lấy tiếp các CV chưa có điểm (score NULL)
+    """
+    score, cv_id = decode_cursor(cursor, 2) if cursor else (None, None)
+    rows = []
+    if not (cursor and score is None):
+        scored = query.filter(CV.score.isnot(None))
+        if cursor:
+            scored = scored.filter(CV.score <= score, or_(CV.score < score, CV.id < cv_id))
+        rows = scored.order_by(CV.score.desc(), CV.id.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        unscored = query.filter(CV.score.is_(None))
+        if cursor and score is None:
+            unscored = unscored.filter(CV.id < cv_id)
+        rows += unscored.order_by(CV.id.desc()).limit(limit + 1 - len(rows)).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return rows, (encode_cursor([rows[-1].score, rows[-1].id]) if has_more else None)
+
+
+def paginate_cvs(query, limit: int, cursor: Optional[str] = None, rank=None) -> Tuple[List[CV], Optional[str]]:
+    """
+    Lấy một trang CV từ query, trả về (danh sách CV, cursor trang sau hoặc None)
+    rank: cột xếp hạng (tăng dần) đứng trước score, id - cursor khi đó gồm cả rank
+    """
+    if rank is None:
+        return _page_by_score(query, limit, cursor)
+
+    # Xếp theo rank (VD: BM25 của FTS) - tập kết quả đã được lọc bởi chỉ mục full-text
+    if cursor:
+        last_rank, score, cv_id = decode_cursor(cursor, 3)
+        query = query.filter(or_(rank > last_rank, and_(rank == last_rank, _after_score_id(score, cv_id))))
+    rows = (
+        query.add_columns(rank)
+        .order_by(rank, CV.score.desc().nulls_last(), CV.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    cvs = [cv for cv, _ in rows]
+    next_cursor = encode_cursor([rows[-1][1], cvs[-1].score, cvs[-1].id]) if has_more else None
+    return cvs, next_cursor
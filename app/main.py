@@ -2,14 +2,47 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
+from contextlib import asynccontextmanager
 import os
 
 from app.api.cv_upload import router as cv_router
+from app.api.job_api import router as job_router
 from app.models.database import engine, Base
+from app.models.cv_search import setup_cv_fts
+from app.models.migrations import run_migrations
+from app.models.write_queue import write_queue
+from app.services.gemini_registry import gemini_registry
+from app.services.analysis_queue import analysis_queue
+from app.services.cv_reader import shutdown_pdf_pool
+from app.services.vector_index import cv_vector_index
+from app.services.filter_index import cv_filter_index
+from app.services.llm_clients import llm_clients
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # ✅ Resolve Gemini model sẵn ở background để request đầu không phải probe
+    gemini_api_key = os.getenv("GEMINI_API_KEY")
+    if os.getenv("AI_PROVIDER", "gemini").lower() == "gemini" and gemini_api_key:
+        gemini_registry.warm_up(gemini_api_key)
+    # ✅ Worker phân tích CV chạy nền
+    analysis_queue.start()
+    # ✅ Chỉ mục vector cho /jobs/{id}/similar (nạp từ file + đồng bộ với DB)
+    cv_vector_index.load()
+    # ✅ Chỉ mục ngược kỹ năng / số năm cho /cv/filter-advanced và /cv/search
+    cv_filter_index.load()
+    yield
+    analysis_queue.stop()
+    write_queue.stop()
+    cv_vector_index.save()
+    shutdown_pdf_pool()
+    await llm_clients.aclose()
+
 
 app = FastAPI(
     title="AI Recruitment System",
-    version="1.0"
+    version="1.0",
+    lifespan=lifespan
 )
 
 # ✅ CORS – BẮT BUỘC
@@ -23,10 +56,15 @@ app.add_middleware(
 
 # ✅ Tạo bảng DB
 Base.metadata.create_all(bind=engine)
+# ✅ Cập nhật schema của DB cũ (cột, bảng, index mới)
+run_migrations(engine)
+# ✅ Chỉ mục full-text cho /cv/search (chỉ SQLite có FTS5)
+setup_cv_fts(engine)
 
 # ✅ Router API - phải đặt trước static files
 # Router đã có prefix="/cv" trong định nghĩa, không cần thêm prefix nữa
 app.include_router(cv_router)
+app.include_router(job_router)
 
 # ✅ Serve static files từ frontend
 frontend_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "frontend")
@@ -1,5 +1,8 @@
-from sqlalchemy import Column, Integer, String, Text, Float
+from sqlalchemy import Column, Integer, String, Text, Float, DateTime, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from datetime import datetime
 from app.models.database import Base
+from app.models.job_model import Job  # noqa: F401 - đăng ký bảng jobs cho ForeignKey
 
 class CV(Base):
     __tablename__ = "cvs"
@@ -27,9 +30,36 @@ class CV(Base):
     projects = Column(Text)                     # JSON - Dự án (PROJECTS)
 
     # ===== YÊU CẦU TUYỂN (JD) =====
+    # CV phân tích theo job đã lưu chỉ giữ job_id, yêu cầu nằm ở bảng jobs
+    job_id = Column(Integer, ForeignKey("jobs.id"), index=True)
     target_position = Column(String)
     required_years = Column(Integer)
     required_skills = Column(Text)              # JSON
 
     # ===== KẾT QUẢ ĐÁNH GIÁ =====
     score = Column(Float)
+
+    # Lần ghi cuối (tạo / chấm lại) - mốc để process khác biết top-K của job đã cũ
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Kỹ năng đã chuẩn hóa - dùng để lọc (candidate_skills giữ nguyên để hiển thị)
+    skill_entries = relationship("CVSkill", cascade="all, delete-orphan")
+
+    # Giống migration 0004, 0006 (DB mới được tạo bằng create_all)
+    __table_args__ = (
+        Index("ix_cvs_score_id", score.desc(), id.desc()),
+        Index("ix_cvs_candidate_years", candidate_years),
+        Index("ix_cvs_email", email),
+        Index("ix_cvs_job_id_updated_at", job_id, updated_at),
+    )
+
+
+class CVSkill(Base):
+    """Bảng nối CV - kỹ năng: mỗi dòng là một kỹ năng (key chuẩn hóa) của một CV"""
+    __tablename__ = "cv_skills"
+
+    cv_id = Column(Integer, ForeignKey("cvs.id", ondelete="CASCADE"), primary_key=True)
+    skill = Column(String, primary_key=True)
+
+    # Lọc theo kỹ năng: tìm theo skill rồi lấy cv_id ngay trên index
+    __table_args__ = (Index("ix_cv_skills_skill_cv_id", "skill", "cv_id"),)
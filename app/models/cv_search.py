@@ -0,0 +1,94 @@
+"""
+Chỉ mục full-text (SQLite FTS5) cho tìm kiếm CV
+- Bảng cvs_fts (rowid = cvs.id) gồm các cột text lớn mà /cv/search tìm trong đó
+- Trigger trên bảng cvs giữ chỉ mục luôn đồng bộ khi insert/update/delete
+- Không phân biệt dấu tiếng Việt: tokenizer unicode61 remove_diacritics 2,
+  riêng "đ"/"Đ" không phải dấu nên được đổi thành "d"/"D" trước khi index
+- Kết quả xếp theo BM25 (vị trí khớp được tính trọng số cao hơn mô tả)
+"""
+from sqlalchemy import text, Integer, Float
+from sqlalchemy.engine import Engine
+
+
+FTS_COLUMNS = ["candidate_position", "inferred_position", "candidate_skills", "experiences", "summary"]
+# Trọng số BM25 theo thứ tự FTS_COLUMNS
+FTS_WEIGHTS = [10.0, 5.0, 2.0, 1.0, 1.0]
+
+_fts_enabled = False
+
+
+def fold_text(value: str) -> str:
+    """Chuẩn hóa giống dữ liệu đã index (đ → d), phần dấu còn lại do tokenizer bỏ"""
+    return value.replace("đ", "d").replace("Đ", "D")
+
+
+def _folded(prefix: str) -> str:
+    return ", ".join(
+        f"replace(replace(coalesce({prefix}.{col}, ''), 'đ', 'd'), 'Đ', 'D')" for col in FTS_COLUMNS
+    )
+
+
+def setup_cv_fts(engine: Engine) -> bool:
+    """
+    Tạo bảng FTS + trigger nếu chưa có và index các CV chưa được index
+    Trả về False nếu DB không phải SQLite hoặc SQLite không có FTS5 (tìm kiếm dùng ilike như cũ)
+    """
+    global _fts_enabled
+    if engine.dialect.name != "sqlite":
+        _fts_enabled = False
+        return False
+
+    columns = ", ".join(FTS_COLUMNS)
+    try:
+        with engine.begin() as conn:
+            conn.exec_driver_sql(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS cvs_fts USING fts5({columns}, "
+                "tokenize = 'unicode61 remove_diacritics 2')"
+            )
+            conn.exec_driver_sql(
+                "CREATE TRIGGER IF NOT EXISTS cvs_fts_insert AFTER INSERT ON cvs BEGIN "
+                f"INSERT INTO cvs_fts (rowid, {columns}) VALUES (new.id, {_folded('new')}); END"
+            )
+            conn.exec_driver_sql(
+                "CREATE TRIGGER IF NOT EXISTS cvs_fts_delete AFTER DELETE ON cvs BEGIN "
+                "DELETE FROM cvs_fts WHERE rowid = old.id; END"
+            )
+            # Chỉ index lại khi cột text thay đổi (không chạy khi chấm lại điểm)
+            conn.exec_driver_sql("DROP TRIGGER IF EXISTS cvs_fts_update")
+            conn.exec_driver_sql(
+                f"CREATE TRIGGER cvs_fts_update AFTER UPDATE OF {columns} ON cvs BEGIN "
+                "DELETE FROM cvs_fts WHERE rowid = old.id; "
+                f"INSERT INTO cvs_fts (rowid, {columns}) VALUES (new.id, {_folded('new')}); END"
+            )
+            # CV có từ trước khi tạo chỉ mục
+            indexed = conn.exec_driver_sql(
+                f"INSERT INTO cvs_fts (rowid, {columns}) SELECT cvs.id, {_folded('cvs')} FROM cvs "
+                "WHERE cvs.id NOT IN (SELECT rowid FROM cvs_fts)"
+            ).rowcount
+        if indexed:
+            print(f"[FTS] Đã index {indexed} CV")
+        _fts_enabled = True
+    except Exception as e:
+        print(f"[FTS] Không tạo được chỉ mục full-text, dùng tìm kiếm ilike: {e}")
+        _fts_enabled = False
+    return _fts_enabled
+
+
+def fts_enabled() -> bool:
+    return _fts_enabled
+
+
+def fts_phrase_matches(phrase: str):
+    """
+    Subquery (cv_id, rank) các CV khớp cụm từ phrase, rank càng nhỏ càng liên quan
+    Dùng để join với bảng cvs
+    """
+    # Cụm từ trong dấu ngoặc kép: các từ phải đứng liền nhau; " trong phrase được nhân đôi
+    match = '"' + fold_text(phrase).replace('"', '""') + '"'
+    weights = ", ".join(str(w) for w in FTS_WEIGHTS)
+    return (
+        text(f"SELECT rowid AS cv_id, bm25(cvs_fts, {weights}) AS rank FROM cvs_fts WHERE cvs_fts MATCH :match")
+        .bindparams(match=match)
+        .columns(cv_id=Integer, rank=Float)
+        .subquery("fts")
+    )
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from datetime import datetime
+from app.models.database import Base
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    # ===== MÔ TẢ CÔNG VIỆC (JD) =====
+    jd_text = Column(Text)                      # JD gốc
+
+    # ===== YÊU CẦU ĐÃ TRÍCH XUẤT (extract 1 lần khi tạo job) =====
+    position = Column(String)
+    required_years = Column(Integer)
+    required_skills = Column(Text)              # JSON
+    requirements = Column(Text)                 # JSON - Yêu cầu khác
+
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,154 @@
+"""
+Migration schema có version
+- Mỗi revision chạy đúng một lần, trong transaction riêng, và được ghi vào bảng schema_migrations
+- Chạy sau Base.metadata.create_all: DB mới đã có đủ bảng/cột nên các bước đều kiểm tra trước khi thêm,
+  DB cũ được bổ sung cột, bảng, index còn thiếu
+- Thêm revision mới vào cuối MIGRATIONS, không sửa revision đã phát hành
+- Chỉ dùng SQL chạy được trên cả SQLite và PostgreSQL
+"""
+import json
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+from app.services.skill_index import canonical_skill, canonical_skills
+
+
+def _add_columns(conn: Connection, table: str, columns: dict):
+    existing = {column["name"] for column in inspect(conn).get_columns(table)}
+    for name, ddl in columns.items():
+        if name not in existing:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+            print(f"[Migration] Thêm cột {table}.{name}")
+
+
+# ================= REVISIONS =================
+def _cv_profile_columns(conn: Connection):
+    _add_columns(conn, "cvs", {
+        "date_of_birth": "VARCHAR",
+        "address": "TEXT",
+        "social_links": "TEXT",
+        "education": "TEXT",
+    })
+
+
+def _cv_job_id(conn: Connection):
+    _add_columns(conn, "cvs", {"job_id": "INTEGER REFERENCES jobs(id)"})
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_cvs_job_id ON cvs (job_id)"))
+
+
+def _cv_skills(conn: Connection):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS cv_skills ("
+        "cv_id INTEGER NOT NULL REFERENCES cvs(id) ON DELETE CASCADE, "
+        "skill VARCHAR NOT NULL, "
+        "PRIMARY KEY (cv_id, skill))"
+    ))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_cv_skills_skill_cv_id ON cv_skills (skill, cv_id)"))
+
+    # Điền kỹ năng cho các CV lưu trước khi có bảng cv_skills
+    rows = conn.execute(text(
+        "SELECT id, candidate_skills FROM cvs "
+        "WHERE candidate_skills IS NOT NULL AND id NOT IN (SELECT cv_id FROM cv_skills)"
+    )).fetchall()
+    entries = []
+    for cv_id, skills_json in rows:
+        try:
+            skills = json.loads(skills_json)
+        except Exception:
+            continue
+        if isinstance(skills, list):
+            entries += [{"cv_id": cv_id, "skill": key} for key in canonical_skills(skills)]
+    if entries:
+        conn.execute(text("INSERT INTO cv_skills (cv_id, skill) VALUES (:cv_id, :skill)"), entries)
+        print(f"[Migration] Điền {len(entries)} kỹ năng cho {len(rows)} CV")
+
+
+def _cvs_hot_path_indexes(conn: Connection):
+    # Sắp xếp danh sách / phân trang keyset
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_cvs_score_id ON cvs (score DESC, id DESC)"))
+    # Lọc theo số năm kinh nghiệm
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_cvs_candidate_years ON cvs (candidate_years)"))
+    # Tìm CV trùng email mỗi lần lưu
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_cvs_email ON cvs (email)"))
+
+
+def _cv_skills_canonical_keys(conn: Connection):
+    # Key cũ chỉ là chữ thường ("reactjs", "react.js") → tên chuẩn trong danh mục kỹ năng ("react")
+    rows = conn.execute(text("SELECT cv_id, skill FROM cv_skills")).fetchall()
+    present = {(cv_id, skill) for cv_id, skill in rows}
+    stale, entries = [], []
+    for cv_id, skill in rows:
+        key = canonical_skill(skill)
+        if key == skill:
+            continue
+        stale.append({"cv_id": cv_id, "skill": skill})
+        if (cv_id, key) not in present:
+            present.add((cv_id, key))
+            entries.append({"cv_id": cv_id, "skill": key})
+    if stale:
+        conn.execute(text("DELETE FROM cv_skills WHERE cv_id = :cv_id AND skill = :skill"), stale)
+    if entries:
+        conn.execute(text("INSERT INTO cv_skills (cv_id, skill) VALUES (:cv_id, :skill)"), entries)
+    if stale:
+        print(f"[Migration] Chuẩn hóa {len(stale)} kỹ năng trong cv_skills")
+
+
+def _cv_updated_at(conn: Connection):
+    _add_columns(conn, "cvs", {"updated_at": "TIMESTAMP"})
+    # Mốc của top-K theo job: max(id), count, max(updated_at) đọc ngay trên index
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_cvs_job_id_updated_at ON cvs (job_id, updated_at)"))
+
+
+MIGRATIONS: List[Tuple[str, str, Callable[[Connection], None]]] = [
+    ("0001", "cvs: ngày sinh, địa chỉ, mạng xã hội, học vấn", _cv_profile_columns),
+    ("0002", "cvs.job_id tham chiếu bảng jobs", _cv_job_id),
+    ("0003", "bảng cv_skills + điền dữ liệu cho CV cũ", _cv_skills),
+    ("0004", "index cvs: (score, id), candidate_years, email", _cvs_hot_path_indexes),
+    ("0005", "cv_skills: key theo danh mục kỹ năng (alias → tên chuẩn)", _cv_skills_canonical_keys),
+    ("0006", "cvs.updated_at + index (job_id, updated_at)", _cv_updated_at),
+]
+
+
+# ================= RUNNER =================
+def applied_revisions(engine: Engine) -> List[str]:
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "revision VARCHAR PRIMARY KEY, "
+            "description VARCHAR, "
+            "applied_at TIMESTAMP NOT NULL)"
+        ))
+        return [row[0] for row in conn.execute(text("SELECT revision FROM schema_migrations"))]
+
+
+# Khóa dùng chung khi nhiều worker/host cùng khởi động trên một PostgreSQL
+MIGRATION_LOCK_KEY = 724201
+
+
+def run_migrations(engine: Engine) -> List[str]:
+    """Chạy các revision chưa áp dụng theo thứ tự, trả về danh sách revision vừa chạy"""
+    use_lock = engine.dialect.name == "postgresql"
+    with engine.connect() as lock_conn:
+        if use_lock:
+            lock_conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        try:
+            done = set(applied_revisions(engine))
+            applied = []
+            for revision, description, upgrade in MIGRATIONS:
+                if revision in done:
+                    continue
+                with engine.begin() as conn:
+                    upgrade(conn)
+                    conn.execute(
+                        text("INSERT INTO schema_migrations (revision, description, applied_at) VALUES (:revision, :description, :applied_at)"),
+                        {"revision": revision, "description": description, "applied_at": datetime.utcnow()}
+                    )
+                print(f"[Migration] ✓ {revision}: {description}")
+                applied.append(revision)
+            return applied
+        finally:
+            if use_lock:
+                lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
@@ -0,0 +1,160 @@
+"""
+Hàng đợi ghi DB - một writer thread duy nhất cho SQLite
+- SQLite chỉ cho một writer tại một thời điểm: nhiều thread cùng commit dễ gặp "database is locked"
+- Mọi thao tác ghi được đưa vào hàng đợi, writer gom các thao tác đang chờ và commit một lần
+  (mỗi lần commit là một lần fsync), thread gọi chờ kết quả sau khi commit xong
+- Một thao tác lỗi: rollback cả batch rồi chạy lại từng thao tác riêng để lỗi không lan sang thao tác khác
+- Với PostgreSQL (nhiều writer đồng thời được) thao tác ghi chạy trực tiếp trên thread gọi
+"""
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.database import SessionLocal, IS_SQLITE
+
+
+WRITE_BATCH_SIZE = int(os.getenv("DB_WRITE_BATCH_SIZE", "32"))
+# Sau thao tác đầu tiên, chờ thêm tối đa chừng này để gom batch
+WRITE_BATCH_WINDOW_SECONDS = float(os.getenv("DB_WRITE_BATCH_WINDOW_MS", "5")) / 1000
+
+WriteTask = Tuple[Callable[[Session], Any], Future]
+
+
+class WriteQueue:
+    def __init__(self, batch_size: int = WRITE_BATCH_SIZE, batch_window: float = WRITE_BATCH_WINDOW_SECONDS,
+                 enabled: bool = IS_SQLITE):
+        self.batch_size = max(1, batch_size)
+        self.batch_window = batch_window
+        self.enabled = enabled
+        self._queue: "queue.Queue[Optional[WriteTask]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.writes = 0
+
+    # ---------- public API ----------
+    def run(self, func: Callable[[Session], Any]) -> Any:
+        """
+        Chạy func(db) trong transaction ghi và trả về kết quả sau khi đã commit
+        func không được tự commit/rollback
+        """
+        if not self.enabled:
+            return self._run_direct(func)
+        return self.submit(func).result()
+
+    def submit(self, func: Callable[[Session], Any]) -> Future:
+        future: Future = Future()
+        self._ensure_started()
+        self._queue.put((func, future))
+        return future
+
+    def stop(self, timeout: float = 5.0):
+        """Xử lý nốt các thao tác đang chờ rồi dừng writer"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "pending": self._queue.qsize(),
+            "batches": self.batches,
+            "writes": self.writes,
+        }
+
+    # ---------- writer ----------
+    @staticmethod
+    def _run_direct(func: Callable[[Session], Any]) -> Any:
+        db = SessionLocal()
+        try:
+            result = func(db)
+            db.commit()
+            return result
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._writer_loop, name="db-writer", daemon=True)
+                self._thread.start()
+
+    def _next_batch(self) -> Tuple[List[WriteTask], bool]:
+        """Chờ thao tác đầu tiên, gom thêm các thao tác tới trong batch_window; trả về (batch, có lệnh dừng)"""
+        first = self._queue.get()
+        if first is None:
+            return [], True
+        batch = [first]
+        stopping = False
+        while len(batch) < self.batch_size:
+            try:
+                task = self._queue.get(timeout=self.batch_window)
+            except queue.Empty:
+                break
+            if task is None:
+                stopping = True
+                break
+            batch.append(task)
+        return batch, stopping
+
+    def _run_batch(self, batch: List[WriteTask]):
+        db = SessionLocal()
+        try:
+            try:
+                results = [func(db) for func, _ in batch]
+                db.commit()
+            except Exception:
+                db.rollback()
+                results = None
+
+            if results is not None:
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            else:
+                # Tách lỗi: mỗi thao tác một transaction
+                for func, future in batch:
+                    try:
+                        result = func(db)
+                        db.commit()
+                        future.set_result(result)
+                    except Exception as e:
+                        db.rollback()
+                        future.set_exception(e)
+        finally:
+            db.close()
+        self.batches += 1
+        self.writes += len(batch)
+
+    def _writer_loop(self):
+        while True:
+            batch, stopping = self._next_batch()
+            if batch:
+                try:
+                    self._run_batch(batch)
+                except Exception as e:
+                    # Lỗi ngoài thao tác (VD: không mở được session) - báo cho mọi thread đang chờ
+                    print(f"[DB] Lỗi writer: {e}")
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+            if stopping:
+                # Lệnh dừng tới khi đang gom batch: xử lý nốt phần còn lại trong hàng đợi
+                while True:
+                    try:
+                        task = self._queue.get_nowait()
+                    except queue.Empty:
+                        return
+                    if task is not None:
+                        self._run_batch([task])
+
+
+write_queue = WriteQueue()
@@ -7,6 +7,21 @@ import os
 import re
 from typing import Optional, Dict, Any
 
+from app.services.extraction_cache import extraction_cache
+from app.services.gemini_registry import gemini_registry
+from app.services.llm_clients import llm_clients
+from app.services.rate_limiter import is_rate_limit_error, llm_scheduler
+from app.services.single_flight import llm_single_flight
+from app.services.skill_index import normalize_skill_list
+
+# Tăng version khi thay đổi create_extraction_prompt để cache cũ không còn hiệu lực
+CV_PROMPT_VERSION = "cv-v1"
+
+# Ngân sách CV trong prompt: CV dài hơn HEAD + TAIL chỉ giữ phần đầu và phần cuối
+CV_HEAD_CHARS = 20000   # thông tin cá nhân, kinh nghiệm
+CV_TAIL_CHARS = 10000   # dự án, kỹ năng
+CV_SKIPPED_MARKER = "\n\n...[PHẦN GIỮA ĐÃ BỎ QUA]...\n\n"
+
 
 def extract_jd_with_ai(jd_text: str, api_key: Optional[str] = None, provider: str = "gemini") -> Dict[str, Any]:
     """
@@ -37,15 +52,10 @@ def extract_jd_with_ai(jd_text: str, api_key: Optional[str] = None, provider: st
     print(f"[JD-AI] Prompt length: {len(prompt)} ký tự")
     
     try:
-        if provider.lower() == "openai":
-            result = extract_with_openai(prompt, api_key)
-        elif provider.lower() == "anthropic":
-            result = extract_with_anthropic(prompt, api_key)
-        elif provider.lower() == "gemini":
-            result = extract_with_gemini(prompt, api_key)
-        else:
+        if provider.lower() not in PROVIDER_EXTRACTORS:
             print(f"[JD-AI] ❌ Provider không hợp lệ: {provider}")
             return {}
+        result = call_provider(provider, prompt, api_key)
         
         print(f"[JD-AI] Raw AI result: {result}")
         
@@ -156,7 +166,7 @@ def clean_jd_result(data: Dict[str, Any]) -> Dict[str, Any]:
     # Clean skills
     skills = data.get("skills", [])
     if isinstance(skills, list):
-        cleaned["skills"] = [str(s).strip() for s in skills if s and str(s).strip()]
+        cleaned["skills"] = normalize_skill_list(skills)
     else:
         cleaned["skills"] = []
     
@@ -189,31 +199,45 @@ def extract_with_ai(cv_text: str, api_key: Optional[str] = None, provider: str =
     if not api_key:
         return {}
     
+    # Cùng nội dung CV + provider + prompt version → dùng lại kết quả cũ, bỏ qua provider
+    cache_key = extraction_cache.make_key(cv_text, provider, CV_PROMPT_VERSION)
+    cached = extraction_cache.get(cache_key)
+    if cached is not None:
+        print(f"[Cache] HIT - dùng lại kết quả trích xuất ({cache_key[:12]})")
+        # Kết quả cache từ trước khi có danh mục kỹ năng: chuẩn hóa lại, không cần gọi lại provider
+        cached["skills"] = normalize_skill_list(cached.get("skills") or [])
+        return cached
+    print(f"[Cache] MISS - gọi {provider.upper()} ({cache_key[:12]})")
+    
     # Tạo prompt cho AI
     prompt = create_extraction_prompt(cv_text)
     
     try:
-        if provider.lower() == "openai":
-            return extract_with_openai(prompt, api_key)
-        elif provider.lower() == "anthropic":
-            return extract_with_anthropic(prompt, api_key)
-        elif provider.lower() == "gemini":
-            return extract_with_gemini(prompt, api_key)
-        else:
+        if provider.lower() not in PROVIDER_EXTRACTORS:
             return {}
+        result = call_provider(provider, prompt, api_key)
     except Exception as e:
         print(f"AI extraction error: {e}")
         return {}
+    
+    if not result:
+        return {}
+    
+    # Chỉ cache kết quả đã clean (clean_ai_result idempotent nên caller clean lại vẫn đúng)
+    cleaned = clean_ai_result(result)
+    extraction_cache.set(cache_key, cleaned, provider=provider.lower(), prompt_version=CV_PROMPT_VERSION)
+    return cleaned
 
 
 def create_extraction_prompt(cv_text: str) -> str:
     """Tạo prompt để extract thông tin từ CV - phiên bản cải thiện"""
     # Tăng giới hạn text lên 30000 ký tự để đảm bảo đủ thông tin (CV có thể dài)
     # Nếu CV quá dài, sẽ cắt nhưng ưu tiên phần đầu (thông tin cá nhân, kinh nghiệm)
-    if len(cv_text) > 30000:
+    # (Text từ read_cv_budgeted đã được cắt sẵn theo cùng ngân sách - cắt lại không thay đổi gì)
+    if len(cv_text) > CV_HEAD_CHARS + CV_TAIL_CHARS:
         # Lấy 20000 ký tự đầu (thông tin cá nhân, kinh nghiệm) + 10000 ký tự cuối (dự án, kỹ năng)
-        cv_content = cv_text[:20000] + "\n\n...[PHẦN GIỮA ĐÃ BỎ QUA]...\n\n" + cv_text[-10000:]
-        print(f"[Prompt] CV quá dài ({len(cv_text)} ký tự), đã cắt xuống 30000 ký tự")
+        cv_content = cv_text[:CV_HEAD_CHARS] + CV_SKIPPED_MARKER + cv_text[-CV_TAIL_CHARS:]
+        print(f"[Prompt] CV quá dài ({len(cv_text)} ký tự), đã cắt xuống {CV_HEAD_CHARS + CV_TAIL_CHARS} ký tự")
     else:
         cv_content = cv_text
         print(f"[Prompt] CV text length: {len(cv_text)} ký tự")
@@ -377,9 +401,8 @@ NHẮC LẠI: CHỈ TRẢ VỀ JSON THUẦN, KHÔNG CÓ TEXT NÀO KHÁC! ĐỌC
 def extract_with_openai(prompt: str, api_key: str) -> Dict[str, Any]:
     """Extract với OpenAI API"""
     try:
-        import openai
-        
-        client = openai.OpenAI(api_key=api_key)
+        # Client dùng chung (giữ connection pool / TLS giữa các request)
+        client = llm_clients.openai(api_key)
         
         response = client.chat.completions.create(
             model="gpt-4o-mini",  # Hoặc "gpt-4" nếu muốn chính xác hơn
@@ -398,6 +421,8 @@ def extract_with_openai(prompt: str, api_key: str) -> Dict[str, Any]:
         print("OpenAI library not installed. Install with: pip install openai")
         return {}
     except Exception as e:
+        if is_rate_limit_error(e):
+            raise
         print(f"OpenAI API error: {e}")
         return {}
 
@@ -405,9 +430,7 @@ def extract_with_openai(prompt: str, api_key: str) -> Dict[str, Any]:
 def extract_with_anthropic(prompt: str, api_key: str) -> Dict[str, Any]:
     """Extract với Anthropic Claude API"""
     try:
-        import anthropic
-        
-        client = anthropic.Anthropic(api_key=api_key)
+        client = llm_clients.anthropic(api_key)
         
         message = client.messages.create(
             model="claude-3-haiku-20240307",  # Hoặc "claude-3-sonnet-20240229"
@@ -432,6 +455,8 @@ def extract_with_anthropic(prompt: str, api_key: str) -> Dict[str, Any]:
         print("Anthropic library not installed. Install with: pip install anthropic")
         return {}
     except Exception as e:
+        if is_rate_limit_error(e):
+            raise
         print(f"Anthropic API error: {e}")
         return {}
 
@@ -441,136 +466,8 @@ def extract_with_gemini(prompt: str, api_key: str) -> Dict[str, Any]:
     try:
         import google.generativeai as genai
         
-        genai.configure(api_key=api_key)
-        
-        # List models trước để tìm model thực tế khả dụng
-        model = None
-        model_name_used = None
-        
-        try:
-            print("[Gemini] Đang list models để tìm model khả dụng...")
-            models = genai.list_models()
-            model_list = list(models)
-            print(f"[Gemini] Tìm thấy {len(model_list)} models")
-            
-            # In danh sách models để debug
-            print("[Gemini] Danh sách models hỗ trợ generateContent:")
-            available_models = []
-            for m in model_list:
-                if 'generateContent' in m.supported_generation_methods:
-                    print(f"  - {m.name}")
-                    available_models.append(m)
-            
-            # Ưu tiên tìm gemini-1.5-flash trong danh sách
-            excluded_patterns = ['2.5', '2.0', 'exp', 'ultra', 'computer-use', 'tts', 'image-generation', 'lite']
-            
-            # Tìm gemini-1.5-flash trong danh sách
-            for m in available_models:
-                model_name_lower = m.name.lower()
-                
-                # Bỏ qua model trả phí
-                if any(excluded in model_name_lower for excluded in excluded_patterns):
-                    continue
-                
-                # Ưu tiên tìm gemini-1.5-flash
-                if '1.5-flash' in model_name_lower and 'gemini' in model_name_lower:
-                    try:
-                        test_model = genai.GenerativeModel(m.name)
-                        # Test model bằng cách thử generate với prompt ngắn
-                        try:
-                            test_response = test_model.generate_content("test", generation_config={"max_output_tokens": 1})
-                            model = test_model
-                            model_name_used = m.name
-                            print(f"[Gemini] ✓ Sử dụng model: {m.name}")
-                            break
-                        except Exception as test_e:
-                            # Model không thể generate, bỏ qua
-                            print(f"[Gemini] Model {m.name} không thể generate: {str(test_e)[:150]}")
-                            continue
-                    except Exception as e:
-                        error_msg = str(e)[:150]
-                        print(f"[Gemini] Model {m.name} không khả dụng: {error_msg}")
-                        continue
-            
-            # Nếu không tìm thấy gemini-1.5-flash, thử các model flash khác
-            if not model:
-                for m in available_models:
-                    model_name_lower = m.name.lower()
-                    
-                    if any(excluded in model_name_lower for excluded in excluded_patterns):
-                        continue
-                    
-                    # Tìm model có flash
-                    if 'flash' in model_name_lower and 'gemini' in model_name_lower:
-                        try:
-                            test_model = genai.GenerativeModel(m.name)
-                            try:
-                                test_response = test_model.generate_content("test", generation_config={"max_output_tokens": 1})
-                                model = test_model
-                                model_name_used = m.name
-                                print(f"[Gemini] ✓ Sử dụng model: {m.name}")
-                                break
-                            except Exception as test_e:
-                                print(f"[Gemini] Model {m.name} không thể generate: {str(test_e)[:150]}")
-                                continue
-                        except Exception as e:
-                            error_msg = str(e)[:150]
-                            print(f"[Gemini] Model {m.name} không khả dụng: {error_msg}")
-                            continue
-            
-            # Nếu vẫn không tìm thấy, thử model pro
-            if not model:
-                for m in available_models:
-                    model_name_lower = m.name.lower()
-                    
-                    if any(excluded in model_name_lower for excluded in excluded_patterns):
-                        continue
-                    
-                    # Tìm model có pro
-                    if 'pro' in model_name_lower and 'gemini' in model_name_lower:
-                        try:
-                            test_model = genai.GenerativeModel(m.name)
-                            try:
-                                test_response = test_model.generate_content("test", generation_config={"max_output_tokens": 1})
-                                model = test_model
-                                model_name_used = m.name
-                                print(f"[Gemini] ✓ Sử dụng model: {m.name}")
-                                break
-                            except Exception as test_e:
-                                print(f"[Gemini] Model {m.name} không thể generate: {str(test_e)[:150]}")
-                                continue
-                        except Exception as e:
-                            error_msg = str(e)[:150]
-                            print(f"[Gemini] Model {m.name} không khả dụng: {error_msg}")
-                            continue
-                            
-        except Exception as e:
-            print(f"[Gemini] Lỗi khi list models: {e}")
-            import traceback
-            traceback.print_exc()
-        
-        # Nếu vẫn không tìm thấy từ list_models, thử các model name phổ biến
-        if not model:
-            model_names = ['gemini-flash-latest', 'gemini-pro-latest', 'gemini-1.5-pro']
-            for model_name in model_names:
-                try:
-                    test_model = genai.GenerativeModel(model_name)
-                    # Test model
-                    try:
-                        test_response = test_model.generate_content("test", generation_config={"max_output_tokens": 1})
-                        model = test_model
-                        model_name_used = model_name
-                        print(f"[Gemini] ✓ Sử dụng model trực tiếp: {model_name}")
-                        break
-                    except Exception as test_e:
-                        print(f"[Gemini] Model {model_name} không thể generate: {str(test_e)[:100]}")
-                        continue
-                except Exception as e:
-                    print(f"[Gemini] Model {model_name} không khả dụng: {str(e)[:100]}")
-                    continue
-        
-        if not model:
-            raise Exception(f"Không tìm thấy Gemini model khả dụng. API key: {'***' + api_key[-4:] if len(api_key) > 4 else 'INVALID'}. Vui lòng kiểm tra API key và quyền truy cập.")
+        # Model đã được resolve sẵn (cache theo TTL) - hot path chỉ còn 1 lệnh generate
+        model, model_name_used = gemini_registry.get_model(api_key)
         
         # Tạo generation config - thêm response_mime_type để force JSON
         generation_config = {
@@ -596,61 +493,16 @@ def extract_with_gemini(prompt: str, api_key: str) -> Dict[str, Any]:
             # Kiểm tra lỗi 404 - model không tồn tại
             if "404" in error_str or "not found" in error_str.lower():
                 print(f"[Gemini] Model {model_name_used} không tồn tại (404), tìm model khác...")
-                # Tìm model khác từ danh sách
-                model_found = False
-                try:
-                    models = genai.list_models()
-                    model_list = list(models)
-                    excluded_patterns = ['2.5', '2.0', 'exp', 'ultra', 'computer-use', 'tts', 'image-generation', 'lite']
-                    
-                    for m in model_list:
-                        if 'generateContent' not in m.supported_generation_methods:
-                            continue
-                        model_name_lower = m.name.lower()
-                        if any(excluded in model_name_lower for excluded in excluded_patterns):
-                            continue
-                        if m.name == model_name_used:
-                            continue  # Bỏ qua model đã thử
-                        
-                        # Thử model khác
-                        if ('flash' in model_name_lower or 'pro' in model_name_lower) and 'gemini' in model_name_lower:
-                            try:
-                                alt_model = genai.GenerativeModel(m.name)
-                                # Test model
-                                try:
-                                    test_response = alt_model.generate_content("test", generation_config={"max_output_tokens": 1})
-                                    model = alt_model
-                                    model_name_used = m.name
-                                    print(f"[Gemini] ✓ Chuyển sang model: {m.name}")
-                                    # Thử lại với model mới (không dùng response_mime_type)
-                                    response = model.generate_content(prompt, generation_config=generation_config)
-                                    model_found = True
-                                    break
-                                except Exception as test_e:
-                                    print(f"[Gemini] Model {m.name} không thể generate: {str(test_e)[:100]}")
-                                    continue
-                            except Exception as e2:
-                                continue
-                    
-                    if not model_found:
-                        raise Exception(f"Không tìm thấy Gemini model khả dụng. Model {model_name_used} không tồn tại. Vui lòng kiểm tra API key.")
-                except Exception as e2:
-                    if "Không tìm thấy" not in str(e2):
-                        raise Exception(f"Model {model_name_used} không tồn tại và không thể tìm model thay thế: {str(e2)[:200]}")
-                    raise
+                # Registry probe lại các model ứng viên song song và cache model mới
+                model, model_name_used = gemini_registry.on_model_not_found(api_key, model_name_used)
+                # Thử lại với model mới (không dùng response_mime_type)
+                response = model.generate_content(prompt, generation_config=generation_config)
             
             # Kiểm tra lỗi quota
-            elif "quota" in error_str.lower() or "ResourceExhausted" in error_str or "429" in error_str:
+            elif is_rate_limit_error(e):
                 print(f"[Gemini] Lỗi quota với model {model_name_used}: {error_str[:200]}")
-                raise Exception(f"""QUOTA ĐÃ HẾT - API KEY CỦA BẠN ĐÃ HẾT LƯỢNG SỬ DỤNG MIỄN PHÍ.
-
-GIẢI PHÁP:
-1. Đợi vài phút (quota có thể reset theo phút/ngày)
-2. Kiểm tra quota tại: https://ai.dev/rate-limit
-3. Nâng cấp API key lên gói trả phí nếu cần sử dụng nhiều hơn
-4. Hoặc tạo API key mới (nếu có thể)
-
-Thông tin chi tiết: https://ai.google.dev/gemini-api/docs/rate-limits""")
+                # Để llm_scheduler backoff rồi thử lại (xem rate_limiter)
+                raise
             
             # Nếu không hỗ trợ response_mime_type, dùng cách cũ
             else:
@@ -664,16 +516,6 @@ Thông tin chi tiết: https://ai.google.dev/gemini-api/docs/rate-limits""")
                     error_str2 = str(e2)
                     if "404" in error_str2 or "not found" in error_str2.lower():
                         raise Exception(f"Model {model_name_used} không tồn tại. Vui lòng kiểm tra API key và thử lại.")
-                    elif "quota" in error_str2.lower() or "ResourceExhausted" in error_str2 or "429" in error_str2:
-                        raise Exception(f"""QUOTA ĐÃ HẾT - API KEY CỦA BẠN ĐÃ HẾT LƯỢNG SỬ DỤNG MIỄN PHÍ.
-
-GIẢI PHÁP:
-1. Đợi vài phút (quota có thể reset theo phút/ngày)
-2. Kiểm tra quota tại: https://ai.dev/rate-limit
-3. Nâng cấp API key lên gói trả phí nếu cần sử dụng nhiều hơn
-4. Hoặc tạo API key mới (nếu có thể)
-
-Thông tin chi tiết: https://ai.google.dev/gemini-api/docs/rate-limits""")
                     raise
         
         result_text = response.text.strip()
@@ -716,12 +558,32 @@ Thông tin chi tiết: https://ai.google.dev/gemini-api/docs/rate-limits""")
         print("Google Generative AI library not installed. Install with: pip install google-generativeai")
         return {}
     except Exception as e:
+        if is_rate_limit_error(e):
+            raise
         print(f"Gemini API error: {e}")
         import traceback
         traceback.print_exc()
         return {}
 
 
+PROVIDER_EXTRACTORS = {
+    "openai": extract_with_openai,
+    "anthropic": extract_with_anthropic,
+    "gemini": extract_with_gemini,
+}
+
+
+def call_provider(provider: str, prompt: str, api_key: str) -> Dict[str, Any]:
+    """
+    Gọi provider với prompt - các request cùng provider + API key + prompt đến cùng lúc
+    (bấm gửi 2 lần, nhiều người phân tích cùng một JD) chỉ tốn một lời gọi, dùng chung kết quả
+    """
+    extractor = PROVIDER_EXTRACTORS[provider.lower()]
+    key = llm_single_flight.make_key(provider, api_key, prompt)
+    # Lời gọi thật chờ tới lượt theo hạn mức RPM/TPM của provider, 429 thì backoff và thử lại
+    return llm_single_flight.do(key, lambda: llm_scheduler.run(provider, prompt, lambda: extractor(prompt, api_key)))
+
+
 def clean_ai_result(data: Dict[str, Any]) -> Dict[str, Any]:
     """Làm sạch và validate kết quả từ AI - cải thiện để giữ lại tất cả thông tin"""
     cleaned = {}
@@ -822,6 +684,9 @@ def clean_ai_result(data: Dict[str, Any]) -> Dict[str, Any]:
     # Clean arrays - giữ lại TẤT CẢ thông tin hợp lệ, không loại bỏ quá nhiều
     for key in ["skills", "education", "experiences", "projects", "social_links"]:
         value = data.get(key, [])
+        if key == "skills" and isinstance(value, list):
+            # Alias ("ReactJS", "React.js") → tên chuẩn trong danh mục kỹ năng
+            value = normalize_skill_list(item for item in value if not isinstance(item, dict))
         if isinstance(value, list):
             cleaned_list = []
             for item in value:
@@ -0,0 +1,261 @@
+"""
+Hàng đợi phân tích CV chạy nền
+- Lưu job trong SQLite riêng (./data/analysis_queue.db) → không mất job khi restart
+- Worker pool (thread) lấy job theo thứ tự, cập nhật stage: reading → extracting → matching → saving
+- Submit trả về id ngay, client poll trạng thái qua id
+- Nhiều process có thể dùng chung file queue: job đang chạy ghi owner (process nhận job) và heartbeat định kỳ;
+  chỉ job có heartbeat quá ANALYSIS_STALE_SECONDS (process đã chết) mới được đưa lại vào hàng đợi
+- Ghi stage / kết quả lỗi (VD: "database is locked") không làm chết worker: job không ghi được kết quả
+  thôi được heartbeat và sẽ được đưa lại vào hàng đợi
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from pathlib import Path
+from typing import Optional, Dict, Any, List
+
+
+QUEUE_PATH = Path(os.getenv("ANALYSIS_QUEUE_PATH", "./data/analysis_queue.db"))
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "2"))
+# Worker vẫn poll định kỳ để thấy job do process khác submit vào cùng file queue
+POLL_INTERVAL_SECONDS = 1.0
+HEARTBEAT_SECONDS = float(os.getenv("ANALYSIS_HEARTBEAT_SECONDS", "10"))
+# Không có heartbeat quá lâu → coi như process chạy job đã chết
+STALE_SECONDS = float(os.getenv("ANALYSIS_STALE_SECONDS", "60"))
+
+
+class AnalysisQueue:
+    def __init__(self, path: Path, workers: int):
+        self.path = Path(path)
+        self.workers = max(1, workers)
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._local = threading.local()
+        self._initialized = False
+        self._init_lock = threading.Lock()
+        # Định danh process này trong cột owner
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        # Job worker của process này đang xử lý - chỉ các job này được cập nhật heartbeat
+        self._active = set()
+        self._active_lock = threading.Lock()
+
+    # ---------- storage ----------
+    def _conn(self) -> sqlite3.Connection:
+        # Mỗi thread một connection; timeout để chờ khi thread/process khác đang ghi
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    conn.execute(
+                        """CREATE TABLE IF NOT EXISTS analysis_jobs (
+                            id INTEGER PRIMARY KEY AUTOINCREMENT,
+                            status TEXT NOT NULL,
+                            stage TEXT NOT NULL,
+                            filename TEXT,
+                            file_path TEXT NOT NULL,
+                            jd_text TEXT,
+                            job_id INTEGER,
+                            result TEXT,
+                            error TEXT,
+                            status_code INTEGER,
+                            owner TEXT,
+                            heartbeat_at REAL,
+                            created_at REAL NOT NULL,
+                            updated_at REAL NOT NULL
+                        )"""
+                    )
+                    # File queue tạo từ bản cũ chưa có owner / heartbeat_at
+                    columns = {row[1] for row in conn.execute("PRAGMA table_info(analysis_jobs)")}
+                    for column, column_type in [("owner", "TEXT"), ("heartbeat_at", "REAL")]:
+                        if column not in columns:
+                            conn.execute(f"ALTER TABLE analysis_jobs ADD COLUMN {column} {column_type}")
+                    conn.execute("CREATE INDEX IF NOT EXISTS ix_analysis_jobs_status ON analysis_jobs (status, id)")
+                    self._initialized = True
+        return conn
+
+    def _update(self, job_id: int, **fields):
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{key} = ?" for key in fields)
+        self._conn().execute(f"UPDATE analysis_jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    def _try_update(self, job_id: int, **fields) -> bool:
+        """_update nhưng lỗi DB chỉ ghi log (stage / kết quả của job không được làm chết worker)"""
+        try:
+            self._update(job_id, **fields)
+            return True
+        except sqlite3.Error as e:
+            print(f"[Queue] Không cập nhật được job #{job_id} ({', '.join(fields)}): {e}")
+            return False
+
+    @staticmethod
+    def _row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "id": row["id"],
+            "status": row["status"],
+            "stage": row["stage"],
+            "filename": row["filename"],
+            "job_id": row["job_id"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "status_code": row["status_code"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
+
+    # ---------- public API ----------
+    def submit(self, file_path: Path, jd_text: Optional[str] = None, job_id: Optional[int] = None,
+               filename: Optional[str] = None) -> Dict[str, Any]:
+        """filename: tên file gốc client gửi lên (chỉ để hiển thị) - file_path là file đã lưu với tên riêng"""
+        now = time.time()
+        cur = self._conn().execute(
+            "INSERT INTO analysis_jobs (status, stage, filename, file_path, jd_text, job_id, created_at, updated_at) "
+            "VALUES ('queued', 'queued', ?, ?, ?, ?, ?, ?)",
+            (filename or Path(file_path).name, str(file_path), jd_text, job_id, now, now)
+        )
+        self._wakeup.set()
+        return self.get(cur.lastrowid)
+
+    def get(self, analysis_id: int) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute("SELECT * FROM analysis_jobs WHERE id = ?", (analysis_id,)).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def stats(self) -> Dict[str, Any]:
+        rows = self._conn().execute("SELECT status, COUNT(*) FROM analysis_jobs GROUP BY status").fetchall()
+        counts = {row[0]: row[1] for row in rows}
+        return {"workers": self.workers, **{status: counts.get(status, 0) for status in ["queued", "running", "done", "failed"]}}
+
+    # ---------- worker ----------
+    def _claim(self) -> Optional[sqlite3.Row]:
+        """Lấy job queued cũ nhất và đánh dấu running (BEGIN IMMEDIATE → an toàn giữa các process)"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT * FROM analysis_jobs WHERE status = 'queued' ORDER BY id LIMIT 1"
+            ).fetchone()
+            if row is not None:
+                now = time.time()
+                conn.execute(
+                    "UPDATE analysis_jobs SET status = 'running', owner = ?, heartbeat_at = ?, updated_at = ? "
+                    "WHERE id = ?",
+                    (self.owner, now, now, row["id"])
+                )
+            conn.execute("COMMIT")
+            return row
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _process(self, row: sqlite3.Row):
+        from app.services.cv_pipeline import PipelineError, run_analysis
+
+        analysis_id = row["id"]
+        print(f"[Queue] Bắt đầu job #{analysis_id} ({row['filename']})")
+        with self._active_lock:
+            self._active.add(analysis_id)
+        try:
+            try:
+                result = run_analysis(
+                    Path(row["file_path"]),
+                    jd_text=row["jd_text"],
+                    job_id=row["job_id"],
+                    on_stage=lambda stage: self._try_update(analysis_id, stage=stage)
+                )
+            except PipelineError as e:
+                self._try_update(analysis_id, status="failed", error=e.detail, status_code=e.status_code)
+                print(f"[Queue] ❌ Job #{analysis_id} lỗi: {e.detail}")
+                return
+            except Exception as e:
+                self._try_update(analysis_id, status="failed", error=str(e), status_code=500)
+                print(f"[Queue] ❌ Job #{analysis_id} lỗi: {e}")
+                return
+            if self._try_update(analysis_id, status="done", stage="done", status_code=200,
+                                result=json.dumps(result, ensure_ascii=False)):
+                print(f"[Queue] ✓ Job #{analysis_id} xong - score: {result.get('score')}")
+        finally:
+            # Không ghi được kết quả: hết heartbeat → sau ANALYSIS_STALE_SECONDS job được đưa lại vào hàng đợi
+            with self._active_lock:
+                self._active.discard(analysis_id)
+
+    def _worker_loop(self):
+        while not self._stop.is_set():
+            try:
+                row = self._claim()
+            except sqlite3.Error as e:
+                print(f"[Queue] Lỗi khi lấy job: {e}")
+                row = None
+            if row is None:
+                self._wakeup.wait(POLL_INTERVAL_SECONDS)
+                self._wakeup.clear()
+                continue
+            try:
+                self._process(row)
+            except Exception as e:
+                # Worker phải sống tiếp - pool không được nhỏ dần
+                print(f"[Queue] Lỗi khi xử lý job #{row['id']}: {e}")
+                traceback.print_exc()
+
+    def _heartbeat(self):
+        """Job worker đang xử lý: cập nhật heartbeat_at; job không còn ai xử lý (process đã chết...): đưa lại vào hàng đợi"""
+        now = time.time()
+        conn = self._conn()
+        with self._active_lock:
+            active = list(self._active)
+        if active:
+            conn.execute(
+                f"UPDATE analysis_jobs SET heartbeat_at = ? WHERE status = 'running' AND owner = ? "
+                f"AND id IN ({', '.join('?' * len(active))})",
+                (now, self.owner, *active)
+            )
+        # heartbeat_at NULL: job nhận bởi bản cũ (chưa có heartbeat)
+        requeued = conn.execute(
+            "UPDATE analysis_jobs SET status = 'queued', owner = NULL, updated_at = ? "
+            "WHERE status = 'running' AND (heartbeat_at IS NULL OR heartbeat_at < ?)",
+            (now, now - STALE_SECONDS)
+        ).rowcount
+        if requeued:
+            print(f"[Queue] Đưa lại {requeued} job chạy dở (không còn heartbeat) vào hàng đợi")
+            self._wakeup.set()
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(HEARTBEAT_SECONDS):
+            try:
+                self._heartbeat()
+            except sqlite3.Error as e:
+                print(f"[Queue] Lỗi heartbeat: {e}")
+
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        # Job chạy dở của process đã tắt / chết → đưa lại vào hàng đợi (job process khác đang chạy thì giữ nguyên)
+        self._heartbeat()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"analysis-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._heartbeat_loop, name="analysis-heartbeat", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        print(f"[Queue] Đã khởi động {self.workers} worker")
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+
+analysis_queue = AnalysisQueue(QUEUE_PATH, ANALYSIS_WORKERS)
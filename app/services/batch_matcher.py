@@ -0,0 +1,101 @@
+"""
+Chấm điểm một JD với nhiều CV cùng lúc (NumPy)
+- Kết quả giống hệt match_cv_with_jd cho từng cặp (cùng công thức, cùng thứ tự phép tính)
+- Skill của các CV được đổi sang key chuẩn (skill_index) và đánh số theo vocabulary của batch: exact match là
+  một phần tử của mảng, partial match chỉ chạy trên (số skill khác nhau × số skill JD yêu cầu)
+- Điểm vị trí tính một lần cho mỗi vị trí khác nhau
+"""
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from app.services.cv_matcher import position_score
+from app.services.skill_index import canonical_skills, skills_related
+
+
+class CandidateBatch:
+    """
+    Tập CV đã được mã hóa sẵn - dựng một lần, chấm được với nhiều JD / nhiều bộ yêu cầu
+    skill_lists: danh sách skill gốc của từng CV (chưa chuẩn hóa)
+    """
+
+    def __init__(self, skill_lists: Sequence[Sequence[str]], positions: Sequence[str], years: Sequence[int]):
+        self.size = len(skill_lists)
+        vocabulary: Dict[str, int] = {}
+        owners, entries = [], []
+        for index, skills in enumerate(skill_lists):
+            # Giống match_cv_with_jd: mỗi key chỉ tính một lần cho một CV
+            for skill in canonical_skills(skills):
+                owners.append(index)
+                entries.append(vocabulary.setdefault(skill, len(vocabulary)))
+
+        # key → vị trí trong vocabulary; vocabulary[i] = key của mục thứ i
+        self._vocabulary_index = vocabulary
+        self.vocabulary: List[str] = list(vocabulary)
+        self.owners = np.asarray(owners, dtype=np.int64)
+        self.skill_ids = np.asarray(entries, dtype=np.int64)
+        # Số skill gốc (kể cả trùng) - dùng khi JD không yêu cầu skill
+        self.raw_skill_counts = np.asarray([len(skills or []) for skills in skill_lists], dtype=np.float64)
+        self.positions = [position or "" for position in positions]
+        self.years = np.asarray([y or 0 for y in years], dtype=np.float64)
+
+    def __len__(self) -> int:
+        return self.size
+
+    # ---------- các thành phần điểm ----------
+    def skills_component(self, required_skills: Sequence[str]) -> np.ndarray:
+        if not required_skills:
+            return np.minimum(self.raw_skill_counts * 5, 30) * (self.raw_skill_counts > 0)
+
+        required = canonical_skills(required_skills)
+        matched = np.zeros(self.size, dtype=np.float64)
+        partial = np.zeros(self.size, dtype=np.float64)
+        if not required:
+            return matched
+        for req_skill in required:
+            # Trên vocabulary: cùng key / một trong hai key chứa key kia (partial match)
+            exact = np.zeros(len(self.vocabulary), dtype=bool)
+            if req_skill in self._vocabulary_index:
+                exact[self._vocabulary_index[req_skill]] = True
+            related = exact | np.fromiter((skills_related(req_skill, cand_skill) for cand_skill in self.vocabulary),
+                                          dtype=bool, count=len(self.vocabulary))
+            # Gộp theo CV: CV nào có ít nhất một skill khớp
+            has_exact = np.bincount(self.owners, weights=exact[self.skill_ids], minlength=self.size) > 0
+            has_related = np.bincount(self.owners, weights=related[self.skill_ids], minlength=self.size) > 0
+            matched += has_exact
+            partial += has_related & ~has_exact
+
+        exact_score = (matched / len(required)) * 60
+        partial_score = (partial / len(required)) * 60 * 0.5
+        return np.minimum(exact_score + partial_score, 60)
+
+    def position_component(self, target_position: str) -> np.ndarray:
+        cache: Dict[str, int] = {}
+        scores = np.empty(self.size, dtype=np.float64)
+        for index, position in enumerate(self.positions):
+            if position not in cache:
+                cache[position] = position_score(position, target_position)
+            scores[index] = cache[position]
+        return scores
+
+    def years_component(self, required_years: int) -> np.ndarray:
+        years = self.years
+        if required_years > 0:
+            ratio_score = np.minimum((years / required_years) * 20, 20)
+            return np.where(years >= required_years, 20.0, np.where(years > 0, ratio_score, 0.0))
+        return np.where(years > 0, np.minimum(years * 2, 10), 0.0)
+
+    # ---------- tổng điểm ----------
+    def score(self, required_skills: Sequence[str], target_position: str = "", required_years: int = 0) -> Dict[str, np.ndarray]:
+        """
+        Trả về các thành phần điểm và tổng điểm ("score") của mọi CV
+        score[i] == match_cv_with_jd(...)["score"] của CV thứ i
+        """
+        skills = self.skills_component(required_skills)
+        position = self.position_component(target_position)
+        years = self.years_component(required_years or 0)
+        # Cộng theo đúng thứ tự của match_cv_with_jd để float giống hệt
+        total = np.minimum(skills + position + years, 100)
+        # round() của Python (không dùng np.round - khác kết quả ở vài giá trị biên)
+        score = np.asarray([round(value, 2) for value in total.tolist()], dtype=np.float64)
+        return {"skills": skills, "position": position, "years": years, "score": score}
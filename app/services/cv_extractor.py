@@ -1,5 +1,7 @@
 import re
 
+from app.services.skill_index import find_skill_ids, skill_name
+
 
 def extract_email(text: str) -> str | None:
     match = re.search(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}", text)
@@ -187,44 +189,7 @@ def extract_name(text: str) -> str:
 
 
 def extract_skills(text: str) -> list[str]:
-    """Trích xuất kỹ năng từ CV với danh sách mở rộng"""
-    skills_list = [
-        # Programming Languages
-        "python", "java", "javascript", "typescript", "c++", "c#", "go", "rust", 
-        "php", "ruby", "swift", "kotlin", "scala", "r", "matlab",
-        
-        # Web Frameworks
-        "react", "vue", "angular", "next.js", "nuxt.js", "svelte",
-        "django", "flask", "fastapi", "spring", "express", "nest.js",
-        "laravel", "rails", "asp.net",
-        
-        # Databases
-        "sql", "mysql", "postgresql", "mongodb", "redis", "elasticsearch",
-        "cassandra", "dynamodb", "oracle", "sqlite", "mariadb",
-        
-        # Cloud & DevOps
-        "aws", "azure", "gcp", "docker", "kubernetes", "terraform",
-        "jenkins", "gitlab ci", "github actions", "ci/cd", "ansible",
-        "chef", "puppet", "prometheus", "grafana",
-        
-        # Data & ML
-        "machine learning", "deep learning", "data science", "data engineering",
-        "pandas", "numpy", "scikit-learn", "tensorflow", "pytorch", "keras",
-        "spark", "hadoop", "kafka", "airflow", "dbt", "snowflake",
-        "tableau", "power bi", "looker",
-        
-        # Tools & Others
-        "git", "linux", "bash", "shell scripting", "rest api", "graphql",
-        "microservices", "agile", "scrum", "jira", "confluence",
-        
-        # Mobile
-        "react native", "flutter", "ios", "android", "swift", "kotlin",
-        
-        # Testing
-        "jest", "pytest", "selenium", "cypress", "junit",
-    ]
-
-    found = []
+    """Trích xuất kỹ năng từ CV theo danh mục kỹ năng (mọi alias), trả về tên chuẩn"""
     text_lower = text.lower()
     
     # Tìm section Skills nếu có
@@ -241,15 +206,8 @@ def extract_skills(text: str) -> list[str]:
     # Tìm trong section Skills hoặc toàn bộ text
     search_text = skills_section if skills_section else text_lower
     
-    for skill in skills_list:
-        skill_lower = skill.lower()
-        # Tìm exact match hoặc word boundary
-        pattern = r'\b' + re.escape(skill_lower) + r'\b'
-        if re.search(pattern, search_text, re.IGNORECASE):
-            if skill not in found:
-                found.append(skill)
-
-    return found
+    # Một lần quét cho mọi alias (thay vì một regex cho mỗi kỹ năng)
+    return [skill_name(skill_id) for skill_id in find_skill_ids(search_text)]
 
 
 def extract_date_of_birth(text: str) -> str | None:
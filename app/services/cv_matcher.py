@@ -1,3 +1,15 @@
+from app.services.position_taxonomy import position_similarity
+from app.services.skill_index import canonical_skills, skills_related
+
+
+def position_score(candidate_position, target_position):
+    """Điểm vị trí (tối đa 20) - dùng chung cho match_cv_with_jd và batch matcher"""
+    if not (target_position and candidate_position):
+        return 0
+    # Vị trí trong danh mục: tra bảng tính sẵn; vị trí tự do: so chuỗi (có cache)
+    return position_similarity(candidate_position, target_position)
+
+
 def match_cv_with_jd(candidate_skills, required_skills, 
                      candidate_position="", target_position="",
                      candidate_years=0, required_years=0):
@@ -13,20 +25,19 @@ def match_cv_with_jd(candidate_skills, required_skills,
     
     # 1. Skills matching (60% trọng số)
     if required_skills:
-        candidate_set = set([s.lower().strip() for s in candidate_skills])
-        required_set = set([s.lower().strip() for s in required_skills])
+        # So khớp theo key chuẩn (alias như "ReactJS" / "react" cùng một key)
+        candidate_set = set(canonical_skills(candidate_skills))
+        required_keys = canonical_skills(required_skills)
+        required_set = set(required_keys)
         
-        # Tìm exact matches
-        matched_skills = list(candidate_set & required_set)
+        # Tìm exact matches (giữ thứ tự yêu cầu của JD)
+        matched_skills = [key for key in required_keys if key in candidate_set]
         
         # Tìm partial matches (một skill chứa skill kia)
         partial_matches = []
-        for req_skill in required_set:
-            if req_skill not in matched_skills:
-                for cand_skill in candidate_set:
-                    if req_skill in cand_skill or cand_skill in req_skill:
-                        partial_matches.append(req_skill)
-                        break
+        for req_skill in required_keys:
+            if req_skill not in candidate_set and any(skills_related(req_skill, cand_skill) for cand_skill in candidate_set):
+                partial_matches.append(req_skill)
         
         # Tính điểm: exact match = 100%, partial match = 50%
         if len(required_set) > 0:
@@ -35,7 +46,7 @@ def match_cv_with_jd(candidate_skills, required_skills,
             skills_score = min(exact_score + partial_score, 60)
             total_score += skills_score
         
-        missing_skills = list(required_set - candidate_set - set(partial_matches))
+        missing_skills = [key for key in required_keys if key not in candidate_set and key not in partial_matches]
     else:
         # Nếu không có required skills, cho điểm dựa trên số skills có
         if candidate_skills:
@@ -43,32 +54,7 @@ def match_cv_with_jd(candidate_skills, required_skills,
         missing_skills = []
     
     # 2. Position matching (20% trọng số)
-    if target_position and candidate_position:
-        target_lower = target_position.lower().strip()
-        candidate_lower = candidate_position.lower().strip()
-        
-        # Exact match (chính xác)
-        if target_lower == candidate_lower:
-            total_score += 20
-        # Partial match - một trong hai chứa từ khóa của kia
-        elif target_lower in candidate_lower or candidate_lower in target_lower:
-            total_score += 15
-        # Word match - có từ khóa chung (ví dụ: "analyst" trong cả hai)
-        else:
-            target_words = set([w for w in target_lower.split() if len(w) > 3])
-            candidate_words = set([w for w in candidate_lower.split() if len(w) > 3])
-            common_words = target_words & candidate_words
-            
-            if common_words:
-                # Có từ khóa chung
-                if len(common_words) >= 2:
-                    total_score += 12  # Nhiều từ khóa chung
-                else:
-                    total_score += 8   # Một từ khóa chung
-            # Related position (có từ khóa liên quan)
-            elif any(word in candidate_lower for word in ["engineer", "developer", "analyst", "scientist", "manager"]):
-                if any(word in target_lower for word in ["engineer", "developer", "analyst", "scientist", "manager"]):
-                    total_score += 5
+    total_score += position_score(candidate_position, target_position)
     
     # 3. Years of experience matching (20% trọng số)
     if required_years > 0:
@@ -1,6 +1,8 @@
 import re
 from datetime import datetime
 
+from app.services.position_taxonomy import POSITION_NAMES, extract_position_id
+
 
 def extract_years_experience(text: str) -> int:
     """
@@ -74,62 +76,9 @@ def extract_years_experience(text: str) -> int:
 
 
 def extract_position(text: str) -> str:
-    """Trích xuất vị trí công việc từ CV"""
-    text_lower = text.lower()
-    
-    # Mapping vị trí với keywords - mở rộng danh sách
-    mapping = {
-        "Business Analyst": ["business analyst", "ba", "business analysis", "functional analyst"],
-        "Data Engineer": ["data engineer", "data engineering", "etl engineer", "big data engineer"],
-        "Data Analyst": ["data analyst", "data analysis", "business intelligence analyst", "bi analyst"],
-        "Data Scientist": ["data scientist", "data science"],
-        "Backend Engineer": ["backend engineer", "backend developer", "server developer", "api developer"],
-        "Frontend Engineer": ["frontend engineer", "frontend developer", "ui developer", "web developer"],
-        "Fullstack Engineer": ["fullstack", "full stack", "full-stack engineer", "full-stack developer"],
-        "AI Engineer": ["ai engineer", "machine learning engineer", "ml engineer", "deep learning engineer"],
-        "DevOps Engineer": ["devops engineer", "devops", "sre", "site reliability engineer"],
-        "Software Engineer": ["software engineer", "software developer", "developer", "programmer"],
-        "Mobile Developer": ["mobile developer", "ios developer", "android developer", "react native"],
-        "Product Manager": ["product manager", "pm", "product owner"],
-        "Project Manager": ["project manager", "project management", "scrum master"],
-        "QA Engineer": ["qa engineer", "qa", "quality assurance", "test engineer", "tester"],
-        "System Analyst": ["system analyst", "systems analyst", "it analyst"],
-        "Business Intelligence": ["business intelligence", "bi developer", "bi engineer"],
-    }
-
-    text_lower = text.lower()
-    
-    # Tìm trong toàn bộ CV (không chỉ 50 dòng đầu)
-    # Ưu tiên tìm trong 150 dòng đầu (thông tin cá nhân, kinh nghiệm, mục tiêu)
-    lines = text.splitlines()[:150]
-    text_to_search = "\n".join(lines).lower()
-    
-    # Tìm vị trí với độ ưu tiên (từ cụ thể đến chung)
-    # Sắp xếp theo độ dài keyword (dài hơn = cụ thể hơn)
-    found_positions = []
-    for position, keywords in mapping.items():
-        for kw in keywords:
-            # Sử dụng word boundary để match chính xác hơn
-            pattern = r'\b' + re.escape(kw) + r'\b'
-            if re.search(pattern, text_to_search, re.IGNORECASE):
-                # Tính điểm ưu tiên (keyword dài hơn = ưu tiên hơn)
-                priority = len(kw)
-                found_positions.append((priority, position))
-                break  # Chỉ lấy position đầu tiên match
-    
-    if found_positions:
-        # Sắp xếp theo priority và trả về position có priority cao nhất
-        found_positions.sort(key=lambda x: x[0], reverse=True)
-        return found_positions[0][1]
-    
-    # Fallback: Tìm trong toàn bộ CV nếu không tìm thấy ở 150 dòng đầu
-    for position, keywords in mapping.items():
-        for kw in keywords:
-            pattern = r'\b' + re.escape(kw) + r'\b'
-            if re.search(pattern, text_lower, re.IGNORECASE):
-                return position
-
-    return ""
+    """Trích xuất vị trí công việc từ CV (theo danh mục vị trí, một lần quét mọi keyword)"""
+    found = extract_position_id(text)
+    return POSITION_NAMES[found] if found is not None else ""
 
 
 
@@ -0,0 +1,359 @@
+"""
+Pipeline phân tích CV: trích xuất CV + JD bằng AI → match → lưu DB
+Dùng chung cho các endpoint phân tích CV
+"""
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, Tuple, List, AsyncIterator, Callable, Optional
+
+from sqlalchemy.orm import Session
+
+from app.services.cv_reader import read_cv_budgeted
+from app.services.ai_extractor import (
+    extract_with_ai, extract_jd_with_ai, clean_ai_result,
+    CV_HEAD_CHARS, CV_TAIL_CHARS, CV_SKIPPED_MARKER
+)
+from app.services.jd_extractor import extract_jd_requirements
+from app.services.cv_matcher import match_cv_with_jd
+from app.models.database import ReadSessionLocal
+from app.models.write_queue import write_queue
+from app.models.cv_model import CV, CVSkill
+from app.services.skill_index import canonical_skills
+from app.services.vector_index import cv_document, index_saved_cv
+from app.services.job_ranking import job_rankings
+from app.services.filter_index import cv_filter_index
+from app.models.job_model import Job
+
+
+# Giới hạn số lời gọi AI chạy đồng thời (mỗi lời gọi giữ 1 thread trong vài giây)
+AI_MAX_WORKERS = int(os.getenv("AI_MAX_WORKERS", "8"))
+ai_executor = ThreadPoolExecutor(max_workers=AI_MAX_WORKERS, thread_name_prefix="ai-extract")
+
+# Số CV xử lý đồng thời trong một batch
+BATCH_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", "4"))
+
+
+class PipelineError(Exception):
+    """Lỗi trong pipeline, mang sẵn status code + detail để API trả về"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def get_ai_config() -> Tuple[str, str]:
+    """Lấy (api_key, provider) từ env"""
+    ai_api_key = os.getenv("OPENAI_API_KEY") or os.getenv("ANTHROPIC_API_KEY") or os.getenv("GEMINI_API_KEY")
+    ai_provider = os.getenv("AI_PROVIDER", "gemini")
+
+    if not ai_api_key:
+        raise PipelineError(
+            400,
+            "API key không được cấu hình. Vui lòng cấu hình OPENAI_API_KEY, ANTHROPIC_API_KEY hoặc GEMINI_API_KEY"
+        )
+    return ai_api_key, ai_provider
+
+
+def read_cv_text(file_path: Path) -> str:
+    """Đọc CV theo ngân sách prompt - PDF rất dài chỉ đọc các trang đầu/cuối cần thiết"""
+    return read_cv_budgeted(file_path, CV_HEAD_CHARS, CV_TAIL_CHARS, CV_SKIPPED_MARKER)
+
+
+def extract_cv_info(cv_text: str, ai_api_key: str, ai_provider: str) -> Dict[str, Any]:
+    """Extract thông tin CV bằng AI, trả về kết quả đã clean"""
+    print(f"[AI] Using {ai_provider.upper()} AI for CV extraction...")
+    print(f"[AI] CV text length: {len(cv_text)} characters")
+
+    try:
+        ai_result = extract_with_ai(cv_text, ai_api_key, ai_provider)
+    except Exception as e:
+        error_msg = str(e)
+        print(f"[AI] Error during extraction: {error_msg}")
+        raise PipelineError(500, f"Lỗi khi trích xuất thông tin từ CV: {error_msg}")
+
+    if not ai_result:
+        raise PipelineError(500, "Không thể trích xuất thông tin từ CV. Vui lòng kiểm tra API key và thử lại.")
+
+    # Clean và validate kết quả AI
+    cleaned_result = clean_ai_result(ai_result)
+
+    print(f"[AI] AI extraction completed successfully!")
+    print(f"[AI] - Name: {cleaned_result.get('name', 'N/A')}")
+    print(f"[AI] - Email: {cleaned_result.get('email', 'N/A')}")
+    print(f"[AI] - Phone: {cleaned_result.get('phone', 'N/A')}")
+    print(f"[AI] - Address: {cleaned_result.get('address', 'N/A')}")
+    print(f"[AI] - Position: {cleaned_result.get('position', 'N/A')}")
+    print(f"[AI] - Years: {cleaned_result.get('years_experience', 0)}")
+    print(f"[AI] - Skills: {len(cleaned_result.get('skills', []))} items")
+    print(f"[AI] - Education: {len(cleaned_result.get('education', []))} items")
+    print(f"[AI] - Experiences: {len(cleaned_result.get('experiences', []))} items")
+    print(f"[AI] - Projects: {len(cleaned_result.get('projects', []))} items")
+    return cleaned_result
+
+
+def extract_jd_info(jd_text: str, ai_api_key: str, ai_provider: str) -> Dict[str, Any]:
+    """
+    Extract yêu cầu từ JD - ưu tiên AI, fallback về regex
+    Returns: {"position": str, "years": int, "skills": list, "requirements": list}
+    """
+    print(f"[JD] Bắt đầu extract JD - JD text length: {len(jd_text)}")
+    print(f"[JD] JD preview: {jd_text[:200]}...")
+
+    # Ưu tiên dùng AI để extract JD
+    jd_requirements_ai = extract_jd_with_ai(jd_text, ai_api_key, ai_provider)
+
+    # Nếu AI extract thành công, dùng kết quả AI; nếu không, fallback về regex
+    # Kiểm tra kỹ hơn: nếu có kết quả AI và position không rỗng
+    if jd_requirements_ai and isinstance(jd_requirements_ai, dict):
+        ai_position = jd_requirements_ai.get("position", "")
+        # Nếu AI extract được position (không rỗng, không null)
+        if ai_position and ai_position.strip() and ai_position.lower() != "null":
+            jd_info = {
+                "position": ai_position.strip(),
+                "years": jd_requirements_ai.get("years", 0),
+                "skills": jd_requirements_ai.get("skills", []),
+                "requirements": jd_requirements_ai.get("requirements", []),
+            }
+            print(f"[JD-AI] ✓ Extract bằng AI - Position: '{jd_info['position']}', Years: {jd_info['years']}, Skills: {len(jd_info['skills'])}")
+            return jd_info
+        # AI không extract được position, fallback về regex
+        print(f"[JD-AI] ❌ AI không extract được position (got: '{ai_position}'), fallback về regex...")
+    else:
+        # AI không trả về kết quả, fallback về regex
+        print(f"[JD-AI] ❌ AI không trả về kết quả (got: {jd_requirements_ai}), fallback về regex...")
+
+    jd_requirements = extract_jd_requirements(jd_text)
+    jd_info = {
+        "position": jd_requirements.get("position", ""),
+        "years": jd_requirements.get("years", 0),
+        "skills": jd_requirements.get("skills", []),
+        "requirements": jd_requirements.get("requirements", []),
+    }
+    print(f"[JD-Regex] Fallback - Position: '{jd_info['position']}', Years: {jd_info['years']}, Skills: {len(jd_info['skills'])}")
+    return jd_info
+
+
+def load_job_info(job_id: int) -> Dict[str, Any]:
+    """Lấy yêu cầu đã extract sẵn của job - không cần gọi AI cho JD"""
+    db = ReadSessionLocal()
+    try:
+        job = db.query(Job).filter(Job.id == job_id).first()
+        if not job:
+            raise PipelineError(404, f"Không tìm thấy job với id {job_id}")
+        jd_info = {
+            "job_id": job.id,
+            "position": job.position or "",
+            "years": job.required_years or 0,
+            "skills": json.loads(job.required_skills) if job.required_skills else [],
+        }
+        print(f"[JD] Dùng job #{job.id} - Position: '{jd_info['position']}', Years: {jd_info['years']}, Skills: {len(jd_info['skills'])}")
+        return jd_info
+    finally:
+        db.close()
+
+
+def score_cv(cv_info: Dict[str, Any], jd_info: Dict[str, Any]) -> Tuple[str, float]:
+    """Match CV với JD, trả về (candidate_position, score)"""
+    target_position = jd_info.get("position") or ""
+
+    # Vị trí được lấy từ JD (mô tả công việc), không phải từ CV
+    candidate_position = target_position or "(Không rõ)"
+    print(f"[JD] Final candidate_position: '{candidate_position}'")
+
+    match_result = match_cv_with_jd(
+        cv_info.get("skills") or [],
+        jd_info.get("skills") or [],
+        candidate_position=candidate_position,
+        target_position=target_position,
+        candidate_years=cv_info.get("years_experience") or 0,
+        required_years=jd_info.get("years") or 0
+    )
+    return candidate_position, match_result.get("score", 0)
+
+
+def save_cv(cv_info: Dict[str, Any], jd_info: Dict[str, Any], candidate_position: str, score: float) -> Dict[str, Any]:
+    """Lưu CV vào DB - nếu trùng email thì xóa bản ghi cũ và tạo mới"""
+    email = cv_info.get("email")
+    social_links = cv_info.get("social_links") or []
+    education = cv_info.get("education") or []
+    candidate_skills = cv_info.get("skills") or []
+    experiences = cv_info.get("experiences") or []
+    projects = cv_info.get("projects") or []
+    required_skills = jd_info.get("skills") or []
+    job_id = jd_info.get("job_id")
+
+    # Thông tin cho các chỉ mục trong bộ nhớ, cập nhật sau khi commit
+    saved: Dict[str, Any] = {}
+
+    def write(db: Session) -> Dict[str, Any]:
+        saved["replaced_id"] = saved["replaced_job_id"] = None
+        # Kiểm tra xem có CV nào với email này chưa
+        if email:
+            existing_cv = db.query(CV).filter(CV.email == email).first()
+            if existing_cv:
+                saved["replaced_id"] = existing_cv.id
+                saved["replaced_job_id"] = existing_cv.job_id
+                # Xóa bản ghi cũ (cùng transaction với bản ghi mới)
+                db.delete(existing_cv)
+                db.flush()
+                print(f"[DB] Đã xóa CV cũ với email: {email}")
+
+        # Tạo CV mới
+        cv = CV(
+            name=cv_info.get("name") or "(Không xác định)",
+            email=email,
+            phone=cv_info.get("phone"),
+            date_of_birth=cv_info.get("date_of_birth"),
+            address=cv_info.get("address"),
+            social_links=json.dumps(social_links, ensure_ascii=False) if social_links else None,
+            education=json.dumps(education, ensure_ascii=False) if education else None,
+
+            candidate_position=candidate_position,
+            candidate_years=cv_info.get("years_experience") or 0,
+            candidate_skills=json.dumps(candidate_skills, ensure_ascii=False) if candidate_skills else None,
+
+            # Có job_id thì yêu cầu JD đã nằm trong bảng jobs, không copy vào từng CV
+            job_id=job_id,
+            target_position=None if job_id else (jd_info.get("position") or ""),
+            required_years=None if job_id else (jd_info.get("years") or 0),
+            required_skills=json.dumps(required_skills, ensure_ascii=False) if required_skills and not job_id else None,
+
+            summary=cv_info.get("summary") or "",
+            experiences=json.dumps(experiences, ensure_ascii=False) if experiences else None,
+            projects=json.dumps(projects, ensure_ascii=False) if projects else None,
+
+            score=score
+        )
+        cv.skill_entries = [CVSkill(skill=key) for key in canonical_skills(candidate_skills)]
+        db.add(cv)
+        db.flush()
+        saved["document"] = cv_document(cv)
+        saved["updated_at"] = cv.updated_at
+        saved["filter_entry"] = (
+            [entry.skill for entry in cv.skill_entries],
+            cv.candidate_years,
+        )
+
+        return {
+            "id": cv.id,
+            "name": cv.name,
+            "candidate_position": cv.candidate_position,
+            "score": cv.score,
+            "message": "CV analyzed successfully"
+        }
+
+    try:
+        # Ghi qua writer thread duy nhất (SQLite) - trả về sau khi đã commit
+        result = write_queue.run(write)
+    except Exception as e:
+        error_msg = str(e)
+        print(f"[ERROR] Lỗi khi lưu CV vào database: {error_msg}")
+        import traceback
+        traceback.print_exc()
+        # Kiểm tra nếu là lỗi database
+        if "disk I/O error" in error_msg or "OperationalError" in error_msg:
+            raise PipelineError(500, "Lỗi truy cập database. Vui lòng thử lại sau.")
+        raise PipelineError(500, f"Lỗi khi lưu CV: {error_msg}")
+
+    index_saved_cv(result["id"], saved["document"], saved["replaced_id"])
+    if saved["replaced_id"] is not None:
+        job_rankings.remove(saved["replaced_job_id"], saved["replaced_id"])
+    job_rankings.add(job_id, result["id"], result["score"], saved["updated_at"])
+    cv_filter_index.remove(saved["replaced_id"])
+    cv_filter_index.add(result["id"], *saved["filter_entry"])
+    return result
+
+
+async def run_in_ai_executor(func, *args):
+    """Chạy lời gọi AI (blocking) trên executor giới hạn"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(ai_executor, func, *args)
+
+
+async def extract_cv_and_jd(cv_text: str, jd_text: str, ai_api_key: str, ai_provider: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Extract CV và JD song song - hai lời gọi AI độc lập nên
+    thời gian chờ = lời gọi chậm hơn thay vì tổng của cả hai
+    """
+    cv_info, jd_info = await asyncio.gather(
+        run_in_ai_executor(extract_cv_info, cv_text, ai_api_key, ai_provider),
+        run_in_ai_executor(extract_jd_info, jd_text, ai_api_key, ai_provider),
+    )
+    return cv_info, jd_info
+
+
+async def analyze_cv_file(file_path: Path, jd_info: Dict[str, Any], ai_api_key: str, ai_provider: str) -> Dict[str, Any]:
+    """Đọc → extract → match → lưu cho một CV, với JD đã được extract sẵn"""
+    cv_text = await asyncio.to_thread(read_cv_text, file_path)
+    print(f"[CV] {file_path.name}: {len(cv_text)} characters")
+    cv_info = await run_in_ai_executor(extract_cv_info, cv_text, ai_api_key, ai_provider)
+    candidate_position, score = score_cv(cv_info, jd_info)
+    return await asyncio.to_thread(save_cv, cv_info, jd_info, candidate_position, score)
+
+
+async def analyze_cv_batch(file_paths: List[Path], jd_info: Dict[str, Any], ai_api_key: str, ai_provider: str,
+                           max_workers: int = BATCH_MAX_WORKERS,
+                           filenames: Optional[List[str]] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Phân tích nhiều CV với cùng một JD qua worker pool giới hạn,
+    yield kết quả từng CV ngay khi xong (không theo thứ tự upload)
+    filenames: tên file gốc để trả về trong kết quả (mặc định: tên file đã lưu)
+    """
+    semaphore = asyncio.Semaphore(max(1, max_workers))
+
+    async def process(file_path: Path, filename: str) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                result = await analyze_cv_file(file_path, jd_info, ai_api_key, ai_provider)
+                return {"filename": filename, "status": "ok", **result}
+            except PipelineError as e:
+                return {"filename": filename, "status": "error", "status_code": e.status_code, "error": e.detail}
+            except Exception as e:
+                print(f"[Batch] Lỗi khi xử lý {filename}: {e}")
+                return {"filename": filename, "status": "error", "status_code": 500, "error": str(e)}
+
+    names = filenames or [path.name for path in file_paths]
+    tasks = [asyncio.create_task(process(path, name)) for path, name in zip(file_paths, names)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Client ngắt kết nối giữa chừng → hủy các CV chưa xử lý
+        for task in tasks:
+            task.cancel()
+
+
+def run_analysis(file_path: Path, jd_text: Optional[str] = None, job_id: Optional[int] = None,
+                 on_stage: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+    """
+    Pipeline đồng bộ cho worker chạy nền, báo từng stage qua on_stage:
+    reading → extracting → matching → saving
+    """
+    def stage(name: str):
+        if on_stage:
+            on_stage(name)
+
+    stage("reading")
+    cv_text = read_cv_text(file_path)
+    print(f"[CV] {file_path.name}: {len(cv_text)} characters")
+
+    stage("extracting")
+    ai_api_key, ai_provider = get_ai_config()
+    if job_id is not None:
+        jd_info = load_job_info(job_id)
+        cv_info = ai_executor.submit(extract_cv_info, cv_text, ai_api_key, ai_provider).result()
+    else:
+        # CV và JD vẫn extract song song trên executor giới hạn
+        cv_future = ai_executor.submit(extract_cv_info, cv_text, ai_api_key, ai_provider)
+        jd_future = ai_executor.submit(extract_jd_info, jd_text or "", ai_api_key, ai_provider)
+        cv_info, jd_info = cv_future.result(), jd_future.result()
+
+    stage("matching")
+    candidate_position, score = score_cv(cv_info, jd_info)
+
+    stage("saving")
+    return save_cv(cv_info, jd_info, candidate_position, score)
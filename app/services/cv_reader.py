@@ -1,15 +1,250 @@
 from PyPDF2 import PdfReader
 from docx import Document
 from pathlib import Path
+from typing import Iterator, Sequence
+from concurrent.futures import ThreadPoolExecutor
+import multiprocessing
+import os
+import threading
 
 
-def read_pdf(file_path: Path) -> str:
-    text = ""
+# Số process đọc PDF (0 = đọc trực tiếp trong process hiện tại, không có timeout)
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Đọc toàn văn (read_pdf): PDF từ số trang này trở lên được chia trang cho nhiều process
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "8"))
+# Thời gian tối đa cho một file - PDF lỗi không được giữ worker mãi
+PDF_TIMEOUT_SECONDS = float(os.getenv("PDF_TIMEOUT_SECONDS", "60"))
+
+def _worker_main(conn):
+    """Process con: nhận (hàm, tham số), trả (True, kết quả) hoặc (False, exception); None = dừng"""
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        fn, args = task
+        try:
+            conn.send((True, fn(*args)))
+        except Exception as e:
+            try:
+                conn.send((False, e))
+            except Exception:
+                # Exception không pickle được
+                conn.send((False, RuntimeError(f"{type(e).__name__}: {e}")))
+
+
+class _PdfWorker:
+    """Một process đọc PDF riêng - bị kẹt thì chỉ process này bị kill, các file khác không ảnh hưởng"""
+
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def run(self, fn, args: tuple, timeout: float) -> tuple:
+        """(True, kết quả) / (False, exception của process con); quá timeout thì raise TimeoutError"""
+        self.conn.send((fn, args))
+        if not self.conn.poll(timeout):
+            raise multiprocessing.TimeoutError()
+        return self.conn.recv()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class PdfWorkerPool:
+    """
+    PDF_WORKERS process đọc PDF, mỗi process làm một file tại một thời điểm
+    - Timeout tính riêng cho từng file (từ lúc file được giao cho process, không tính thời gian chờ process rảnh)
+    - File quá hạn: kill đúng process đang đọc nó, lần sau tạo process mới thay thế
+    """
+
+    def __init__(self, size: int):
+        # spawn: không fork process đang chạy nhiều thread (uvicorn, worker queue)
+        self._context = multiprocessing.get_context("spawn")
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._idle = []
+        self._workers = set()
+
+    def run(self, fn, args: tuple, timeout: float):
+        with self._slots:
+            with self._lock:
+                worker = self._idle.pop() if self._idle else None
+            if worker is None or not worker.process.is_alive():
+                if worker is not None:
+                    self._discard(worker)
+                worker = _PdfWorker(self._context)
+                with self._lock:
+                    self._workers.add(worker)
+            try:
+                ok, value = worker.run(fn, args, timeout)
+            except BaseException:
+                # Process kẹt / chết (hoặc không rõ trạng thái): bỏ process này, task khác vẫn chạy bình thường
+                self._discard(worker)
+                raise
+            # Lỗi do file (exception từ process con) - process vẫn dùng tiếp được
+            self._release(worker)
+            if not ok:
+                raise value
+            return value
+
+    def _release(self, worker: _PdfWorker):
+        with self._lock:
+            if worker in self._workers:
+                self._idle.append(worker)
+
+    def _discard(self, worker: _PdfWorker):
+        with self._lock:
+            self._workers.discard(worker)
+        worker.kill()
+
+    def shutdown(self):
+        with self._lock:
+            workers = list(self._workers)
+            self._workers.clear()
+            self._idle.clear()
+        for worker in workers:
+            worker.kill()
+
+
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+
+
+def _get_pdf_pool() -> PdfWorkerPool:
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            _pdf_pool = PdfWorkerPool(PDF_WORKERS)
+        return _pdf_pool
+
+
+def shutdown_pdf_pool():
+    """Kill mọi process đọc PDF - dùng khi tắt app"""
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is not None:
+            _pdf_pool.shutdown()
+            _pdf_pool = None
+
+
+def _run_in_pool(fn, args: tuple, file_path: Path, timeout: float):
+    try:
+        return _get_pdf_pool().run(fn, args, timeout)
+    except multiprocessing.TimeoutError:
+        raise TimeoutError(f"Đọc PDF quá {timeout:.0f}s, bỏ qua file {file_path.name}")
+
+
+def _extract_page_range(file_path: str, start: int, stop: int) -> list:
+    """Chạy trong process con: extract text của các trang [start, stop), mỗi trang đúng 1 lần"""
+    reader = PdfReader(file_path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def _extract_pages_in_pool(file_path: Path, page_count: int, timeout: float) -> list:
+    """Chia đều trang cho PDF_WORKERS process, các phần đọc song song; một phần quá hạn thì cả file lỗi"""
+    chunk_size = -(-page_count // PDF_WORKERS)
+    ranges = [(start, min(start + chunk_size, page_count)) for start in range(0, page_count, chunk_size)]
+    with ThreadPoolExecutor(max_workers=len(ranges), thread_name_prefix="pdf-pages") as executor:
+        futures = [
+            executor.submit(_run_in_pool, _extract_page_range, (str(file_path), start, stop), file_path, timeout)
+            for start, stop in ranges
+        ]
+        return [text for future in futures for text in future.result()]
+
+
+def read_pdf(file_path: Path, timeout: float = PDF_TIMEOUT_SECONDS) -> str:
+    """
+    Đọc toàn bộ text PDF, mỗi trang extract đúng 1 lần
+    PDF từ PDF_PARALLEL_MIN_PAGES trang: chia trang cho các process đọc PDF, mỗi phần có timeout riêng
+    """
     reader = PdfReader(str(file_path))
-    for page in reader.pages:
-        if page.extract_text():
-            text += page.extract_text() + "\n"
-    return text
+    page_count = len(reader.pages)
+    if PDF_WORKERS > 1 and page_count >= PDF_PARALLEL_MIN_PAGES:
+        page_texts = _extract_pages_in_pool(file_path, page_count, timeout)
+    else:
+        page_texts = (page.extract_text() or "" for page in reader.pages)
+    # Ghép một lần thay vì cộng chuỗi từng trang
+    return "".join(text + "\n" for text in page_texts if text)
+
+
+class LazyPdfPages:
+    """
+    Truy cập text PDF theo trang, chỉ extract trang khi được yêu cầu
+    (không giữ toàn bộ text của file trong bộ nhớ)
+    """
+
+    def __init__(self, file_path: Path):
+        self._reader = PdfReader(str(file_path))
+
+    def __len__(self) -> int:
+        return len(self._reader.pages)
+
+    def __getitem__(self, index: int) -> str:
+        return self._reader.pages[index].extract_text() or ""
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(len(self)):
+            yield self[index]
+
+
+def take_head_tail(pages: Sequence[str], head_chars: int, tail_chars: int, marker: str) -> str:
+    """
+    Lấy head_chars ký tự đầu + tail_chars ký tự cuối của văn bản ghép từ pages
+    - Đọc trang từ đầu tới khi đủ head_chars, rồi đọc ngược từ cuối tới khi đủ tail_chars
+    - Các trang ở giữa không bao giờ được đọc
+    - Nếu đọc hết mọi trang thì trả về toàn văn (giống read_pdf)
+    """
+    page_count = len(pages)
+    head_parts, head_len, next_head = [], 0, 0
+    while next_head < page_count and head_len < head_chars:
+        text = pages[next_head]
+        next_head += 1
+        if text:
+            head_parts.append(text + "\n")
+            head_len += len(text) + 1
+
+    tail_parts, tail_len, next_tail = [], 0, page_count - 1
+    while next_tail >= next_head and tail_len < tail_chars:
+        text = pages[next_tail]
+        next_tail -= 1
+        if text:
+            tail_parts.append(text + "\n")
+            tail_len += len(text) + 1
+    tail_parts.reverse()
+
+    if next_tail < next_head:
+        # Đã đọc hết - không bỏ trang nào
+        return "".join(head_parts + tail_parts)
+    print(f"[Reader] Bỏ qua {next_tail - next_head + 1}/{page_count} trang ở giữa")
+    return "".join(head_parts)[:head_chars] + marker + "".join(tail_parts)[-tail_chars:]
+
+
+def _read_budgeted(file_path: str, head_chars: int, tail_chars: int, marker: str) -> str:
+    """Chạy trong process con (hoặc trực tiếp khi PDF_WORKERS=0)"""
+    path = Path(file_path)
+    if path.suffix.lower() == ".pdf":
+        pages = LazyPdfPages(path)
+    else:
+        pages = [read_cv(path)]
+    return take_head_tail(pages, head_chars, tail_chars, marker)
+
+
+def read_cv_budgeted(file_path: Path, head_chars: int, tail_chars: int, marker: str,
+                     timeout: float = PDF_TIMEOUT_SECONDS) -> str:
+    """
+    Đọc CV vừa đủ cho prompt: head_chars đầu + tail_chars cuối,
+    bỏ qua các trang ở giữa của file rất dài
+    """
+    if file_path.suffix.lower() == ".pdf" and PDF_WORKERS > 0:
+        return _run_in_pool(_read_budgeted, (str(file_path), head_chars, tail_chars, marker), file_path, timeout)
+    return _read_budgeted(str(file_path), head_chars, tail_chars, marker)
 
 
 def read_docx(file_path: Path) -> str:
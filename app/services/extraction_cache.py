@@ -0,0 +1,165 @@
+"""
+Cache kết quả trích xuất CV bằng AI (content-addressed)
+Key = sha256(CV text đã chuẩn hóa + provider + prompt version)
+Lưu bền vững trong SQLite (./data), evict theo tuổi (TTL) và LRU
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Optional, Dict, Any
+
+
+CACHE_PATH = Path(os.getenv("EXTRACTION_CACHE_PATH", "./data/extraction_cache.db"))
+CACHE_MAX_ENTRIES = int(os.getenv("EXTRACTION_CACHE_MAX_ENTRIES", "2000"))
+CACHE_TTL_DAYS = int(os.getenv("EXTRACTION_CACHE_TTL_DAYS", "30"))
+CACHE_ENABLED = os.getenv("EXTRACTION_CACHE_ENABLED", "true").lower() not in ["false", "0", "no"]
+
+
+def normalize_cv_text(text: str) -> str:
+    """
+    Chuẩn hóa CV text trước khi hash:
+    - Unicode NFC (PDF có thể trả về tiếng Việt dạng tổ hợp)
+    - Gộp khoảng trắng trong từng dòng, bỏ dòng trống
+    """
+    text = unicodedata.normalize("NFC", text or "")
+    lines = (" ".join(line.split()) for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+class ExtractionCache:
+    """Cache kết quả clean_ai_result, dùng chung giữa các request/thread"""
+
+    def __init__(self, path: Path, max_entries: int, ttl_seconds: int, enabled: bool = True):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # Mở kết nối lần đầu khi cần (tránh tạo file khi cache bị tắt)
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS extraction_cache (
+                    key TEXT PRIMARY KEY,
+                    provider TEXT,
+                    prompt_version TEXT,
+                    result TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )"""
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_extraction_cache_last_access ON extraction_cache (last_access)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def make_key(cv_text: str, provider: str, prompt_version: str) -> str:
+        payload = "\x1f".join([prompt_version, provider.lower(), normalize_cv_text(cv_text)])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                row = conn.execute(
+                    "SELECT result, created_at FROM extraction_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                result, created_at = row
+                if self.ttl_seconds > 0 and now - created_at > self.ttl_seconds:
+                    # Hết hạn - xóa và coi như miss
+                    conn.execute("DELETE FROM extraction_cache WHERE key = ?", (key,))
+                    conn.commit()
+                    self.evictions += 1
+                    self.misses += 1
+                    return None
+                conn.execute("UPDATE extraction_cache SET last_access = ? WHERE key = ?", (now, key))
+                conn.commit()
+                self.hits += 1
+            return json.loads(result)
+        except (sqlite3.Error, ValueError) as e:
+            print(f"[Cache] Lỗi khi đọc cache: {e}")
+            return None
+
+    def set(self, key: str, value: Dict[str, Any], provider: str = "", prompt_version: str = ""):
+        if not self.enabled or not value:
+            return
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO extraction_cache "
+                    "(key, provider, prompt_version, result, created_at, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, provider, prompt_version, json.dumps(value, ensure_ascii=False), now, now)
+                )
+                self._evict(conn, now)
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"[Cache] Lỗi khi ghi cache: {e}")
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """Xóa entry hết hạn, sau đó xóa entry ít dùng nhất nếu vượt max_entries"""
+        if self.ttl_seconds > 0:
+            cur = conn.execute("DELETE FROM extraction_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+            self.evictions += max(cur.rowcount, 0)
+        if self.max_entries > 0:
+            cur = conn.execute(
+                "DELETE FROM extraction_cache WHERE key IN ("
+                "SELECT key FROM extraction_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self.evictions += max(cur.rowcount, 0)
+
+    def clear(self):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM extraction_cache")
+            conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        entries = 0
+        if self.enabled:
+            try:
+                with self._lock:
+                    entries = self._connect().execute("SELECT COUNT(*) FROM extraction_cache").fetchone()[0]
+            except sqlite3.Error:
+                pass
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_days": round(self.ttl_seconds / 86400, 2),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+extraction_cache = ExtractionCache(
+    CACHE_PATH,
+    max_entries=CACHE_MAX_ENTRIES,
+    ttl_seconds=CACHE_TTL_DAYS * 86400,
+    enabled=CACHE_ENABLED,
+)
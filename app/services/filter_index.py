@@ -0,0 +1,212 @@
+"""
+Chỉ mục ngược trong bộ nhớ cho lọc CV: kỹ năng / số năm kinh nghiệm → mảng id CV (NumPy, đã sắp xếp)
+- Dựng khi khởi động từ bảng cvs + cv_skills, cập nhật ngay khi lưu CV (CV trùng email bị thay thế thì bỏ ra)
+- Lọc AND = giao các posting list (bắt đầu từ list ngắn nhất), OR = hợp; DB chỉ còn lấy CV theo id
+- Vị trí không đưa vào chỉ mục: lọc vị trí là tìm chuỗi con (ilike) trong candidate_position / target_position,
+  danh mục vị trí không giữ được đúng nghĩa đó (VD: "developer" khớp cả Backend lẫn Frontend Developer)
+- Số năm: mỗi năm một bucket (0..YEARS_BUCKET_MAX), "ít nhất N năm" = hợp các bucket >= N
+- Nhiều process (nhiều uvicorn worker) cùng ghi DB: mỗi lần lọc so max(id) của bảng cvs với chỉ mục,
+  khác thì đọc bổ sung CV mới và bỏ CV đã xóa
+- Trả về None khi không trả lời được (chỉ mục tắt, lỗi khi dựng...) → endpoint lọc bằng SQL như cũ
+"""
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import func
+
+from app.models.database import ReadSessionLocal
+from app.models.cv_model import CV, CVSkill
+from app.services.skill_index import canonical_skills
+
+
+FILTER_INDEX_ENABLED = os.getenv("CV_FILTER_INDEX_ENABLED", "true").lower() not in ["false", "0", "no"]
+YEARS_BUCKET_MAX = 50
+
+_EMPTY = np.zeros(0, dtype=np.int64)
+
+
+def _years_bucket(years: Optional[int]) -> int:
+    return min(max(int(years or 0), 0), YEARS_BUCKET_MAX)
+
+
+class CVFilterIndex:
+    def __init__(self, enabled: bool = FILTER_INDEX_ENABLED):
+        self.enabled = enabled
+        self._lock = threading.RLock()
+        self._skills: Dict[str, np.ndarray] = {}
+        self._years: Dict[int, np.ndarray] = {}
+        # cv_id → (skill keys, years bucket) - để gỡ CV khỏi các posting list
+        self._entries: Dict[int, Tuple[Tuple[str, ...], int]] = {}
+        self._max_id = 0
+        self._loaded = False
+        self.queries = 0
+
+    # ---------- dựng / đồng bộ ----------
+    def load(self) -> int:
+        if not self.enabled:
+            return 0
+        with self._lock:
+            started = time.perf_counter()
+            skills: Dict[str, List[int]] = {}
+            years: Dict[int, List[int]] = {}
+            entries = {}
+            db = ReadSessionLocal()
+            try:
+                skill_rows: Dict[int, List[str]] = {}
+                for cv_id, skill in db.query(CVSkill.cv_id, CVSkill.skill):
+                    skill_rows.setdefault(cv_id, []).append(skill)
+                rows = db.query(CV.id, CV.candidate_years).all()
+            finally:
+                db.close()
+
+            for row in rows:
+                entry = self._entry(skill_rows.get(row.id, []), row.candidate_years)
+                entries[row.id] = entry
+                for key in entry[0]:
+                    skills.setdefault(key, []).append(row.id)
+                years.setdefault(entry[1], []).append(row.id)
+
+            self._skills = {key: np.unique(np.asarray(ids, dtype=np.int64)) for key, ids in skills.items()}
+            self._years = {key: np.unique(np.asarray(ids, dtype=np.int64)) for key, ids in years.items()}
+            self._entries = entries
+            self._max_id = max(entries, default=0)
+            self._loaded = True
+            elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+            print(f"[FilterIndex] {len(entries)} CV, {len(self._skills)} kỹ năng ({elapsed_ms} ms)")
+            return len(entries)
+
+    @staticmethod
+    def _entry(skill_keys: Iterable[str], years: Optional[int]):
+        return tuple(canonical_skills(skill_keys)), _years_bucket(years)
+
+    def _refresh(self):
+        """CV được process khác thêm/xóa từ lần đồng bộ trước (max(id) đã đổi)"""
+        db = ReadSessionLocal()
+        try:
+            max_id = db.query(func.max(CV.id)).scalar() or 0
+            if max_id == self._max_id:
+                return
+            db_ids = {row[0] for row in db.query(CV.id)}
+            for cv_id in [cv_id for cv_id in self._entries if cv_id not in db_ids]:
+                self.remove(cv_id)
+            new_ids = [cv_id for cv_id in db_ids if cv_id not in self._entries]
+            for start in range(0, len(new_ids), 500):
+                chunk = new_ids[start:start + 500]
+                skill_rows: Dict[int, List[str]] = {}
+                for cv_id, skill in db.query(CVSkill.cv_id, CVSkill.skill).filter(CVSkill.cv_id.in_(chunk)):
+                    skill_rows.setdefault(cv_id, []).append(skill)
+                for row in db.query(CV.id, CV.candidate_years).filter(CV.id.in_(chunk)):
+                    self.add(row.id, skill_rows.get(row.id, []), row.candidate_years)
+            self._max_id = max(self._max_id, max_id)
+        finally:
+            db.close()
+
+    # ---------- cập nhật ----------
+    @staticmethod
+    def _insert(postings: dict, key, cv_id: int):
+        ids = postings.get(key, _EMPTY)
+        at = int(np.searchsorted(ids, cv_id))
+        if at < len(ids) and ids[at] == cv_id:
+            return
+        postings[key] = np.insert(ids, at, cv_id)
+
+    @staticmethod
+    def _delete(postings: dict, key, cv_id: int):
+        ids = postings.get(key)
+        if ids is None:
+            return
+        at = int(np.searchsorted(ids, cv_id))
+        if at < len(ids) and ids[at] == cv_id:
+            ids = np.delete(ids, at)
+            if len(ids):
+                postings[key] = ids
+            else:
+                del postings[key]
+
+    def add(self, cv_id: int, skill_keys: Iterable[str], years: Optional[int]):
+        if not (self.enabled and self._loaded):
+            return
+        with self._lock:
+            self.remove(cv_id)
+            entry = self._entry(skill_keys, years)
+            for key in entry[0]:
+                self._insert(self._skills, key, cv_id)
+            self._insert(self._years, entry[1], cv_id)
+            self._entries[cv_id] = entry
+            # Id liền sau _max_id: chưa process nào khác chen vào → lần lọc sau không phải đọc lại bảng cvs
+            # Có khoảng trống (process khác vừa thêm CV) thì giữ _max_id, lần lọc sau đồng bộ với DB
+            if cv_id == self._max_id + 1:
+                self._max_id = cv_id
+
+    def remove(self, cv_id: Optional[int]):
+        if cv_id is None or not (self.enabled and self._loaded):
+            return
+        with self._lock:
+            entry = self._entries.pop(cv_id, None)
+            if entry is None:
+                return
+            for key in entry[0]:
+                self._delete(self._skills, key, cv_id)
+            self._delete(self._years, entry[1], cv_id)
+
+    # ---------- truy vấn ----------
+    def candidate_ids(self, skills: Sequence[str] = (), match_all: bool = True,
+                      min_years: int = 0) -> Optional[np.ndarray]:
+        """
+        Mảng id CV (tăng dần) thỏa mọi điều kiện được truyền vào
+        skills + match_all: có đủ (AND) / có ít nhất một (OR) kỹ năng; min_years: ít nhất bao nhiêu năm
+        None: chỉ mục không trả lời được (tắt / chưa dựng / không có điều kiện nào) → lọc bằng SQL
+        """
+        if not self.enabled:
+            return None
+        keys = canonical_skills(skills)
+        if not keys and not (min_years and min_years > 0):
+            return None
+        if min_years and min_years > YEARS_BUCKET_MAX:
+            return None
+        with self._lock:
+            try:
+                if not self._loaded:
+                    self.load()
+                else:
+                    self._refresh()
+            except Exception as e:
+                print(f"[FilterIndex] Không đồng bộ được chỉ mục, lọc bằng SQL: {e}")
+                return None
+            self.queries += 1
+
+            postings: List[np.ndarray] = []
+            if keys:
+                skill_postings = [self._skills.get(key, _EMPTY) for key in keys]
+                if match_all:
+                    postings += skill_postings
+                else:
+                    postings.append(np.unique(np.concatenate(skill_postings)))
+            if min_years and min_years > 0:
+                # Các bucket không giao nhau: nối lại rồi sắp xếp là đủ
+                buckets = [ids for bucket, ids in self._years.items() if bucket >= min_years]
+                postings.append(np.sort(np.concatenate(buckets)) if buckets else _EMPTY)
+
+            # Giao từ posting list ngắn nhất
+            postings.sort(key=len)
+            result = postings[0]
+            for ids in postings[1:]:
+                if not len(result):
+                    break
+                result = np.intersect1d(result, ids, assume_unique=True)
+            return result
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "loaded": self._loaded,
+            "cvs": len(self._entries),
+            "skills": len(self._skills),
+            "queries": self.queries,
+        }
+
+
+cv_filter_index = CVFilterIndex()
@@ -0,0 +1,183 @@
+"""
+Registry chọn Gemini model dùng chung cho cả process
+- Resolve model khả dụng một lần (lúc startup), cache theo TTL
+- Hết TTL: vẫn dùng model cũ, refresh ở background thread
+- Chỉ khi gặp 404 mới probe lại các model ứng viên (song song)
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple, List
+
+
+MODEL_TTL_SECONDS = int(os.getenv("GEMINI_MODEL_TTL_SECONDS", "3600"))
+PROBE_WORKERS = int(os.getenv("GEMINI_PROBE_WORKERS", "4"))
+
+# Bỏ qua các model trả phí / thử nghiệm / không phải text
+EXCLUDED_PATTERNS = ['2.5', '2.0', 'exp', 'ultra', 'computer-use', 'tts', 'image-generation', 'lite']
+
+# Dùng khi list_models lỗi hoặc không có model phù hợp
+FALLBACK_MODEL_NAMES = ['gemini-flash-latest', 'gemini-pro-latest', 'gemini-1.5-pro']
+
+
+def _model_priority(model_name: str) -> Optional[int]:
+    """Độ ưu tiên: gemini-1.5-flash > flash khác > pro; None = không dùng"""
+    name = model_name.lower()
+    if 'gemini' not in name or any(excluded in name for excluded in EXCLUDED_PATTERNS):
+        return None
+    if '1.5-flash' in name:
+        return 0
+    if 'flash' in name:
+        return 1
+    if 'pro' in name:
+        return 2
+    return None
+
+
+class GeminiModelRegistry:
+    def __init__(self, ttl_seconds: int = MODEL_TTL_SECONDS, probe_workers: int = PROBE_WORKERS):
+        self.ttl_seconds = ttl_seconds
+        self.probe_workers = max(1, probe_workers)
+        self._lock = threading.Lock()
+        self._configured_key = None
+        self._model = None
+        self._model_name = None
+        self._resolved_at = 0.0
+        self._refreshing = False
+        self._not_found = set()
+
+    # ---------- helpers ----------
+    def _configure(self, genai, api_key: str):
+        # genai.configure là cấu hình global, chỉ cần gọi lại khi đổi API key
+        if self._configured_key != api_key:
+            genai.configure(api_key=api_key)
+            self._configured_key = api_key
+            self._model = None
+            self._model_name = None
+            self._not_found.clear()
+
+    def _list_candidates(self, genai) -> List[str]:
+        """Danh sách model ứng viên, sắp theo độ ưu tiên"""
+        candidates = []
+        try:
+            print("[Gemini] Đang list models để tìm model khả dụng...")
+            for m in genai.list_models():
+                if 'generateContent' not in m.supported_generation_methods:
+                    continue
+                priority = _model_priority(m.name)
+                if priority is not None:
+                    candidates.append((priority, m.name))
+            print(f"[Gemini] Tìm thấy {len(candidates)} model ứng viên")
+        except Exception as e:
+            print(f"[Gemini] Lỗi khi list models: {e}")
+
+        # sort ổn định: giữ thứ tự của list_models trong cùng độ ưu tiên
+        candidates.sort(key=lambda x: x[0])
+        names = [name for _, name in candidates]
+        names += [name for name in FALLBACK_MODEL_NAMES if name not in names]
+        return [name for name in names if name not in self._not_found]
+
+    @staticmethod
+    def _probe(genai, model_name: str):
+        """Thử generate 1 token; trả về model nếu dùng được"""
+        try:
+            model = genai.GenerativeModel(model_name)
+            model.generate_content("test", generation_config={"max_output_tokens": 1})
+            return model
+        except Exception as e:
+            print(f"[Gemini] Model {model_name} không thể generate: {str(e)[:150]}")
+            return None
+
+    def _resolve(self, genai) -> Tuple[object, str]:
+        """
+        Probe song song theo từng nhóm PROBE_WORKERS model (theo thứ tự ưu tiên),
+        chọn model ưu tiên cao nhất probe thành công
+        """
+        candidates = self._list_candidates(genai)
+        with ThreadPoolExecutor(max_workers=self.probe_workers) as pool:
+            for start in range(0, len(candidates), self.probe_workers):
+                batch = candidates[start:start + self.probe_workers]
+                results = list(pool.map(lambda name: self._probe(genai, name), batch))
+                for name, model in zip(batch, results):
+                    if model is not None:
+                        print(f"[Gemini] ✓ Sử dụng model: {name}")
+                        return model, name
+        return None, None
+
+    def _store(self, model, model_name: str):
+        self._model = model
+        self._model_name = model_name
+        self._resolved_at = time.monotonic()
+
+    def _refresh_in_background(self, genai):
+        def run():
+            try:
+                model, model_name = self._resolve(genai)
+                if model is not None:
+                    with self._lock:
+                        self._store(model, model_name)
+            finally:
+                self._refreshing = False
+
+        self._refreshing = True
+        threading.Thread(target=run, name="gemini-model-refresh", daemon=True).start()
+
+    # ---------- public API ----------
+    def get_model(self, api_key: str) -> Tuple[object, str]:
+        """
+        Trả về (GenerativeModel, tên model) - hot path không gọi mạng khi đã có cache
+        Raise Exception nếu không có model khả dụng
+        """
+        import google.generativeai as genai
+
+        with self._lock:
+            self._configure(genai, api_key)
+            if self._model is None:
+                # Lần đầu: resolve đồng bộ (giữ lock để các request đồng thời không probe trùng)
+                model, model_name = self._resolve(genai)
+                if model is None:
+                    raise Exception(f"Không tìm thấy Gemini model khả dụng. API key: {'***' + api_key[-4:] if len(api_key) > 4 else 'INVALID'}. Vui lòng kiểm tra API key và quyền truy cập.")
+                self._store(model, model_name)
+            elif time.monotonic() - self._resolved_at > self.ttl_seconds and not self._refreshing:
+                self._refresh_in_background(genai)
+            return self._model, self._model_name
+
+    def on_model_not_found(self, api_key: str, model_name: str) -> Tuple[object, str]:
+        """Model trả 404: loại model đó và probe lại các ứng viên còn lại"""
+        import google.generativeai as genai
+
+        with self._lock:
+            self._configure(genai, api_key)
+            # Request khác đã chuyển sang model mới trong lúc chờ lock
+            if self._model is not None and self._model_name != model_name:
+                return self._model, self._model_name
+            self._not_found.add(model_name)
+            model, new_name = self._resolve(genai)
+            if model is None:
+                self._model = None
+                raise Exception(f"Không tìm thấy Gemini model khả dụng. Model {model_name} không tồn tại. Vui lòng kiểm tra API key.")
+            print(f"[Gemini] ✓ Chuyển sang model: {new_name}")
+            self._store(model, new_name)
+            return self._model, self._model_name
+
+    def warm_up(self, api_key: str):
+        """Resolve model ở background lúc startup để request đầu tiên không phải chờ probe"""
+        def run():
+            try:
+                self.get_model(api_key)
+            except Exception as e:
+                print(f"[Gemini] Warm-up thất bại: {str(e)[:200]}")
+
+        threading.Thread(target=run, name="gemini-model-warmup", daemon=True).start()
+
+    def status(self) -> dict:
+        return {
+            "model": self._model_name,
+            "age_seconds": round(time.monotonic() - self._resolved_at, 1) if self._model_name else None,
+            "ttl_seconds": self.ttl_seconds,
+            "not_found": sorted(self._not_found),
+        }
+
+
+gemini_registry = GeminiModelRegistry()
@@ -0,0 +1,165 @@
+"""
+Top-K CV theo điểm cho từng job (shortlist) - giữ trong bộ nhớ, không sắp xếp lại cả bảng cvs mỗi lần xem
+- Mỗi job một min-heap giới hạn JOB_TOP_K phần tử (score, cv_id): CV mới chỉ vào heap khi hơn phần tử nhỏ nhất
+- Nạp từ DB (một truy vấn LIMIT JOB_TOP_K) kèm mốc của job: (max(id), số CV, max(updated_at))
+- Mỗi lần hỏi so mốc trong DB với mốc của heap: khác (process / host khác vừa thêm, xóa, chấm lại CV) thì nạp lại
+- CV do chính process này lưu / xóa được cập nhật vào heap và mốc ngay, không phải nạp lại
+- Khi một CV trong heap bị xóa mà job còn CV nằm ngoài heap thì không biết CV kế tiếp là ai → bỏ heap,
+  lần hỏi sau nạp lại từ DB; chấm lại cả job cũng chỉ bỏ heap
+- Danh sách đã sắp xếp được giữ sẵn tới lần thay đổi kế tiếp: hỏi top k chỉ là cắt k phần tử đầu
+"""
+import heapq
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.database import ReadSessionLocal
+from app.models.cv_model import CV
+
+
+JOB_TOP_K = int(os.getenv("JOB_TOP_K", "200"))
+
+# (max(id), số CV, max(updated_at)) của một job
+Watermark = Tuple[int, int, Optional[datetime]]
+
+
+class _JobHeap:
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.heap: List[Tuple[float, int]] = []
+        self.members: Dict[int, float] = {}
+        # Có CV của job nằm ngoài heap (bị đẩy ra hoặc không được nạp)
+        self.truncated = False
+        # Mốc DB lúc nạp (cộng các thay đổi của chính process); None = không còn biết, nạp lại
+        self.watermark: Optional[Watermark] = None
+        self._ranked: Optional[List[Tuple[int, float]]] = None
+
+    def push(self, cv_id: int, score: float):
+        if len(self.heap) < self.capacity:
+            heapq.heappush(self.heap, (score, cv_id))
+            self.members[cv_id] = score
+        elif (score, cv_id) > self.heap[0]:
+            _, evicted = heapq.heapreplace(self.heap, (score, cv_id))
+            del self.members[evicted]
+            self.members[cv_id] = score
+            self.truncated = True
+        else:
+            self.truncated = True
+            return
+        self._ranked = None
+
+    def discard(self, cv_id: int):
+        self.members.pop(cv_id)
+        self.heap = [(score, member) for member, score in self.members.items()]
+        heapq.heapify(self.heap)
+        self._ranked = None
+
+    def ranked(self) -> List[Tuple[int, float]]:
+        """(cv_id, score) giảm dần theo điểm, cùng điểm thì id lớn trước (giống /cv/list)"""
+        if self._ranked is None:
+            self._ranked = [(cv_id, score) for score, cv_id in sorted(self.heap, reverse=True)]
+        return self._ranked
+
+
+class JobRankings:
+    def __init__(self, capacity: int = JOB_TOP_K):
+        self.capacity = max(1, capacity)
+        self._jobs: Dict[int, _JobHeap] = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    # ---------- truy vấn ----------
+    def top(self, job_id: int, k: int) -> List[Tuple[int, float]]:
+        """k CV điểm cao nhất của job: [(cv_id, score)]"""
+        with self._lock:
+            db = ReadSessionLocal()
+            try:
+                watermark = self._watermark(db, job_id)
+                job = self._jobs.get(job_id)
+                if job is None or job.watermark != watermark:
+                    job = self._load(db, job_id, watermark)
+            finally:
+                db.close()
+            return job.ranked()[:k]
+
+    @staticmethod
+    def _watermark(db: Session, job_id: int) -> Watermark:
+        max_id, count, updated_at = (
+            db.query(func.max(CV.id), func.count(CV.id), func.max(CV.updated_at))
+            .filter(CV.job_id == job_id)
+            .one()
+        )
+        return max_id or 0, count, updated_at
+
+    def _load(self, db: Session, job_id: int, watermark: Watermark) -> _JobHeap:
+        # Mốc đọc trước các dòng: ghi chen vào giữa chỉ làm lần hỏi sau nạp lại, không bị bỏ sót
+        rows = (
+            db.query(CV.id, CV.score)
+            .filter(CV.job_id == job_id, CV.score.isnot(None))
+            .order_by(CV.score.desc(), CV.id.desc())
+            .limit(self.capacity)
+            .all()
+        )
+        job = _JobHeap(self.capacity)
+        job.heap = [(row.score, row.id) for row in rows]
+        heapq.heapify(job.heap)
+        job.members = {row.id: row.score for row in rows}
+        # Đủ capacity: có thể còn CV khác ngoài heap
+        job.truncated = len(rows) == self.capacity
+        job.watermark = watermark
+        self._jobs[job_id] = job
+        self.loads += 1
+        return job
+
+    # ---------- cập nhật ----------
+    def add(self, job_id: Optional[int], cv_id: int, score: Optional[float], updated_at: Optional[datetime]):
+        """CV mới được lưu - chỉ cập nhật job đã có heap, job chưa nạp sẽ đọc từ DB khi cần"""
+        if job_id is None:
+            return
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or cv_id in job.members:
+                # Có trong heap: heap (và mốc) vừa được nạp lại sau khi CV đã commit
+                return
+            if score is not None:
+                job.push(cv_id, score)
+            if job.watermark is not None:
+                # Mốc DB sẽ có nếu không process nào khác ghi vào job; có thì mốc lệch → lần hỏi sau nạp lại
+                max_id, count, last_updated = job.watermark
+                job.watermark = (
+                    max(max_id, cv_id),
+                    count + 1,
+                    max(last_updated, updated_at) if last_updated and updated_at else last_updated or updated_at,
+                )
+
+    def remove(self, job_id: Optional[int], cv_id: int):
+        if job_id is None:
+            return
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            if cv_id in job.members:
+                if job.truncated:
+                    del self._jobs[job_id]
+                    return
+                job.discard(cv_id)
+            if job.watermark is not None:
+                max_id, count, last_updated = job.watermark
+                # Xóa CV id lớn nhất: không biết max(id) mới → lần hỏi sau nạp lại
+                job.watermark = None if cv_id == max_id else (max_id, count - 1, last_updated)
+
+    def invalidate(self, job_id: int):
+        """Bỏ heap của job (sau khi chấm lại cả job) - lần hỏi sau nạp lại từ DB"""
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def stats(self) -> dict:
+        return {"capacity": self.capacity, "jobs": len(self._jobs), "loads": self.loads}
+
+
+job_rankings = JobRankings()
@@ -0,0 +1,72 @@
+"""
+Quét nhiều từ khóa trong một lần duyệt văn bản
+- Mọi từ khóa được gộp thành một regex alternation (dài trước, ngắn sau), biên dịch một lần khi khởi tạo,
+  thay cho vòng lặp chạy một regex \\b...\\b cho từng từ khóa
+- Ranh giới từ bằng lookaround: không dính chữ/số và các ký tự thuộc tên kỹ năng (".", "+", "#")
+  → "c++", "c#", ".net" match đúng, "js" không match trong "node.js"
+- Regex chỉ trả về match dài nhất tại mỗi vị trí (VD: "react native" chứ không phải "react"):
+  bảng contains tính sẵn các từ khóa nằm trong từ khóa khác để kết quả giống quét từng từ khóa riêng
+"""
+import re
+from typing import Dict, Generic, Hashable, Iterable, List, Mapping, TypeVar
+
+
+T = TypeVar("T", bound=Hashable)
+
+_BOUNDARY_BEFORE = r"(?<![\w.+#])"
+_BOUNDARY_AFTER = r"(?![\w+#])"
+
+
+class KeywordScanner(Generic[T]):
+    """
+    keywords: từ khóa → giá trị trả về khi gặp (nhiều từ khóa có thể cùng một giá trị, VD: alias → skill id)
+    Không phân biệt hoa thường
+    """
+
+    def __init__(self, keywords: Mapping[str, T]):
+        self._values: Dict[str, T] = {}
+        for keyword, value in keywords.items():
+            key = keyword.strip().lower()
+            if key:
+                self._values[key] = value
+
+        ordered = sorted(self._values, key=len, reverse=True)
+        alternation = "|".join(re.escape(keyword) for keyword in ordered) or r"(?!)"
+        self._pattern = re.compile(_BOUNDARY_BEFORE + "(" + alternation + ")" + _BOUNDARY_AFTER, re.IGNORECASE)
+
+        # Từ khóa → các giá trị của từ khóa ngắn hơn nằm trọn trong nó (có ranh giới), VD: "react native" → react
+        self._contains: Dict[str, List[T]] = {}
+        for keyword in ordered:
+            inner = []
+            for other in ordered:
+                if len(other) >= len(keyword):
+                    continue
+                if re.search(_BOUNDARY_BEFORE + re.escape(other) + _BOUNDARY_AFTER, keyword):
+                    inner.append(self._values[other])
+            if inner:
+                self._contains[keyword] = inner
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def finditer(self, text: str) -> Iterable[str]:
+        """Các từ khóa (chữ thường) match dài nhất, theo thứ tự xuất hiện"""
+        for match in self._pattern.finditer(text or ""):
+            yield match.group(1).lower()
+
+    def scan(self, text: str) -> List[T]:
+        """Giá trị của mọi từ khóa có trong text (kể cả từ khóa nằm trong từ khóa khác), bỏ trùng, theo thứ tự xuất hiện"""
+        found: List[T] = []
+        seen = set()
+        for keyword in self.finditer(text):
+            for value in [self._values[keyword], *self._contains.get(keyword, ())]:
+                if value not in seen:
+                    seen.add(value)
+                    found.append(value)
+        return found
+
+    def first(self, text: str):
+        """Giá trị của từ khóa đầu tiên gặp trong text, None nếu không có"""
+        for keyword in self.finditer(text):
+            return self._values[keyword]
+        return None
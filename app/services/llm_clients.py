@@ -0,0 +1,146 @@
+"""
+Client OpenAI / Anthropic dùng chung cho cả process
+- Mỗi (provider, API key) một client, tạo lần đầu cần dùng rồi giữ lại: connection pool (keep-alive)
+  và phiên TLS được dùng lại giữa các request thay vì mở kết nối mới mỗi lần trích xuất
+- httpx pool / timeout cấu hình qua env; base_url lấy từ OPENAI_BASE_URL / ANTHROPIC_BASE_URL (proxy, gateway, mock)
+- Có bản async (AsyncOpenAI, AsyncAnthropic) cho code chạy trong event loop
+- SDK không tự retry (max_retries=0): 429 do llm_scheduler (rate_limiter) backoff và thử lại,
+  SDK retry thêm bên dưới sẽ nhân số lần gọi lên
+- Đóng toàn bộ client khi tắt app
+"""
+import os
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import httpx
+
+try:
+    import httpx2
+except ImportError:
+    httpx2 = None
+
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "20"))
+LLM_HTTP_MAX_KEEPALIVE = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "10"))
+LLM_HTTP_KEEPALIVE_SECONDS = float(os.getenv("LLM_HTTP_KEEPALIVE_SECONDS", "60"))
+LLM_HTTP_CONNECT_TIMEOUT = float(os.getenv("LLM_HTTP_CONNECT_TIMEOUT", "10"))
+# Trích xuất CV dài có thể mất cả phút
+LLM_HTTP_TIMEOUT = float(os.getenv("LLM_HTTP_TIMEOUT", "120"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "0"))
+
+BASE_URL_ENV = {
+    "openai": "OPENAI_BASE_URL",
+    "anthropic": "ANTHROPIC_BASE_URL",
+}
+
+
+def _http_module(sdk):
+    """Package HTTP của SDK: httpx, hoặc httpx2 với các bản SDK dựng client trên httpx2"""
+    if httpx2 is not None and issubclass(sdk.DefaultHttpxClient, httpx2.Client):
+        return httpx2
+    return httpx
+
+
+def _http_options(sdk) -> Dict[str, Any]:
+    # Limits / Timeout phải cùng package với client của SDK
+    http = _http_module(sdk)
+    return {
+        "limits": http.Limits(
+            max_connections=LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=LLM_HTTP_KEEPALIVE_SECONDS,
+        ),
+        "timeout": http.Timeout(LLM_HTTP_TIMEOUT, connect=LLM_HTTP_CONNECT_TIMEOUT),
+    }
+
+
+def _openai_client(api_key: str, base_url: Optional[str]):
+    import openai
+
+    return openai.OpenAI(api_key=api_key, base_url=base_url, max_retries=LLM_MAX_RETRIES,
+                         http_client=openai.DefaultHttpxClient(**_http_options(openai)))
+
+
+def _async_openai_client(api_key: str, base_url: Optional[str]):
+    import openai
+
+    return openai.AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=LLM_MAX_RETRIES,
+                              http_client=openai.DefaultAsyncHttpxClient(**_http_options(openai)))
+
+
+def _anthropic_client(api_key: str, base_url: Optional[str]):
+    import anthropic
+
+    return anthropic.Anthropic(api_key=api_key, base_url=base_url, max_retries=LLM_MAX_RETRIES,
+                               http_client=anthropic.DefaultHttpxClient(**_http_options(anthropic)))
+
+
+def _async_anthropic_client(api_key: str, base_url: Optional[str]):
+    import anthropic
+
+    return anthropic.AsyncAnthropic(api_key=api_key, base_url=base_url, max_retries=LLM_MAX_RETRIES,
+                                    http_client=anthropic.DefaultAsyncHttpxClient(**_http_options(anthropic)))
+
+
+# (provider, async?) → hàm tạo client
+_FACTORIES: Dict[Tuple[str, bool], Callable[[str, Optional[str]], Any]] = {
+    ("openai", False): _openai_client,
+    ("openai", True): _async_openai_client,
+    ("anthropic", False): _anthropic_client,
+    ("anthropic", True): _async_anthropic_client,
+}
+
+
+class LLMClientRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients: Dict[Tuple[str, bool, str], Any] = {}
+        self.created = 0
+
+    def _get(self, provider: str, is_async: bool, api_key: str):
+        key = (provider, is_async, api_key)
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    base_url = os.getenv(BASE_URL_ENV[provider]) or None
+                    client = _FACTORIES[(provider, is_async)](api_key, base_url)
+                    self._clients[key] = client
+                    self.created += 1
+                    kind = "async" if is_async else "sync"
+                    print(f"[LLMClient] Tạo client {provider} ({kind}){f' - {base_url}' if base_url else ''}")
+        return client
+
+    def openai(self, api_key: str):
+        return self._get("openai", False, api_key)
+
+    def async_openai(self, api_key: str):
+        return self._get("openai", True, api_key)
+
+    def anthropic(self, api_key: str):
+        return self._get("anthropic", False, api_key)
+
+    def async_anthropic(self, api_key: str):
+        return self._get("anthropic", True, api_key)
+
+    async def aclose(self):
+        """Đóng mọi client (gọi khi tắt app) - client async phải được đóng trong event loop"""
+        with self._lock:
+            clients = list(self._clients.items())
+            self._clients.clear()
+        for (provider, is_async, _), client in clients:
+            try:
+                if is_async:
+                    await client.close()
+                else:
+                    client.close()
+            except Exception as e:
+                print(f"[LLMClient] Lỗi khi đóng client {provider}: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            clients = [f"{provider}{'-async' if is_async else ''}" for provider, is_async, _ in self._clients]
+        return {"clients": clients, "created": self.created}
+
+
+llm_clients = LLMClientRegistry()
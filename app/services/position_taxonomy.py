@@ -0,0 +1,132 @@
+"""
+Danh mục vị trí công việc
+- POSITION_TAXONOMY: vị trí chuẩn → keywords (trước đây nằm trong cv_parser.extract_position)
+- Mỗi vị trí chuẩn có một id; mọi keyword được quét trong một lần duyệt văn bản (KeywordScanner)
+- Bảng điểm tương đồng giữa các vị trí chuẩn tính sẵn khi import: chấm điểm vị trí của hai
+  vị trí đã biết chỉ là tra bảng; vị trí tự do (AI trả về) mới phải so chuỗi (có cache)
+"""
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from app.services.keyword_scanner import KeywordScanner
+
+
+# Thứ tự có ý nghĩa: khi hai vị trí cùng độ ưu tiên, vị trí đứng trước được chọn
+POSITION_TAXONOMY: Dict[str, List[str]] = {
+    "Business Analyst": ["business analyst", "ba", "business analysis", "functional analyst"],
+    "Data Engineer": ["data engineer", "data engineering", "etl engineer", "big data engineer"],
+    "Data Analyst": ["data analyst", "data analysis", "business intelligence analyst", "bi analyst"],
+    "Data Scientist": ["data scientist", "data science"],
+    "Backend Engineer": ["backend engineer", "backend developer", "server developer", "api developer"],
+    "Frontend Engineer": ["frontend engineer", "frontend developer", "ui developer", "web developer"],
+    "Fullstack Engineer": ["fullstack", "full stack", "full-stack engineer", "full-stack developer"],
+    "AI Engineer": ["ai engineer", "machine learning engineer", "ml engineer", "deep learning engineer"],
+    "DevOps Engineer": ["devops engineer", "devops", "sre", "site reliability engineer"],
+    "Software Engineer": ["software engineer", "software developer", "developer", "programmer"],
+    "Mobile Developer": ["mobile developer", "ios developer", "android developer", "react native"],
+    "Product Manager": ["product manager", "pm", "product owner"],
+    "Project Manager": ["project manager", "project management", "scrum master"],
+    "QA Engineer": ["qa engineer", "qa", "quality assurance", "test engineer", "tester"],
+    "System Analyst": ["system analyst", "systems analyst", "it analyst"],
+    "Business Intelligence": ["business intelligence", "bi developer", "bi engineer"],
+}
+
+POSITION_NAMES: List[str] = list(POSITION_TAXONOMY)
+
+_RELATED_WORDS = ["engineer", "developer", "analyst", "scientist", "manager"]
+
+
+def _build_index():
+    # keyword → (position id, thứ tự keyword trong danh sách của vị trí đó)
+    keywords: Dict[str, tuple] = {}
+    lookup: Dict[str, int] = {}
+    for position_id, (name, position_keywords) in enumerate(POSITION_TAXONOMY.items()):
+        lookup[name.lower()] = position_id
+        for rank, keyword in enumerate(position_keywords):
+            keywords.setdefault(keyword, (position_id, rank))
+            lookup.setdefault(keyword, position_id)
+    return keywords, lookup
+
+
+_keyword_ranks, _lookup = _build_index()
+POSITION_SCANNER = KeywordScanner(_keyword_ranks)
+
+
+def position_id(position: str) -> Optional[int]:
+    """Id của vị trí chuẩn theo tên hoặc keyword (VD: "backend developer" → Backend Engineer), None nếu không có"""
+    if not position:
+        return None
+    return _lookup.get(position.lower().strip())
+
+
+def _found_positions(text: str) -> Dict[int, int]:
+    """Vị trí có trong text → thứ tự nhỏ nhất của keyword đã match (keyword đứng trước trong danh sách)"""
+    found: Dict[int, int] = {}
+    for found_id, rank in POSITION_SCANNER.scan(text):
+        if rank < found.get(found_id, len(POSITION_TAXONOMY[POSITION_NAMES[found_id]])):
+            found[found_id] = rank
+    return found
+
+
+def extract_position_id(text: str) -> Optional[int]:
+    """
+    Vị trí trong văn bản (CV/JD), cùng quy tắc với cách quét từng keyword trước đây:
+    - 150 dòng đầu: mỗi vị trí lấy keyword đầu tiên (theo danh sách) có trong text,
+      vị trí có keyword dài nhất thắng (dài hơn = cụ thể hơn)
+    - Không có: vị trí đầu tiên (theo danh mục) có keyword trong toàn bộ text
+    """
+    head = "\n".join(text.splitlines()[:150])
+    found = _found_positions(head)
+    if found:
+        return max(found, key=lambda found_id: (len(POSITION_TAXONOMY[POSITION_NAMES[found_id]][found[found_id]]), -found_id))
+
+    found = _found_positions(text)
+    return min(found) if found else None
+
+
+# ================= ĐIỂM VỊ TRÍ =================
+def _position_overlap_score(candidate_lower: str, target_lower: str) -> int:
+    """Điểm vị trí theo chuỗi (tối đa 20): trùng hẳn / chứa nhau / có từ chung / cùng nhóm"""
+    # Exact match (chính xác)
+    if target_lower == candidate_lower:
+        return 20
+    # Partial match - một trong hai chứa từ khóa của kia
+    elif target_lower in candidate_lower or candidate_lower in target_lower:
+        return 15
+    # Word match - có từ khóa chung (ví dụ: "analyst" trong cả hai)
+    else:
+        target_words = set([w for w in target_lower.split() if len(w) > 3])
+        candidate_words = set([w for w in candidate_lower.split() if len(w) > 3])
+        common_words = target_words & candidate_words
+
+        if common_words:
+            # Có từ khóa chung
+            if len(common_words) >= 2:
+                return 12  # Nhiều từ khóa chung
+            else:
+                return 8   # Một từ khóa chung
+        # Related position (có từ khóa liên quan)
+        elif any(word in candidate_lower for word in _RELATED_WORDS):
+            if any(word in target_lower for word in _RELATED_WORDS):
+                return 5
+    return 0
+
+
+# POSITION_SIMILARITY[candidate id][target id]
+POSITION_SIMILARITY: List[List[int]] = [
+    [_position_overlap_score(candidate.lower(), target.lower()) for target in POSITION_NAMES]
+    for candidate in POSITION_NAMES
+]
+
+
+@lru_cache(maxsize=4096)
+def _free_text_score(candidate_lower: str, target_lower: str) -> int:
+    return _position_overlap_score(candidate_lower, target_lower)
+
+
+def position_similarity(candidate_position: str, target_position: str) -> int:
+    """Điểm vị trí (tối đa 20): tra bảng khi cả hai là vị trí đã biết, không thì so chuỗi"""
+    candidate_id, target_id = position_id(candidate_position), position_id(target_position)
+    if candidate_id is not None and target_id is not None:
+        return POSITION_SIMILARITY[candidate_id][target_id]
+    return _free_text_score(candidate_position.lower().strip(), target_position.lower().strip())
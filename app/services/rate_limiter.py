@@ -0,0 +1,172 @@
+"""
+Điều phối lời gọi LLM theo hạn mức của từng provider (token bucket)
+- Mỗi provider hai bucket: số request / phút (RPM) và số token / phút (TPM), cấu hình qua env
+  (VD: GEMINI_RPM=15, GEMINI_TPM=1000000; 0 = không giới hạn)
+- Lời gọi vượt hạn mức không bị từ chối mà chờ trong hàng đợi tới khi bucket đầy lại
+  → nhiều CV upload cùng lúc được dàn đều thay vì lỗi
+- Provider trả 429 / ResourceExhausted: tạm dừng cả provider (mọi lời gọi đang chờ cũng đợi),
+  thử lại với backoff lũy thừa + jitter; hết số lần thử thì ném lỗi cho caller (fallback regex)
+- Token của một lời gọi chỉ ước lượng trước: độ dài prompt / 4 + số token output dự kiến
+"""
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+DEFAULT_LIMITS = {
+    # provider: (RPM, TPM) - mức của gói miễn phí / tier thấp nhất, đổi qua env
+    "gemini": (15, 1_000_000),
+    "openai": (500, 200_000),
+    "anthropic": (50, 50_000),
+}
+LLM_OUTPUT_TOKEN_ESTIMATE = int(os.getenv("LLM_OUTPUT_TOKEN_ESTIMATE", "2000"))
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "300"))
+LLM_RATE_LIMIT_RETRIES = int(os.getenv("LLM_RATE_LIMIT_RETRIES", "5"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "2"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "60"))
+
+
+class RateLimitTimeout(Exception):
+    """Chờ trong hàng đợi quá LLM_QUEUE_TIMEOUT_SECONDS"""
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """
+    429 theo status / loại exception: OpenAI / Anthropic (RateLimitError), Gemini (ResourceExhausted)
+    Không dò "429" / "quota" trong message: lỗi khác có số 429 (số byte, id, dòng...) sẽ bị thử lại tới hết hạn
+    """
+    if getattr(error, "status_code", None) == 429 or getattr(error, "code", None) == 429:
+        return True
+    if type(error).__name__ in ("RateLimitError", "ResourceExhausted", "TooManyRequests"):
+        return True
+    # Lỗi Gemini bị bọc trong exception khác vẫn giữ tên status gRPC
+    return "RESOURCE_EXHAUSTED" in str(error)
+
+
+def estimate_tokens(prompt: str) -> int:
+    return len(prompt) // 4 + LLM_OUTPUT_TOKEN_ESTIMATE
+
+
+class TokenBucket:
+    """Bucket đầy lại đều đặn per_minute đơn vị / phút, chứa tối đa per_minute đơn vị"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Số giây phải chờ tới khi đủ amount (lời gọi lớn hơn cả bucket thì chờ bucket đầy)"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+
+class ProviderScheduler:
+    def __init__(self, provider: str, rpm: int, tpm: int):
+        self.provider = provider
+        self.rpm, self.tpm = rpm, tpm
+        self._requests = TokenBucket(rpm) if rpm > 0 else None
+        self._tokens = TokenBucket(tpm) if tpm > 0 else None
+        self._cond = threading.Condition()
+        self._paused_until = 0.0
+        self.waiting = 0
+        self.calls = 0
+        self.rate_limited = 0
+
+    def _acquire(self, tokens: int):
+        deadline = time.monotonic() + LLM_QUEUE_TIMEOUT_SECONDS
+        with self._cond:
+            self.waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = max(
+                        self._paused_until - now,
+                        self._requests.wait_time(1, now) if self._requests else 0.0,
+                        self._tokens.wait_time(tokens, now) if self._tokens else 0.0,
+                    )
+                    if wait <= 0:
+                        if self._requests:
+                            self._requests.take(1)
+                        if self._tokens:
+                            self._tokens.take(tokens)
+                        self.calls += 1
+                        return
+                    if now + wait > deadline:
+                        raise RateLimitTimeout(
+                            f"{self.provider}: chờ hạn mức quá {LLM_QUEUE_TIMEOUT_SECONDS:.0f}s ({self.waiting} lời gọi đang chờ)"
+                        )
+                    self._cond.wait(wait)
+            finally:
+                self.waiting -= 1
+
+    def _pause(self, seconds: float):
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self.rate_limited += 1
+
+    def run(self, fn: Callable[[], Any], tokens: int) -> Any:
+        """Chờ tới lượt rồi gọi fn(); 429 thì backoff (có jitter) và thử lại"""
+        for attempt in range(LLM_RATE_LIMIT_RETRIES + 1):
+            self._acquire(tokens)
+            try:
+                return fn()
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == LLM_RATE_LIMIT_RETRIES:
+                    raise
+                # Full jitter: các lời gọi bị 429 cùng lúc không thử lại cùng một thời điểm
+                delay = random.uniform(0, min(LLM_BACKOFF_MAX_SECONDS, LLM_BACKOFF_BASE_SECONDS * 2 ** attempt))
+                print(f"[RateLimit] {self.provider} 429 (lần {attempt + 1}), thử lại sau {delay:.1f}s: {str(e)[:120]}")
+                self._pause(delay)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "rpm": self.rpm,
+                "tpm": self.tpm,
+                "queue_depth": self.waiting,
+                "calls": self.calls,
+                "rate_limited": self.rate_limited,
+            }
+
+
+def _limit(provider: str, name: str, default: int) -> int:
+    return int(os.getenv(f"{provider.upper()}_{name}", str(default)))
+
+
+class LLMScheduler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._providers: Dict[str, ProviderScheduler] = {}
+
+    def provider(self, provider: str) -> ProviderScheduler:
+        provider = provider.lower()
+        with self._lock:
+            scheduler = self._providers.get(provider)
+            if scheduler is None:
+                rpm, tpm = DEFAULT_LIMITS.get(provider, (0, 0))
+                scheduler = ProviderScheduler(provider, _limit(provider, "RPM", rpm), _limit(provider, "TPM", tpm))
+                self._providers[provider] = scheduler
+            return scheduler
+
+    def run(self, provider: str, prompt: str, fn: Callable[[], Any], tokens: Optional[int] = None) -> Any:
+        return self.provider(provider).run(fn, estimate_tokens(prompt) if tokens is None else tokens)
+
+    def stats(self) -> dict:
+        with self._lock:
+            providers = dict(self._providers)
+        return {name: scheduler.stats() for name, scheduler in providers.items()}
+
+
+llm_scheduler = LLMScheduler()
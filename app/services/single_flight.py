@@ -0,0 +1,73 @@
+"""
+Gộp các lời gọi giống hệt nhau đang chạy cùng lúc (single-flight)
+- Key = sha256(provider + API key + prompt): request đầu tiên gọi provider, các request trùng key
+  đến trong lúc đó chờ và nhận chung kết quả (không tốn thêm token / quota)
+- Chỉ gộp lời gọi đang chạy: xong là bỏ key, lần gọi sau lại gọi provider (cache lâu dài do extraction_cache lo)
+- Lỗi của lời gọi chung được ném lại cho mọi request đang chờ
+"""
+import copy
+import hashlib
+import threading
+from typing import Any, Callable, Dict, Optional
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        self.calls = 0
+        self.shared = 0
+
+    @staticmethod
+    def make_key(provider: str, api_key: str, prompt: str) -> str:
+        payload = "\x1f".join([provider.lower(), api_key or "", prompt])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Chạy fn() một lần cho mỗi key đang chạy; request trùng key nhận bản sao kết quả"""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.calls += 1
+            else:
+                flight.waiters += 1
+                self.shared += 1
+
+        if not leader:
+            print(f"[SingleFlight] Chờ lời gọi đang chạy ({key[:12]})")
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            # Caller có thể sửa dict kết quả - mỗi request một bản riêng
+            return copy.deepcopy(flight.result)
+
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            # Bỏ key trước: sau đây không còn request nào chờ thêm vào flight này
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        # Có request khác đang đọc (deepcopy) kết quả: trả bản sao để caller sửa không ảnh hưởng
+        return copy.deepcopy(flight.result) if flight.waiters else flight.result
+
+    def stats(self) -> dict:
+        with self._lock:
+            in_flight = len(self._flights)
+        return {"calls": self.calls, "shared": self.shared, "in_flight": in_flight}
+
+
+llm_single_flight = SingleFlight()
@@ -0,0 +1,219 @@
+"""
+Chuẩn hóa tên kỹ năng
+- Danh mục kỹ năng (SKILL_CATALOG): mỗi kỹ năng có một tên chuẩn và các alias
+  (VD: "ReactJS", "React.js", "react" → "react"), dựng thành bảng tra alias → id một lần khi import
+- Trích xuất (regex + AI), so khớp CV/JD và tìm kiếm đều đi qua đây nên cùng một kỹ năng luôn ra cùng một key
+- Kỹ năng ngoài danh mục (soft skill, công cụ hiếm...) vẫn được giữ: key là chữ thường, bỏ khoảng trắng thừa;
+  so khớp bằng key, không cấp id (AI trả về vô số chuỗi khác nhau - bảng id sẽ lớn mãi theo thời gian chạy)
+"""
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.services.keyword_scanner import KeywordScanner
+
+
+# (tên chuẩn, alias...) - tên chuẩn là key lưu trong bảng cv_skills
+# Không thêm alias là từ thông dụng (VD: "next", "rest", "node") vì alias cũng được dùng để quét văn bản
+SKILL_CATALOG: List[Tuple[str, ...]] = [
+    # Programming Languages
+    ("python", "python3"),
+    ("java",),
+    ("javascript", "js", "ecmascript", "es6"),
+    ("typescript",),
+    ("c++", "cpp"),
+    ("c#", "csharp", "c sharp"),
+    ("go", "golang"),
+    ("rust",),
+    ("php",),
+    ("ruby",),
+    ("swift",),
+    ("kotlin",),
+    ("scala",),
+    ("r",),
+    ("matlab",),
+
+    # Web Frameworks
+    ("react", "reactjs", "react.js"),
+    ("vue", "vuejs", "vue.js"),
+    ("angular", "angularjs", "angular.js"),
+    ("next.js", "nextjs"),
+    ("nuxt.js", "nuxtjs"),
+    ("svelte",),
+    ("node.js", "nodejs"),
+    ("django",),
+    ("flask",),
+    ("fastapi",),
+    ("spring", "spring boot", "springboot"),
+    ("express", "express.js", "expressjs"),
+    ("nest.js", "nestjs"),
+    ("laravel",),
+    ("rails", "ruby on rails"),
+    ("asp.net", "asp.net core"),
+    (".net", "dotnet", ".net core"),
+
+    # Databases
+    ("sql",),
+    ("mysql",),
+    ("postgresql", "postgres"),
+    ("mongodb", "mongo"),
+    ("redis",),
+    ("elasticsearch", "elastic search"),
+    ("cassandra",),
+    ("dynamodb",),
+    ("oracle",),
+    ("sqlite",),
+    ("mariadb",),
+
+    # Cloud & DevOps
+    ("aws", "amazon web services"),
+    ("azure", "microsoft azure"),
+    ("gcp", "google cloud", "google cloud platform"),
+    ("docker",),
+    ("kubernetes", "k8s"),
+    ("terraform",),
+    ("jenkins",),
+    ("gitlab ci", "gitlab-ci"),
+    ("github actions",),
+    ("ci/cd", "cicd"),
+    ("ansible",),
+    ("chef",),
+    ("puppet",),
+    ("prometheus",),
+    ("grafana",),
+
+    # Data & ML
+    ("machine learning",),
+    ("deep learning",),
+    ("data science",),
+    ("data engineering",),
+    ("pandas",),
+    ("numpy",),
+    ("scikit-learn", "sklearn"),
+    ("tensorflow",),
+    ("pytorch",),
+    ("keras",),
+    ("spark", "apache spark", "pyspark"),
+    ("hadoop",),
+    ("kafka", "apache kafka"),
+    ("airflow", "apache airflow"),
+    ("dbt",),
+    ("snowflake",),
+    ("tableau",),
+    ("power bi", "powerbi"),
+    ("looker",),
+
+    # Tools & Others
+    ("git",),
+    ("linux",),
+    ("bash",),
+    ("shell scripting",),
+    ("rest api", "restful api"),
+    ("graphql",),
+    ("microservices", "microservice"),
+    ("agile",),
+    ("scrum",),
+    ("jira",),
+    ("confluence",),
+
+    # Mobile
+    ("react native", "react-native"),
+    ("flutter",),
+    ("ios",),
+    ("android",),
+
+    # Testing
+    ("jest",),
+    ("pytest",),
+    ("selenium",),
+    ("cypress",),
+    ("junit",),
+]
+
+
+_WHITESPACE = re.compile(r"\s+")
+# Bỏ khi tra alias: "React.js" / "react js" / "React-JS" cùng ra "reactjs"
+_ALIAS_NOISE = re.compile(r"[\s._\-]+")
+
+
+def _normalize(skill: str) -> str:
+    return _WHITESPACE.sub(" ", str(skill)).strip().lower()
+
+
+def _lookup_key(skill: str) -> str:
+    return _ALIAS_NOISE.sub("", skill.lower())
+
+
+def _build_index():
+    names: List[str] = []
+    lookup: Dict[str, int] = {}
+    aliases: Dict[str, int] = {}
+    for entry in SKILL_CATALOG:
+        skill_id = len(names)
+        names.append(entry[0])
+        for alias in entry:
+            key = _lookup_key(alias)
+            if lookup.get(key, skill_id) != skill_id:
+                raise ValueError(f"Alias '{alias}' trùng với kỹ năng '{names[lookup[key]]}'")
+            lookup[key] = skill_id
+            aliases[_normalize(alias)] = skill_id
+    return names, lookup, aliases
+
+
+_names, _lookup, SKILL_ALIASES = _build_index()
+# Quét mọi alias trong một lần duyệt văn bản → skill id
+SKILL_SCANNER = KeywordScanner(SKILL_ALIASES)
+
+
+def catalog_skill_id(skill: str) -> Optional[int]:
+    """Id trong danh mục của skill (theo tên chuẩn hoặc alias), None nếu không có trong danh mục"""
+    return _lookup.get(_lookup_key(str(skill)))
+
+
+def find_skill_ids(text: str) -> List[int]:
+    """Id các kỹ năng trong danh mục xuất hiện trong text, theo thứ tự danh mục"""
+    return sorted(SKILL_SCANNER.scan(text))
+
+
+def skill_name(skill_id: int) -> str:
+    """Tên chuẩn (key) của một skill id trong danh mục"""
+    return _names[skill_id]
+
+
+@lru_cache(maxsize=65536)
+def skills_related(first: str, second: str) -> bool:
+    """Hai key kỹ năng khác nhau nhưng key này chứa key kia (VD: "sql" / "mysql") - dùng cho partial match"""
+    return first in second or second in first
+
+
+def canonical_skill(skill: str) -> str:
+    """Key chuẩn của một kỹ năng (VD: "ReactJS" → "react", " Machine  Learning " → "machine learning")"""
+    found = catalog_skill_id(skill)
+    return _names[found] if found is not None else _normalize(skill)
+
+
+def canonical_skills(skills: Iterable[str]) -> List[str]:
+    """Chuẩn hóa danh sách kỹ năng, bỏ rỗng và trùng, giữ thứ tự"""
+    keys = []
+    for skill in skills or []:
+        key = canonical_skill(skill) if skill else ""
+        if key and key not in keys:
+            keys.append(key)
+    return keys
+
+
+def normalize_skill_list(skills: Iterable[str]) -> List[str]:
+    """
+    Dùng cho kết quả trích xuất (AI / regex): kỹ năng trong danh mục đổi về tên chuẩn,
+    kỹ năng khác giữ nguyên cách viết; bỏ trùng theo key chuẩn
+    """
+    result, seen = [], set()
+    for skill in skills or []:
+        text = str(skill).strip() if skill is not None else ""
+        if not text:
+            continue
+        key = canonical_skill(text)
+        if key not in seen:
+            seen.add(key)
+            result.append(key if catalog_skill_id(text) is not None else text)
+    return result
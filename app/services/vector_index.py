@@ -0,0 +1,274 @@
+"""
+Chỉ mục vector cho tìm CV tương đồng với JD (chạy hoàn toàn trên CPU, không cần mạng/GPU)
+- Hashing vectorizer: từ đơn + cặp từ liền nhau, bỏ dấu tiếng Việt, hash (crc32) vào VECTOR_DIM chiều
+  có dấu +/- để giảm sai lệch do va chạm hash, tf dạng 1 + log(tf), chuẩn hóa L2
+- Không cần học từ điển (IDF) nên thêm/xóa từng CV được ngay, không phải dựng lại cả chỉ mục
+- Ma trận float32 (số CV × VECTOR_DIM), top-k của một JD = một phép nhân ma trận - vector
+- Lưu xuống ./data dạng .npz khi tắt app; lúc khởi động đối chiếu với bảng cvs để bổ sung/loại bỏ
+  những CV thay đổi trong lúc app không chạy (hoặc app dừng đột ngột chưa kịp lưu)
+- Nhiều process (nhiều uvicorn worker / host) cùng ghi DB: trước khi truy vấn so max(id), số CV, max(updated_at)
+  của bảng cvs với chỉ mục (tối đa mỗi VECTOR_SYNC_SECONDS một lần), khác thì đồng bộ lại; trước khi lưu file cũng đồng bộ
+  để file luôn khớp với DB chứ không chỉ những CV một process thấy
+"""
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from sqlalchemy import func
+
+from app.models.database import ReadSessionLocal
+from app.models.cv_model import CV
+
+
+VECTOR_INDEX_PATH = Path(os.getenv("CV_VECTOR_INDEX_PATH", "./data/cv_vectors.npz"))
+VECTOR_DIM = int(os.getenv("CV_VECTOR_DIM", "2048"))
+# Đổi khi thay đổi cách tách từ / hash để file cũ bị dựng lại
+VECTORIZER_VERSION = 1
+# Khoảng cách tối thiểu giữa hai lần kiểm tra bảng cvs khi truy vấn (0 = mọi lần truy vấn)
+VECTOR_SYNC_SECONDS = float(os.getenv("CV_VECTOR_SYNC_SECONDS", "2"))
+
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#]*")
+
+# Các cột text của CV được đưa vào vector (JSON giữ nguyên, dấu câu bị bỏ khi tách từ)
+DOCUMENT_COLUMNS = ["candidate_position", "candidate_skills", "summary", "experiences", "projects"]
+
+
+def _fold(text: str) -> str:
+    """Chữ thường, bỏ dấu tiếng Việt (đ → d)"""
+    text = unicodedata.normalize("NFD", text.lower().replace("đ", "d"))
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = _TOKEN.findall(_fold(text or ""))
+    return tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+
+
+def vectorize(text: str, dim: int = VECTOR_DIM) -> np.ndarray:
+    """Vector L2-normalized của text (vector 0 nếu text không có từ nào)"""
+    vector = np.zeros(dim, dtype=np.float32)
+    for term, count in Counter(tokenize(text)).items():
+        h = zlib.crc32(term.encode("utf-8"))
+        sign = 1.0 if h & 0x80000000 else -1.0
+        vector[h % dim] += sign * (1.0 + math.log(count))
+    norm = float(np.linalg.norm(vector))
+    if norm > 0:
+        vector /= norm
+    return vector
+
+
+def cv_document(cv) -> str:
+    """Văn bản đại diện một CV (ORM object hoặc row có các cột DOCUMENT_COLUMNS)"""
+    return "\n".join(getattr(cv, column) or "" for column in DOCUMENT_COLUMNS)
+
+
+class CVVectorIndex:
+    def __init__(self, path: Path = VECTOR_INDEX_PATH, dim: int = VECTOR_DIM):
+        self.path = Path(path)
+        self.dim = dim
+        self._lock = threading.RLock()
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._matrix = np.zeros((0, dim), dtype=np.float32)
+        self._size = 0
+        self._rows = {}  # cv_id → dòng trong ma trận
+        self._loaded = False
+        self._dirty = False
+        self._checked_at = 0.0
+        # max(updated_at) của bảng cvs ở lần đồng bộ trước
+        self._updated_at: Optional[datetime] = None
+        self.syncs = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    # ---------- cập nhật ----------
+    def add(self, cv_id: int, text: str):
+        """Thêm (hoặc thay) vector của một CV"""
+        vector = vectorize(text, self.dim)
+        with self._lock:
+            self._ensure_loaded()
+            row = self._rows.get(cv_id)
+            if row is None:
+                row = self._size
+                if row == len(self._ids):
+                    self._grow()
+                self._rows[cv_id] = row
+                self._ids[row] = cv_id
+                self._size += 1
+            self._matrix[row] = vector
+            self._dirty = True
+
+    def remove(self, cv_id: int):
+        with self._lock:
+            self._ensure_loaded()
+            row = self._rows.pop(cv_id, None)
+            if row is None:
+                return
+            # Chuyển dòng cuối vào chỗ trống để ma trận luôn liền mạch
+            last = self._size - 1
+            if row != last:
+                self._ids[row] = self._ids[last]
+                self._matrix[row] = self._matrix[last]
+                self._rows[int(self._ids[row])] = row
+            self._size = last
+            self._dirty = True
+
+    def _grow(self):
+        capacity = max(64, len(self._ids) * 2)
+        ids = np.zeros(capacity, dtype=np.int64)
+        matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+        ids[:self._size] = self._ids[:self._size]
+        matrix[:self._size] = self._matrix[:self._size]
+        self._ids, self._matrix = ids, matrix
+
+    # ---------- truy vấn ----------
+    def top_k(self, text: str, k: int = 10) -> List[Tuple[int, float]]:
+        """k CV tương đồng nhất với text: [(cv_id, cosine similarity)], giảm dần"""
+        query = vectorize(text, self.dim)
+        with self._lock:
+            self._ensure_loaded()
+            self._refresh()
+            if self._size == 0 or k <= 0 or not query.any():
+                return []
+            scores = self._matrix[:self._size] @ query
+            ids = self._ids[:self._size]
+            if k < self._size:
+                top = np.argpartition(-scores, k - 1)[:k]
+            else:
+                top = np.arange(self._size)
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [(int(ids[i]), round(float(scores[i]), 4)) for i in top if scores[i] > 0]
+
+    # ---------- lưu / nạp ----------
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.load()
+
+    def load(self) -> int:
+        """Nạp chỉ mục từ file rồi đồng bộ với bảng cvs; trả về số CV trong chỉ mục"""
+        with self._lock:
+            self._loaded = True
+            started = time.perf_counter()
+            if self.path.exists():
+                try:
+                    data = np.load(self.path)
+                    if int(data["version"]) == VECTORIZER_VERSION and int(data["dim"]) == self.dim:
+                        self._ids = data["ids"].astype(np.int64)
+                        self._matrix = data["matrix"].astype(np.float32)
+                        self._size = len(self._ids)
+                        self._rows = {int(cv_id): row for row, cv_id in enumerate(self._ids)}
+                        if "updated_at" in data and not np.isnat(data["updated_at"]):
+                            self._updated_at = data["updated_at"].astype("datetime64[us]").item()
+                    else:
+                        print("[Vector] File chỉ mục khác phiên bản / số chiều - dựng lại")
+                except Exception as e:
+                    print(f"[Vector] Không đọc được {self.path}, dựng lại: {e}")
+            added, removed = self.sync()
+            elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+            print(f"[Vector] {self._size} CV trong chỉ mục (+{added}/-{removed}, {elapsed_ms} ms)")
+            return self._size
+
+    def _refresh(self):
+        """CV được process khác thêm / xóa (max(id) hoặc số CV trong DB khác chỉ mục) → đồng bộ"""
+        now = time.monotonic()
+        if now - self._checked_at < VECTOR_SYNC_SECONDS:
+            return
+        self._checked_at = now
+        db = ReadSessionLocal()
+        try:
+            max_id, count, updated_at = db.query(func.max(CV.id), func.count(CV.id), func.max(CV.updated_at)).one()
+            indexed_max = int(self._ids[:self._size].max()) if self._size else 0
+            if (max_id or 0, count, updated_at) == (indexed_max, self._size, self._updated_at):
+                return
+            added, removed = self.sync()
+            print(f"[Vector] Đồng bộ với DB: +{added}/-{removed} CV")
+        except Exception as e:
+            # Truy vấn tiếp trên chỉ mục hiện có, lần kiểm tra sau thử lại
+            print(f"[Vector] Không đồng bộ được chỉ mục: {e}")
+        finally:
+            db.close()
+
+    def sync(self) -> Tuple[int, int]:
+        """
+        Bổ sung CV có trong DB nhưng chưa có trong chỉ mục, bỏ CV đã bị xóa khỏi DB
+        CV ghi sau lần đồng bộ trước (updated_at mới hơn) được đọc lại: SQLite dùng lại id lớn nhất vừa bị xóa
+        """
+        db = ReadSessionLocal()
+        try:
+            # Đọc mốc trước: CV ghi chen vào sau đó sẽ được đọc lại ở lần đồng bộ sau
+            latest = db.query(func.max(CV.updated_at)).scalar()
+            db_ids = {row[0] for row in db.query(CV.id)}
+            missing = db_ids - self._rows.keys()
+            if self._updated_at is not None:
+                missing |= {row[0] for row in db.query(CV.id).filter(CV.updated_at > self._updated_at)}
+            stale = self._rows.keys() - db_ids
+            for cv_id in list(stale):
+                self.remove(cv_id)
+            for ids in _chunks(sorted(missing), 500):
+                columns = [getattr(CV, column) for column in DOCUMENT_COLUMNS]
+                for row in db.query(CV.id, *columns).filter(CV.id.in_(ids)):
+                    self.add(row.id, cv_document(row))
+            self._updated_at = latest
+            self.syncs += 1
+            return len(missing), len(stale)
+        finally:
+            db.close()
+
+    def save(self):
+        """
+        Ghi chỉ mục xuống file (ghi file tạm rồi đổi tên - không để lại file hỏng)
+        Đồng bộ với DB trước: process khác cũng lưu vào file này, không ghi đè bằng phần một process thấy
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            try:
+                self.sync()
+            except Exception as e:
+                print(f"[Vector] Không đồng bộ được trước khi lưu: {e}")
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # File tạm riêng từng process - nhiều worker tắt cùng lúc không ghi chồng lên nhau
+            tmp_path = self.path.with_name(f"{self.path.stem}.{os.getpid()}.tmp.npz")
+            np.savez(
+                tmp_path,
+                ids=self._ids[:self._size],
+                matrix=self._matrix[:self._size],
+                dim=np.int64(self.dim),
+                updated_at=np.datetime64(self._updated_at, "us") if self._updated_at else np.datetime64("NaT", "us"),
+                version=np.int64(VECTORIZER_VERSION),
+            )
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+            print(f"[Vector] Đã lưu {self._size} CV vào {self.path}")
+
+    def stats(self) -> dict:
+        return {"size": self._size, "dim": self.dim, "loaded": self._loaded, "syncs": self.syncs}
+
+
+def _chunks(items: List[int], size: int) -> Iterable[List[int]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+cv_vector_index = CVVectorIndex()
+
+
+def index_saved_cv(cv_id: int, document: str, replaced_id: Optional[int] = None):
+    """Cập nhật chỉ mục sau khi lưu CV (CV cũ trùng email bị thay thế thì bỏ khỏi chỉ mục)"""
+    try:
+        if replaced_id is not None:
+            cv_vector_index.remove(replaced_id)
+        cv_vector_index.add(cv_id, document)
+    except Exception as e:
+        # Chỉ mục tự đồng bộ lại với DB ở lần truy vấn sau - không làm hỏng request lưu CV
+        print(f"[Vector] Lỗi cập nhật chỉ mục cho CV #{cv_id}: {e}")
@@ -0,0 +1,54 @@
+"""
+So sánh tốc độ trích xuất kỹ năng: một regex cho mỗi alias (cách cũ) và KeywordScanner (một lần quét)
+
+Chạy từ thư mục gốc dự án:
+    python benchmarks/skill_scanner_bench.py
+"""
+import re
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.skill_index import SKILL_ALIASES, find_skill_ids  # noqa: E402
+
+
+SAMPLE_CV = """
+NGUYEN VAN A - Backend Engineer
+Email: a@example.com | Phone: 0912345678
+
+TECHNICAL SKILLS
+Python, FastAPI, Django, PostgreSQL, Redis, Docker, Kubernetes (k8s), AWS, Terraform
+ReactJS, Node.js, TypeScript, C++, C#, .NET, CI/CD with GitHub Actions, Apache Kafka
+
+EXPERIENCE
+Công ty ABC (2020 - nay): xây dựng microservices, REST API, tối ưu truy vấn SQL,
+vận hành hệ thống trên Linux, giám sát bằng Prometheus và Grafana.
+""" * 20
+
+
+def scan_per_alias(text: str) -> list:
+    """Cách cũ: biên dịch + chạy một regex cho từng alias"""
+    found = []
+    for alias, skill_id in SKILL_ALIASES.items():
+        pattern = r'(?<![\w.+#])' + re.escape(alias) + r'(?![\w+#])'
+        if re.search(pattern, text, re.IGNORECASE) and skill_id not in found:
+            found.append(skill_id)
+    return sorted(found)
+
+
+def main(number: int = 200):
+    text = SAMPLE_CV.lower()
+    assert scan_per_alias(text) == find_skill_ids(text), "Hai cách cho kết quả khác nhau"
+
+    old = timeit.timeit(lambda: scan_per_alias(text), number=number) / number
+    new = timeit.timeit(lambda: find_skill_ids(text), number=number) / number
+    print(f"Văn bản: {len(text)} ký tự, {len(SKILL_ALIASES)} alias, {len(find_skill_ids(text))} kỹ năng tìm thấy")
+    print(f"Regex từng alias : {old * 1000:8.3f} ms / lần")
+    print(f"KeywordScanner   : {new * 1000:8.3f} ms / lần")
+    print(f"Nhanh hơn        : {old / new:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -44,28 +44,24 @@ document.addEventListener("DOMContentLoaded", () => {
       submitBtn.parentElement.appendChild(waitMsg);
 
       try {
-        const res = await fetch(`${API}/cv/analyze`, {
+        // Đưa CV vào hàng đợi phân tích, backend trả về id ngay
+        const res = await fetch(`${API}/cv/jobs`, {
           method: "POST",
           body: formData
         });
 
+        if (!res.ok) {
+          throw new Error(await readErrorMessage(res));
+        }
+
+        const job = await res.json();
+        await waitForAnalysisJob(job.id, waitMsg);
+
         // Xóa thông báo chờ
         waitMsg.remove();
         submitBtn.disabled = false;
         submitBtn.innerHTML = originalBtnText;
 
-        if (!res.ok) {
-          // Đọc error message từ response
-          let errorMsg = "Lỗi không xác định";
-          try {
-            const errorData = await res.json();
-            errorMsg = errorData.detail || errorData.error || errorMsg;
-          } catch (e) {
-            errorMsg = `HTTP ${res.status}: ${res.statusText}`;
-          }
-          throw new Error(errorMsg);
-        }
-
         // backend OK → sang list
         window.location.href = "list.html";
 
@@ -87,26 +83,86 @@ document.addEventListener("DOMContentLoaded", () => {
   }
 });
 
+/* ================= ANALYSIS JOB ================= */
+const STAGE_LABELS = {
+  queued: "Đang chờ trong hàng đợi...",
+  reading: "Đang đọc CV...",
+  extracting: "Đang phân tích CV bằng AI, vui lòng chờ một chút...",
+  matching: "Đang so khớp với mô tả công việc...",
+  saving: "Đang lưu kết quả...",
+};
+
+async function readErrorMessage(res) {
+  // Đọc error message từ response
+  try {
+    const errorData = await res.json();
+    return errorData.detail || errorData.error || "Lỗi không xác định";
+  } catch (e) {
+    return `HTTP ${res.status}: ${res.statusText}`;
+  }
+}
+
+// Poll trạng thái job phân tích cho tới khi xong hoặc lỗi
+async function waitForAnalysisJob(jobId, waitMsg) {
+  while (true) {
+    const res = await fetch(`${API}/cv/jobs/${jobId}`);
+    if (!res.ok) {
+      throw new Error(await readErrorMessage(res));
+    }
+
+    const job = await res.json();
+    if (job.status === "done") return job.result;
+    if (job.status === "failed") throw new Error(job.error || "Lỗi không xác định");
+
+    const label = STAGE_LABELS[job.stage] || STAGE_LABELS.queued;
+    waitMsg.innerHTML = `<i class="fas fa-clock me-2"></i>${label}`;
+    await new Promise((resolve) => setTimeout(resolve, 1000));
+  }
+}
+
 /* ================= LOAD CVS ================= */
-async function loadCVs(url = "/cv/list") {
+// Danh sách được phân trang: lưu URL hiện tại + cursor trang sau cho nút "Tải thêm"
+let currentListUrl = "/cv/list";
+let nextCursor = null;
+
+function updateLoadMoreButton() {
+  const loadMoreBtn = document.getElementById("loadMoreBtn");
+  if (loadMoreBtn) loadMoreBtn.classList.toggle("d-none", !nextCursor);
+}
+
+function loadMoreCVs() {
+  if (nextCursor) loadCVs(currentListUrl, true);
+}
+
+async function loadCVs(url = "/cv/list", append = false) {
   const loading = document.getElementById("loadingState");
   const table = document.getElementById("tableContainer");
   const tbody = document.getElementById("cvTable");
 
-  loading.style.display = "block";
-  table.classList.add("d-none");
+  if (!append) {
+    loading.style.display = "block";
+    table.classList.add("d-none");
+    currentListUrl = url;
+    nextCursor = null;
+  }
 
   try {
-    const res = await fetch(API + url);
+    const pageUrl = append
+      ? url + (url.includes("?") ? "&" : "?") + `cursor=${encodeURIComponent(nextCursor)}`
+      : url;
+    const res = await fetch(API + pageUrl);
     if (!res.ok) throw new Error("Fetch failed");
 
-    const data = await res.json();
-    tbody.innerHTML = "";
+    const page = await res.json();
+    const data = page.items || [];
+    nextCursor = page.next_cursor || null;
+    updateLoadMoreButton();
 
-    // Store CV data globally for detail view
-    window.cvDataStore = {};
+    if (!append) {
+      tbody.innerHTML = "";
+    }
     
-    if (!data || data.length === 0) {
+    if (!append && data.length === 0) {
       tbody.innerHTML = `
         <tr>
           <td colspan="8" class="text-center text-muted">
@@ -119,9 +175,6 @@ async function loadCVs(url = "/cv/list") {
       return;
     }
 
-    // Store CV data globally for detail view
-    window.cvDataStore = window.cvDataStore || {};
-    
     data.forEach(cv => {
       // Xử lý dữ liệu an toàn
       const name = (cv.name && cv.name !== "(Không xác định)" && cv.name.length < 50) 
@@ -134,9 +187,6 @@ async function loadCVs(url = "/cv/list") {
       const score = parseFloat(cv.score) || 0;
       const cvId = cv.id || 0;
 
-      // Store CV data
-      window.cvDataStore[cvId] = cv;
-
       // Format skills display
       const skillsDisplay = skills.length > 0 
         ? skills.slice(0, 3).join(", ") + (skills.length > 3 ? "..." : "")
@@ -168,6 +218,8 @@ async function loadCVs(url = "/cv/list") {
 
   } catch (err) {
     console.error("Load CVs error:", err);
+    nextCursor = null;
+    updateLoadMoreButton();
     tbody.innerHTML = `
       <tr>
         <td colspan="8" class="text-center text-danger">
@@ -222,9 +274,15 @@ document.addEventListener("DOMContentLoaded", () => {
 });
 
 /* ================= SHOW CV DETAIL ================= */
-function showCVDetail(id) {
-  const cvData = window.cvDataStore[id];
-  if (!cvData) {
+// Danh sách chỉ có thông tin tóm tắt - chi tiết (kinh nghiệm, dự án...) tải khi mở modal
+async function showCVDetail(id) {
+  let cvData;
+  try {
+    const res = await fetch(`${API}/cv/${id}`);
+    if (!res.ok) throw new Error(await readErrorMessage(res));
+    cvData = await res.json();
+  } catch (err) {
+    console.error("Load CV detail error:", err);
     alert("Không tìm thấy thông tin CV. Vui lòng tải lại trang.");
     return;
   }
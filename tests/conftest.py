@@ -0,0 +1,13 @@
+"""
+Cấu hình chung cho test (chạy: python -m pytest -q ở thư mục gốc repo)
+- DATABASE_URL trỏ vào file SQLite tạm trước khi import app: test không đụng tới data/ai_recruitment.db
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+os.environ["DATABASE_URL"] = f"sqlite:///{Path(tempfile.mkdtemp(prefix='ai_recruitment_test_')) / 'test.db'}"
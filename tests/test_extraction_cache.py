@@ -0,0 +1,62 @@
+"""Cache trích xuất CV: key theo nội dung đã chuẩn hóa + provider + prompt version, TTL và LRU"""
+import time
+import unicodedata
+
+from app.services.extraction_cache import ExtractionCache
+
+
+CV_TEXT = "Nguyễn Văn A\nPython   Developer\n\nKỹ năng: Python, Django"
+
+
+def test_key_ignores_whitespace_and_unicode_form():
+    key = ExtractionCache.make_key(CV_TEXT, "gemini", "v1")
+    reformatted = "  Nguyễn  Văn A  \n\nPython Developer\n  \nKỹ năng:\tPython, Django\n"
+    assert ExtractionCache.make_key(reformatted, "gemini", "v1") == key
+    # PDF có thể trả về tiếng Việt dạng tổ hợp (NFD)
+    assert ExtractionCache.make_key(unicodedata.normalize("NFD", CV_TEXT), "gemini", "v1") == key
+    assert ExtractionCache.make_key(CV_TEXT, "GEMINI", "v1") == key
+
+
+def test_key_changes_with_content_provider_and_prompt_version():
+    key = ExtractionCache.make_key(CV_TEXT, "gemini", "v1")
+    assert ExtractionCache.make_key(CV_TEXT + " Flask", "gemini", "v1") != key
+    assert ExtractionCache.make_key(CV_TEXT, "openai", "v1") != key
+    assert ExtractionCache.make_key(CV_TEXT, "gemini", "v2") != key
+
+
+def test_get_returns_stored_result(tmp_path):
+    cache = ExtractionCache(tmp_path / "cache.db", max_entries=10, ttl_seconds=3600)
+    key = cache.make_key(CV_TEXT, "gemini", "v1")
+    assert cache.get(key) is None
+    cache.set(key, {"name": "Nguyễn Văn A", "skills": ["python"]})
+    assert cache.get(key) == {"name": "Nguyễn Văn A", "skills": ["python"]}
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = ExtractionCache(tmp_path / "cache.db", max_entries=10, ttl_seconds=60)
+    cache.set("old", {"name": "A"})
+    cache._connect().execute("UPDATE extraction_cache SET created_at = ?", (time.time() - 120,))
+    assert cache.get("old") is None
+    assert cache.evictions == 1
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = ExtractionCache(tmp_path / "cache.db", max_entries=2, ttl_seconds=0)
+    cache.set("a", {"name": "A"})
+    time.sleep(0.01)
+    cache.set("b", {"name": "B"})
+    time.sleep(0.01)
+    assert cache.get("a") is not None  # a mới được dùng, b thành cũ nhất
+    time.sleep(0.01)
+    cache.set("c", {"name": "C"})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"name": "A"}
+    assert cache.get("c") == {"name": "C"}
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = ExtractionCache(tmp_path / "cache.db", max_entries=10, ttl_seconds=3600, enabled=False)
+    cache.set("a", {"name": "A"})
+    assert cache.get("a") is None
+    assert not (tmp_path / "cache.db").exists()
@@ -0,0 +1,127 @@
+"""Top-K theo job: heap giới hạn (đẩy ra / bỏ / truncated) và nạp lại khi mốc của job trong DB đổi"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import update
+
+from app.models.cv_model import CV
+from app.models.database import Base, SessionLocal, engine
+from app.models.job_model import Job
+from app.services.job_ranking import JobRankings, _JobHeap
+
+
+# ---------- _JobHeap ----------
+def test_heap_keeps_the_best_and_evicts_the_smallest():
+    heap = _JobHeap(3)
+    for cv_id, score in [(1, 50.0), (2, 70.0), (3, 60.0)]:
+        heap.push(cv_id, score)
+    assert not heap.truncated
+
+    heap.push(4, 65.0)
+    assert heap.ranked() == [(2, 70.0), (4, 65.0), (3, 60.0)]
+    assert set(heap.members) == {2, 3, 4}
+    assert heap.truncated
+
+
+def test_heap_rejects_scores_below_the_minimum():
+    heap = _JobHeap(2)
+    heap.push(1, 80.0)
+    heap.push(2, 90.0)
+    ranked = heap.ranked()
+    heap.push(3, 10.0)
+    assert heap.ranked() is ranked  # không đổi → danh sách đã sắp xếp được giữ nguyên
+    assert set(heap.members) == {1, 2}
+    assert heap.truncated
+
+
+def test_heap_ties_rank_newer_cv_first():
+    heap = _JobHeap(3)
+    for cv_id in [5, 9, 7]:
+        heap.push(cv_id, 50.0)
+    assert [cv_id for cv_id, _ in heap.ranked()] == [9, 7, 5]
+    # Cùng điểm với phần tử nhỏ nhất: id lớn hơn vẫn được vào
+    heap.push(8, 50.0)
+    assert [cv_id for cv_id, _ in heap.ranked()] == [9, 8, 7]
+
+
+def test_heap_discard():
+    heap = _JobHeap(3)
+    for cv_id, score in [(1, 50.0), (2, 70.0), (3, 60.0)]:
+        heap.push(cv_id, score)
+    heap.ranked()
+    heap.discard(2)
+    assert heap.ranked() == [(3, 60.0), (1, 50.0)]
+    heap.push(4, 55.0)
+    assert heap.ranked() == [(3, 60.0), (4, 55.0), (1, 50.0)]
+
+
+# ---------- JobRankings + DB ----------
+@pytest.fixture
+def job_id():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    job = Job(position="Backend Developer")
+    db.add(job)
+    db.commit()
+    yield job.id
+    db.close()
+
+
+def _insert(job_id: int, score):
+    db = SessionLocal()
+    try:
+        cv = CV(name="CV", job_id=job_id, score=score)
+        db.add(cv)
+        db.commit()
+        return cv.id, cv.updated_at
+    finally:
+        db.close()
+
+
+def test_local_insert_updates_heap_without_reload(job_id):
+    for score in [10.0, 20.0, 30.0]:
+        _insert(job_id, score)
+    rankings = JobRankings(capacity=3)
+    assert [score for _, score in rankings.top(job_id, 10)] == [30.0, 20.0, 10.0]
+    assert rankings.loads == 1
+
+    cv_id, updated_at = _insert(job_id, 25.0)
+    rankings.add(job_id, cv_id, 25.0, updated_at)
+    assert rankings.top(job_id, 2) == [(cv_id - 1, 30.0), (cv_id, 25.0)]
+    assert rankings.loads == 1
+
+
+def test_writes_from_other_processes_trigger_reload(job_id):
+    first, _ = _insert(job_id, 10.0)
+    rankings, other = JobRankings(capacity=3), JobRankings(capacity=3)
+    rankings.top(job_id, 3)
+
+    # Process khác lưu CV mới
+    cv_id, updated_at = _insert(job_id, 90.0)
+    other.add(job_id, cv_id, 90.0, updated_at)
+    assert rankings.top(job_id, 3) == [(cv_id, 90.0), (first, 10.0)]
+    assert rankings.loads == 2
+
+    # Process khác chấm lại điểm
+    db = SessionLocal()
+    db.execute(update(CV), [{"id": first, "score": 95.0, "updated_at": datetime.utcnow()}])
+    db.commit()
+    db.close()
+    assert rankings.top(job_id, 3) == [(first, 95.0), (cv_id, 90.0)]
+
+    # Process khác xóa CV (CV trùng email bị thay thế)
+    db = SessionLocal()
+    db.query(CV).filter(CV.id == first).delete()
+    db.commit()
+    db.close()
+    assert rankings.top(job_id, 3) == [(cv_id, 90.0)]
+    assert rankings.loads == 4
+
+
+def test_invalidate_reloads_from_db(job_id):
+    cv_id, _ = _insert(job_id, 40.0)
+    rankings = JobRankings(capacity=3)
+    rankings.top(job_id, 3)
+    rankings.invalidate(job_id)
+    assert rankings.top(job_id, 3) == [(cv_id, 40.0)]
+    assert rankings.loads == 2
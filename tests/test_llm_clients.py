@@ -0,0 +1,140 @@
+"""
+Client LLM dùng chung, gọi tới HTTP server giả lập chạy local (không cần mạng / API key thật)
+- Một client (một connection pool) cho mọi lời gọi cùng provider + API key
+- 429: SDK không tự retry, chỉ llm_scheduler thử lại → đúng 1 + LLM_RATE_LIMIT_RETRIES request
+"""
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.services import rate_limiter
+from app.services.llm_clients import LLMClientRegistry
+from app.services.rate_limiter import LLMScheduler
+
+
+SUCCESS_BODIES = {
+    "openai": {
+        "id": "chatcmpl-test",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "gpt-4o-mini",
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": '{"name": "Nguyen Van A"}'},
+            "finish_reason": "stop",
+        }],
+    },
+    "anthropic": {
+        "id": "msg-test",
+        "type": "message",
+        "role": "assistant",
+        "model": "claude-3-haiku-20240307",
+        "content": [{"type": "text", "text": '{"name": "Nguyen Van A"}'}],
+        "stop_reason": "end_turn",
+        "usage": {"input_tokens": 1, "output_tokens": 1},
+    },
+}
+RATE_LIMIT_BODY = {"error": {"type": "rate_limit_error", "message": "Rate limit reached"}}
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, provider: str):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.provider = provider
+        self.status = 200
+        self.requests = []  # (path, port phía client) - port giống nhau = cùng một kết nối keep-alive
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address
+        # OpenAI SDK nối /chat/completions vào base_url, Anthropic SDK nối /v1/messages
+        return f"http://{host}:{port}" + ("/v1" if self.provider == "openai" else "")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.requests.append((self.path, self.client_address[1]))
+        status = self.server.status
+        body = json.dumps(SUCCESS_BODIES[self.server.provider] if status == 200 else RATE_LIMIT_BODY).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(params=["openai", "anthropic"])
+def server(request, monkeypatch):
+    provider = request.param
+    mock = MockLLMServer(provider)
+    thread = threading.Thread(target=mock.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+
+    monkeypatch.setenv(f"{provider.upper()}_BASE_URL", mock.base_url)
+    monkeypatch.setattr(rate_limiter, "LLM_RATE_LIMIT_RETRIES", 2)
+    monkeypatch.setattr(rate_limiter, "LLM_BACKOFF_BASE_SECONDS", 0.01)
+    yield mock
+    mock.shutdown()
+    mock.server_close()
+
+
+def _create(client, provider: str):
+    """Lời gọi tối thiểu của SDK (client sync trả về kết quả, client async trả về coroutine)"""
+    messages = [{"role": "user", "content": "hi"}]
+    if provider == "openai":
+        return client.chat.completions.create(model="gpt-4o-mini", messages=messages)
+    return client.messages.create(model="claude-3-haiku-20240307", max_tokens=10, messages=messages)
+
+
+def test_client_is_reused_across_calls(server):
+    registry, scheduler = LLMClientRegistry(), LLMScheduler()
+    for attempt in range(3):
+        client = getattr(registry, server.provider)("test-key")
+        scheduler.run(server.provider, f"prompt {attempt}", lambda: _create(client, server.provider))
+
+    assert registry.created == 1
+    # Ba request đi trên cùng một kết nối của pool
+    assert len(server.requests) == 3
+    assert len({port for _, port in server.requests}) == 1
+    asyncio.run(registry.aclose())
+
+
+def test_rate_limit_is_retried_by_scheduler_only(server):
+    server.status = 429
+    registry, scheduler = LLMClientRegistry(), LLMScheduler()
+    client = getattr(registry, server.provider)("test-key")
+    with pytest.raises(Exception) as error:
+        scheduler.run(server.provider, "prompt", lambda: _create(client, server.provider))
+
+    assert rate_limiter.is_rate_limit_error(error.value)
+    assert len(server.requests) == 1 + rate_limiter.LLM_RATE_LIMIT_RETRIES
+    assert scheduler.stats()[server.provider]["rate_limited"] == rate_limiter.LLM_RATE_LIMIT_RETRIES
+    asyncio.run(registry.aclose())
+
+
+def test_async_client_is_pooled(server):
+    registry = LLMClientRegistry()
+
+    async def call_twice():
+        client = getattr(registry, f"async_{server.provider}")("test-key")
+        assert getattr(registry, f"async_{server.provider}")("test-key") is client
+        for _ in range(2):
+            await _create(client, server.provider)
+        await registry.aclose()
+
+    asyncio.run(call_twice())
+    assert registry.created == 1
+    assert registry.stats()["clients"] == []
+    assert len(server.requests) == 2
+    assert len({port for _, port in server.requests}) == 1
@@ -0,0 +1,76 @@
+"""Migration có version: DB cũ được bổ sung cột / bảng / index, mỗi revision chạy đúng một lần"""
+import json
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from app.models.migrations import MIGRATIONS, applied_revisions, run_migrations
+
+
+# Bảng cvs của bản đầu tiên (trước cột hồ sơ, job_id, cv_skills...)
+OLD_CVS = (
+    "CREATE TABLE cvs ("
+    "id INTEGER PRIMARY KEY, name VARCHAR, email VARCHAR, phone VARCHAR, "
+    "candidate_position VARCHAR, inferred_position VARCHAR, candidate_years INTEGER, candidate_skills TEXT, "
+    "summary TEXT, experiences TEXT, projects TEXT, "
+    "target_position VARCHAR, required_years INTEGER, required_skills TEXT, score FLOAT)"
+)
+
+
+@pytest.fixture
+def old_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE jobs (id INTEGER PRIMARY KEY, position VARCHAR)"))
+        conn.execute(text(OLD_CVS))
+        conn.execute(
+            text("INSERT INTO cvs (id, name, candidate_skills, score) VALUES (:id, :name, :skills, :score)"),
+            [
+                {"id": 1, "name": "A", "skills": json.dumps(["ReactJS", "Python", "Teamwork"]), "score": 80.0},
+                {"id": 2, "name": "B", "skills": json.dumps(["react.js", "react"]), "score": 50.0},
+                {"id": 3, "name": "C", "skills": None, "score": None},
+            ],
+        )
+    yield engine
+    engine.dispose()
+
+
+def test_old_database_is_upgraded(old_engine):
+    applied = run_migrations(old_engine)
+    assert applied == [revision for revision, _, _ in MIGRATIONS]
+
+    inspector = inspect(old_engine)
+    columns = {column["name"] for column in inspector.get_columns("cvs")}
+    assert {"date_of_birth", "address", "social_links", "education", "job_id", "updated_at"} <= columns
+    indexes = {index["name"] for index in inspector.get_indexes("cvs")}
+    assert {"ix_cvs_job_id", "ix_cvs_score_id", "ix_cvs_email", "ix_cvs_job_id_updated_at"} <= indexes
+
+    # Kỹ năng của CV cũ được điền vào cv_skills theo key chuẩn của danh mục
+    with old_engine.connect() as conn:
+        rows = conn.execute(text("SELECT cv_id, skill FROM cv_skills ORDER BY cv_id, skill")).fetchall()
+    assert [tuple(row) for row in rows] == [(1, "python"), (1, "react"), (1, "teamwork"), (2, "react")]
+
+
+def test_each_revision_runs_once(old_engine):
+    run_migrations(old_engine)
+    assert run_migrations(old_engine) == []
+    assert sorted(applied_revisions(old_engine)) == [revision for revision, _, _ in MIGRATIONS]
+
+
+def test_only_pending_revisions_run(old_engine):
+    first, rest = MIGRATIONS[:2], MIGRATIONS[2:]
+    with old_engine.begin() as conn:
+        for _, _, upgrade in first:
+            upgrade(conn)
+    applied_revisions(old_engine)
+    with old_engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO schema_migrations (revision, description, applied_at) VALUES (:revision, '', CURRENT_TIMESTAMP)"),
+            [{"revision": revision} for revision, _, _ in first],
+        )
+    assert run_migrations(old_engine) == [revision for revision, _, _ in rest]
+
+
+def test_revisions_are_unique_and_ordered():
+    revisions = [revision for revision, _, _ in MIGRATIONS]
+    assert revisions == sorted(set(revisions))
@@ -0,0 +1,76 @@
+"""Phân trang keyset: cursor encode/decode, đi hết các trang ra đúng thứ tự score DESC (NULL cuối), id DESC"""
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.api.pagination import decode_cursor, encode_cursor, paginate_cvs
+from app.models.cv_model import CV
+from app.models.database import Base
+
+
+@pytest.mark.parametrize("values", [
+    [87.5, 42],
+    [None, 7],
+    [-3.25, 0.0, 123456789],
+    ["Data Engineer", None, 1],
+])
+def test_cursor_round_trip(values):
+    cursor = encode_cursor(values)
+    # Dùng được trực tiếp trong query string
+    assert "=" not in cursor and "+" not in cursor and "/" not in cursor
+    assert decode_cursor(cursor, len(values)) == values
+
+
+@pytest.mark.parametrize("cursor", ["not base64 !", encode_cursor([1, 2, 3]), encode_cursor({"score": 1}), ""])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, 2)
+    assert error.value.status_code == 400
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pagination.db'}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    # Điểm trùng nhau, CV chưa có điểm (NULL) xen giữa
+    scores = [90.0, None, 75.5, 90.0, None, 60.0, 75.5, 90.0, None, 10.0, 60.0]
+    session.add_all([
+        CV(id=cv_id, name=f"CV {cv_id}", score=score, candidate_years=cv_id % 3)
+        for cv_id, score in enumerate(scores, start=1)
+    ])
+    session.commit()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _walk(db, limit, rank=None):
+    ids, cursor, pages = [], None, 0
+    while True:
+        cvs, cursor = paginate_cvs(db.query(CV), limit, cursor, rank=rank)
+        ids += [cv.id for cv in cvs]
+        pages += 1
+        if cursor is None:
+            return ids, pages
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 4, 20])
+def test_pages_follow_score_then_id(db, limit):
+    cvs = db.query(CV).all()
+    expected = [cv.id for cv in sorted(cvs, key=lambda cv: (cv.score is None, -(cv.score or 0), -cv.id))]
+    ids, pages = _walk(db, limit)
+    assert ids == expected
+    assert pages == max(1, -(-len(expected) // limit))
+
+
+@pytest.mark.parametrize("limit", [1, 3, 5])
+def test_pages_with_rank_column(db, limit):
+    cvs = db.query(CV).all()
+    expected = [
+        cv.id for cv in
+        sorted(cvs, key=lambda cv: (cv.candidate_years, cv.score is None, -(cv.score or 0), -cv.id))
+    ]
+    ids, _ = _walk(db, limit, rank=CV.candidate_years)
+    assert ids == expected
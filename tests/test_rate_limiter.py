@@ -0,0 +1,67 @@
+"""Hạn mức gọi LLM: token bucket đầy lại theo thời gian, nhận diện lỗi 429"""
+import pytest
+
+from app.services.rate_limiter import TokenBucket, is_rate_limit_error
+
+
+class RateLimitError(Exception):
+    pass
+
+
+class ResourceExhausted(Exception):
+    code = 429
+
+
+class APIStatusError(Exception):
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def test_rate_limit_errors_by_status_and_type():
+    assert is_rate_limit_error(APIStatusError("Too Many Requests", 429))
+    assert is_rate_limit_error(RateLimitError("slow down"))
+    assert is_rate_limit_error(ResourceExhausted("Resource has been exhausted"))
+    assert is_rate_limit_error(RuntimeError("400 RESOURCE_EXHAUSTED: generate_content_free_tier_requests"))
+
+
+def test_other_errors_mentioning_429_or_quota_are_not_retried():
+    assert not is_rate_limit_error(APIStatusError("Internal error", 500))
+    assert not is_rate_limit_error(ValueError("Expecting ',' delimiter: line 1 column 429"))
+    assert not is_rate_limit_error(OSError("read 4290 bytes, expected 8192"))
+    assert not is_rate_limit_error(RuntimeError("Request id req_429abc failed"))
+    assert not is_rate_limit_error(RuntimeError("Disk quota exceeded"))
+
+
+def _bucket(per_minute: int, now: float = 0.0) -> TokenBucket:
+    bucket = TokenBucket(per_minute)
+    bucket.updated = now
+    return bucket
+
+
+def test_token_bucket_refills_in_proportion_to_elapsed_time():
+    bucket = _bucket(60)  # 1 đơn vị / giây
+    assert bucket.wait_time(60, 0.0) == 0.0
+    bucket.take(60)
+
+    assert bucket.wait_time(1, 0.0) == pytest.approx(1.0)
+    assert bucket.wait_time(10, 4.0) == pytest.approx(6.0)
+    assert bucket.tokens == pytest.approx(4.0)
+    assert bucket.wait_time(10, 10.0) == 0.0
+
+
+def test_token_bucket_refill_is_capped_at_capacity():
+    bucket = _bucket(60)
+    bucket.take(30)
+    bucket.wait_time(1, 3600.0)
+    assert bucket.tokens == pytest.approx(60.0)
+
+
+def test_call_larger_than_bucket_waits_for_full_bucket():
+    bucket = _bucket(60)
+    bucket.take(1)
+    # Lời gọi 1000 đơn vị không bao giờ đủ: chỉ chờ bucket đầy rồi lấy hết, không chờ mãi
+    assert bucket.wait_time(1000, 0.0) == pytest.approx(1.0)
+    assert bucket.wait_time(1000, 1.0) == 0.0
+    bucket.take(1000)
+    assert bucket.tokens == pytest.approx(0.0)
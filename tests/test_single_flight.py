@@ -0,0 +1,95 @@
+"""Single-flight: lời gọi trùng key đang chạy chỉ gọi provider một lần, mọi request nhận chung kết quả / lỗi"""
+import threading
+import time
+
+import pytest
+
+from app.services.single_flight import SingleFlight
+
+
+def _run_concurrently(count: int, target):
+    results, errors = [None] * count, [None] * count
+
+    def worker(index):
+        try:
+            results[index] = target()
+        except Exception as e:
+            errors[index] = e
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return results, errors
+
+
+def _slow_call(calls, release: threading.Event, value=None, error=None):
+    def call():
+        calls.append(1)
+        release.wait(5)
+        if error is not None:
+            raise error
+        return value
+    return call
+
+
+def _release_when_waiting(flight: SingleFlight, waiters: int, release: threading.Event):
+    """Thả lời gọi đầu tiên khi các request còn lại đã vào chờ"""
+    def watch():
+        deadline = time.monotonic() + 5
+        while flight.shared < waiters and time.monotonic() < deadline:
+            time.sleep(0.005)
+        release.set()
+    threading.Thread(target=watch, daemon=True).start()
+
+
+def test_concurrent_calls_with_same_key_share_one_call():
+    flight, calls, release = SingleFlight(), [], threading.Event()
+    key = SingleFlight.make_key("gemini", "key", "prompt")
+    call = _slow_call(calls, release, value={"skills": ["python"]})
+    _release_when_waiting(flight, 4, release)
+
+    results, errors = _run_concurrently(5, lambda: flight.do(key, call))
+
+    assert errors == [None] * 5
+    assert len(calls) == 1
+    assert results == [{"skills": ["python"]}] * 5
+    # Mỗi request một bản riêng: sửa kết quả của request này không ảnh hưởng request khác
+    assert len({id(result) for result in results}) == 5
+    assert flight.stats() == {"calls": 1, "shared": 4, "in_flight": 0}
+
+
+def test_error_is_raised_for_every_waiting_request():
+    flight, calls, release = SingleFlight(), [], threading.Event()
+    call = _slow_call(calls, release, error=RuntimeError("provider down"))
+    _release_when_waiting(flight, 2, release)
+
+    _, errors = _run_concurrently(3, lambda: flight.do("key", call))
+
+    assert len(calls) == 1
+    assert all(isinstance(error, RuntimeError) for error in errors)
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_finished_call_is_not_reused():
+    flight, calls = SingleFlight(), []
+
+    def call():
+        calls.append(1)
+        return len(calls)
+
+    assert flight.do("key", call) == 1
+    assert flight.do("key", call) == 2
+    assert flight.stats() == {"calls": 2, "shared": 0, "in_flight": 0}
+
+
+def test_different_keys_are_not_coalesced():
+    assert SingleFlight.make_key("gemini", "key", "prompt") != SingleFlight.make_key("openai", "key", "prompt")
+    assert SingleFlight.make_key("gemini", "key", "prompt") != SingleFlight.make_key("gemini", "other", "prompt")
+    assert SingleFlight.make_key("Gemini", "key", "prompt") == SingleFlight.make_key("gemini", "key", "prompt")
+
+    flight, calls = SingleFlight(), []
+    with pytest.raises(ValueError):
+        flight.do("a", lambda: (_ for _ in ()).throw(ValueError("boom")))
+    assert flight.do("b", lambda: calls.append(1) or "ok") == "ok"